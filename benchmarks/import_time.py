@@ -0,0 +1,112 @@
+"""
+Measures the time taken by common ``nasawrapper`` imports in fresh
+interpreters, and which heavy dependencies each one loads. Results are
+written as JSON; with ``--baseline``, the script exits with status ``1``
+when an import got slower than the baseline by more than
+``--tolerance``, or loads a dependency it didn't load before::
+
+    python benchmarks/import_time.py --output imports.json
+    python benchmarks/import_time.py --baseline imports.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = [
+    "import nasawrapper",
+    "from nasawrapper import SyncApod",
+    "from nasawrapper import SyncNeoWs",
+    "from nasawrapper import AsyncApod",
+    "from nasawrapper import *"
+]
+
+HEAVY_MODULES = ["aiohttp", "requests", "asyncio", "sqlite3", "numpy"]
+
+_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(elapsed, *[name for name in {modules!r} if name in sys.modules])
+"""
+
+def measure(statement: str, runs: int) -> Dict[str, Any]:
+    timings, loaded = [], []
+    environment = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _SCRIPT.format(statement=statement, modules=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True, env=environment
+        ).stdout.split()
+        timings.append(float(output[0]))
+        loaded = output[1:]
+
+    return {
+        "statement": statement,
+        "runs": runs,
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "loaded": loaded
+    }
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Returns a message for every import slower than in
+    ``baseline`` by more than ``tolerance`` (a ratio), or
+    loading more heavy dependencies.
+    """
+    previous = {result["statement"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["statement"])
+        if before is None:
+            continue
+        if result["median"] > before["median"] * (1 + tolerance):
+            regressions.append(
+                f"{result['statement']}: went from {before['median'] * 1000:.1f}ms to {result['median'] * 1000:.1f}ms"
+            )
+        added = sorted(set(result["loaded"]) - set(before["loaded"]))
+        if added:
+            regressions.append(f"{result['statement']}: now loads {', '.join(added)}")
+
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--output", help="where the JSON results are written, stdout otherwise")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown against the baseline")
+    arguments = parser.parse_args(argv)
+
+    results = [measure(statement, arguments.runs) for statement in STATEMENTS]
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            regressions = compare(results, json.load(file), arguments.tolerance)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
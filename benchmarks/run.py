@@ -0,0 +1,263 @@
+"""
+Measures every sync and async client method against the local
+stand-in server of ``tests/stub_server.py``, without network access.
+
+For each method, it reports the throughput, the p50 and p99 latencies,
+the errors and the peak memory allocated during a call, as JSON. With
+``--baseline``, it exits with status ``1`` when a method got slower
+than the baseline by more than ``--tolerance``::
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --latency lognormal:-4,0.5 --baseline results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from nasawrapper import (
+    ApodQueryBuilder, AsyncApod, AsyncNeoWs,
+    NeoWsQueryBuilder, SyncApod, SyncNeoWs
+)
+from nasawrapper.metrics import RequestEvent, add_hook, remove_hook
+from nasawrapper.transport import set_api_root
+
+from stub_server import StubServer
+
+API_KEY = "BENCHMARK_KEY"
+DAY = datetime(2021, 1, 1)
+
+def sync_cases() -> List[Tuple[str, Callable[[], Any]]]:
+    apod, neows = SyncApod(API_KEY), SyncNeoWs(API_KEY)
+    return [
+        ("SyncApod.get_apod[date]", lambda: apod.get_apod({"date": DAY})),
+        ("SyncApod.get_apod[range]", lambda: apod.get_apod({"start_date": DAY, "end_date": datetime(2021, 1, 31)})),
+        ("SyncApod.get_apod[count]", lambda: apod.get_apod({"count": 20})),
+        ("SyncApod.get_random", apod.get_random),
+        ("SyncApod.get_today_apod", apod.get_today_apod),
+        ("ApodQueryBuilder.get_apod", lambda: ApodQueryBuilder(API_KEY, {}).set_date(DAY).get_apod()),
+        ("SyncNeoWs.get_neo_feed", lambda: neows.get_neo_feed({"start_date": DAY, "end_date": datetime(2021, 1, 8)})),
+        ("SyncNeoWs.get_today_neo_feed", neows.get_today_neo_feed),
+        ("SyncNeoWs.get_neo_lookup", lambda: neows.get_neo_lookup(3542519)),
+        ("SyncNeoWs.get_neo_browse", neows.get_neo_browse),
+        ("NeoWsQueryBuilder.get_feed", lambda: NeoWsQueryBuilder(API_KEY, {}).set_start_date(DAY).set_end_date(DAY).get_feed())
+    ]
+
+def async_cases() -> List[Tuple[str, Callable[[], Awaitable[Any]]]]:
+    apod, neows = AsyncApod(API_KEY), AsyncNeoWs(API_KEY)
+    return [
+        ("AsyncApod.get_apod[date]", lambda: apod.get_apod({"date": DAY})),
+        ("AsyncApod.get_apod[range]", lambda: apod.get_apod({"start_date": DAY, "end_date": datetime(2021, 1, 31)})),
+        ("AsyncApod.get_apod[count]", lambda: apod.get_apod({"count": 20})),
+        ("AsyncApod.get_random", apod.get_random),
+        ("AsyncApod.get_today_apod", apod.get_today_apod),
+        ("AsyncNeoWs.get_neo_feed", lambda: neows.get_neo_feed({"start_date": DAY, "end_date": datetime(2021, 1, 8)})),
+        ("AsyncNeoWs.get_today_neo_feed", neows.get_today_neo_feed),
+        ("AsyncNeoWs.get_neo_lookup", lambda: neows.get_neo_lookup(3542519)),
+        ("AsyncNeoWs.get_neo_browse", neows.get_neo_browse)
+    ]
+
+class FailedResponses:
+    """
+    A hook counting the responses with an error status,
+    since the clients return the body of a ``5xx`` instead
+    of raising.
+    """
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, event: RequestEvent) -> None:
+        if event.status is not None and event.status >= 500:
+            self.count += 1
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[position]
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float, peak: int) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "mean": statistics.mean(latencies),
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "peak_memory": peak
+    }
+
+def peak_memory(call: Callable[[], Any]) -> int:
+    # measured apart, since tracing slows every allocation down
+    tracemalloc.start()
+    try:
+        call()
+    except Exception:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def bench_sync(name: str, call: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        try:
+            call()
+        except Exception:
+            pass
+
+    failed = FailedResponses()
+    add_hook(failed)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        before = time.perf_counter()
+        try:
+            call()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - before)
+    elapsed = time.perf_counter() - started
+    remove_hook(failed)
+
+    return summarize(name, latencies, errors + failed.count, elapsed, peak_memory(call))
+
+async def bench_async(
+    name: str,
+    call: Callable[[], Awaitable[Any]],
+    iterations: int,
+    warmup: int,
+    concurrency: int
+) -> Dict[str, Any]:
+    async def timed() -> Tuple[float, bool]:
+        before = time.perf_counter()
+        try:
+            await call()
+            error = False
+        except Exception:
+            error = True
+        return time.perf_counter() - before, error
+
+    for _ in range(warmup):
+        await timed()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited() -> Tuple[float, bool]:
+        async with semaphore:
+            return await timed()
+
+    failed = FailedResponses()
+    add_hook(failed)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(limited() for _ in range(iterations)))
+    elapsed = time.perf_counter() - started
+    remove_hook(failed)
+
+    def one_call() -> None:
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(call())
+        finally:
+            loop.close()
+
+    # run in a thread: this one's loop is already running
+    peak = await asyncio.get_event_loop().run_in_executor(None, peak_memory, one_call)
+    return summarize(name, [latency for latency, _ in results], sum(error for _, error in results) + failed.count, elapsed, peak)
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Returns a message for every method slower than in
+    ``baseline`` by more than ``tolerance`` (a ratio).
+    """
+    previous = {result["name"]: result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        for key in ("p50", "p99"):
+            if before[key] and result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{result['name']}: {key} went from {before[key]:.6f}s to {result[key]:.6f}s")
+        if before["throughput"] and result["throughput"] < before["throughput"] / (1 + tolerance):
+            regressions.append(
+                f"{result['name']}: throughput went from {before['throughput']:.1f}/s to {result['throughput']:.1f}/s"
+            )
+
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight for async methods")
+    parser.add_argument("--latency", default="none", help="e.g. fixed:0.02, uniform:0.01,0.05, lognormal:-4,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 500/503 responses")
+    parser.add_argument("--rate-limited-rate", type=float, default=0.0, help="share of 429 responses")
+    parser.add_argument("--filter", default="", help="only methods whose name contains this")
+    parser.add_argument("--output", help="where the JSON results are written, stdout otherwise")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    arguments = parser.parse_args(argv)
+
+    server = StubServer(arguments.latency, arguments.error_rate, arguments.rate_limited_rate, rate_limit=10 ** 9)
+    results = []
+    with server:
+        set_api_root(server.url)
+        try:
+            for name, call in sync_cases():
+                if arguments.filter in name:
+                    results.append(bench_sync(name, call, arguments.iterations, arguments.warmup))
+
+            async def run_async() -> None:
+                for name, call in async_cases():
+                    if arguments.filter in name:
+                        results.append(await bench_async(
+                            name, call, arguments.iterations, arguments.warmup, arguments.concurrency
+                        ))
+
+            asyncio.run(run_async())
+        finally:
+            set_api_root()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": arguments.iterations,
+            "concurrency": arguments.concurrency,
+            "latency": arguments.latency,
+            "error_rate": arguments.error_rate,
+            "rate_limited_rate": arguments.rate_limited_rate
+        },
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            regressions = compare(results, json.load(file), arguments.tolerance)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
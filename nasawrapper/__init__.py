@@ -1,6 +1,41 @@
 # errors
 from .errors import *
 
-# api-related
-from .apod import SyncApod, AsyncApod, ApodQueryBuilder
-from .neows import SyncNeoWs, AsyncNeoWs, NeoWsQueryBuilder
\ No newline at end of file
+# api-related, imported on first use so the clients
+# and their dependencies only load when needed
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .apod import SyncApod, AsyncApod, ApodQueryBuilder
+    from .neows import SyncNeoWs, AsyncNeoWs, NeoWsQueryBuilder
+
+_LAZY = {
+    "SyncApod": "apod",
+    "AsyncApod": "apod",
+    "ApodQueryBuilder": "apod",
+    "SyncNeoWs": "neows",
+    "AsyncNeoWs": "neows",
+    "NeoWsQueryBuilder": "neows"
+}
+
+from . import errors as _errors
+
+__all__ = [name for name in vars(_errors) if not name.startswith("_")] + list(_LAZY)
+
+def __getattr__(name: str):
+    from importlib import import_module
+
+    # 'nasawrapper.apod' used to work without importing it
+    if name in _LAZY.values():
+        return import_module(f".{name}", __name__)
+
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'nasawrapper' has no attribute '{name}'")
+
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
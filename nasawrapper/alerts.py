@@ -0,0 +1,544 @@
+import abc
+import heapq
+import json
+import operator
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .neows import Asteroid, CloseApproachData
+from .utils.content_hash import content_hash
+from .utils.iter_asteroids import iter_asteroids
+
+ASTEROID = "asteroid"
+APPROACH = "approach"
+
+_DAY = 86400000
+
+# a compiled check takes an asteroid, one of its approaches
+# and the current time, in milliseconds since the Unix epoch
+Check = Callable[[Asteroid, CloseApproachData, float], bool]
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge
+}
+
+def _getter(path: str) -> Callable[[Any], Any]:
+    keys = tuple(path.split("."))
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda record: record.get(key)
+
+    def get(record: Any) -> Any:
+        for key in keys:
+            if not isinstance(record, dict):
+                return None
+            record = record.get(key)
+        return record
+
+    return get
+
+def _converter(value: Any) -> Callable[[Any], Any]:
+    # numbers are strings on API response
+    if isinstance(value, bool):
+        return bool
+    if isinstance(value, (int, float)):
+        return float
+    return str
+
+class Condition(abc.ABC):
+    """
+    A predicate over the fields of an asteroid and of one
+    of its close approaches. Conditions are made with
+    :py:func:`asteroid`, :py:func:`approach` and
+    :py:func:`upcoming`, and combined with ``&``, ``|``
+    and ``~``. Custom conditions implement :py:meth:`compile`
+    and set ``scope`` to ``"approach"`` if they read the
+    approach.
+    """
+    scope = ASTEROID
+
+    def __and__(self, other: "Condition") -> "Condition":
+        return _All([self, other])
+
+    def __or__(self, other: "Condition") -> "Condition":
+        return _Any([self, other])
+
+    def __invert__(self) -> "Condition":
+        return _Not(self)
+
+    def conjuncts(self) -> List["Condition"]:
+        """
+        Returns the conditions that must all be true for
+        this one to be true.
+        """
+        return [self]
+
+    @abc.abstractmethod
+    def compile(self) -> Check:
+        """
+        Returns a function checking the condition, taking
+        an asteroid, one of its approaches and the current
+        time in milliseconds since the Unix epoch.
+        """
+
+class _Compare(Condition):
+    def __init__(self, scope: str, path: str, symbol: str, value: Any) -> None:
+        self.scope = scope
+        self._path = path
+        self._symbol = symbol
+        self._value = value
+
+    def __repr__(self) -> str:
+        return f"{self.scope}({self._path!r}) {self._symbol} {self._value!r}"
+
+    def compile(self) -> Check:
+        get = _getter(self._path)
+        compare = _OPERATORS[self._symbol]
+        convert = _converter(self._value)
+        value = self._value
+        on_asteroid = self.scope == ASTEROID
+
+        def check(asteroid: Asteroid, approach: CloseApproachData, now: float) -> bool:
+            found = get(asteroid if on_asteroid else approach)
+            if found is None:
+                return False
+            try:
+                return compare(convert(found), value)
+            except (TypeError, ValueError):
+                return False
+
+        return check
+
+class _In(Condition):
+    def __init__(self, scope: str, path: str, values: Iterable[Any]) -> None:
+        self.scope = scope
+        self._path = path
+        self._values = frozenset(values)
+
+    def __repr__(self) -> str:
+        return f"{self.scope}({self._path!r}).isin({sorted(self._values, key=str)!r})"
+
+    def compile(self) -> Check:
+        get = _getter(self._path)
+        values = self._values
+        on_asteroid = self.scope == ASTEROID
+
+        def check(asteroid: Asteroid, approach: CloseApproachData, now: float) -> bool:
+            return get(asteroid if on_asteroid else approach) in values
+
+        return check
+
+class _All(Condition):
+    def __init__(self, conditions: List[Condition]) -> None:
+        self._conditions = [part for condition in conditions for part in condition.conjuncts()]
+        self.scope = APPROACH if any(condition.scope == APPROACH for condition in self._conditions) else ASTEROID
+
+    def __repr__(self) -> str:
+        return " & ".join(f"({condition!r})" for condition in self._conditions)
+
+    def conjuncts(self) -> List[Condition]:
+        return list(self._conditions)
+
+    def compile(self) -> Check:
+        checks = [condition.compile() for condition in self._conditions]
+        return lambda asteroid, approach, now: all(check(asteroid, approach, now) for check in checks)
+
+class _Any(Condition):
+    def __init__(self, conditions: List[Condition]) -> None:
+        self._conditions = conditions
+        self.scope = APPROACH if any(condition.scope == APPROACH for condition in conditions) else ASTEROID
+
+    def __repr__(self) -> str:
+        return " | ".join(f"({condition!r})" for condition in self._conditions)
+
+    def compile(self) -> Check:
+        checks = [condition.compile() for condition in self._conditions]
+        return lambda asteroid, approach, now: any(check(asteroid, approach, now) for check in checks)
+
+class _Not(Condition):
+    def __init__(self, condition: Condition) -> None:
+        self._condition = condition
+        self.scope = condition.scope
+
+    def __repr__(self) -> str:
+        return f"~({self._condition!r})"
+
+    def compile(self) -> Check:
+        check = self._condition.compile()
+        return lambda asteroid, approach, now: not check(asteroid, approach, now)
+
+class _Upcoming(Condition):
+    scope = APPROACH
+
+    def __init__(self, days: float) -> None:
+        self.span = days * _DAY
+
+    def __repr__(self) -> str:
+        return f"upcoming({self.span / _DAY!r})"
+
+    def compile(self) -> Check:
+        span = self.span
+
+        def check(asteroid: Asteroid, approach: CloseApproachData, now: float) -> bool:
+            epoch = approach.get("epoch_date_close_approach")
+            return epoch is not None and now <= epoch <= now + span
+
+        return check
+
+class Field:
+    """
+    A field of an asteroid or of a close approach, named
+    by its dotted path in the API response, like
+    ``"miss_distance.lunar"``. Comparing it with a value
+    makes a :py:class:`Condition`. Numbers are compared as
+    numbers, even though the API sends them as strings.
+    """
+    def __init__(self, scope: str, path: str) -> None:
+        self._scope = scope
+        self._path = path
+
+    def _compare(self, symbol: str, value: Any) -> Condition:
+        return _Compare(self._scope, self._path, symbol, value)
+
+    def __eq__(self, value: Any) -> Condition: # type: ignore[override]
+        return self._compare("==", value)
+
+    def __ne__(self, value: Any) -> Condition: # type: ignore[override]
+        return self._compare("!=", value)
+
+    def __lt__(self, value: Any) -> Condition:
+        return self._compare("<", value)
+
+    def __le__(self, value: Any) -> Condition:
+        return self._compare("<=", value)
+
+    def __gt__(self, value: Any) -> Condition:
+        return self._compare(">", value)
+
+    def __ge__(self, value: Any) -> Condition:
+        return self._compare(">=", value)
+
+    __hash__ = object.__hash__
+
+    def between(self, minimum: Any, maximum: Any) -> Condition:
+        """
+        Returns a condition true when the field is between
+        ``minimum`` and ``maximum``, inclusive.
+        """
+        return (self >= minimum) & (self <= maximum)
+
+    def isin(self, values: Iterable[Any]) -> Condition:
+        """
+        Returns a condition true when the field is one of
+        ``values``.
+        """
+        return _In(self._scope, self._path, values)
+
+def asteroid(path: str) -> Field:
+    """
+    Returns a field of the asteroid, like
+    ``"is_potentially_hazardous_asteroid"`` or
+    ``"estimated_diameter.kilometers.estimated_diameter_max"``.
+    """
+    return Field(ASTEROID, path)
+
+def approach(path: str) -> Field:
+    """
+    Returns a field of the close approach, like
+    ``"miss_distance.lunar"`` or ``"orbiting_body"``.
+    """
+    return Field(APPROACH, path)
+
+def upcoming(days: float) -> Condition:
+    """
+    Returns a condition true when the approach happens in
+    the next ``days`` days. When it's one of the conditions
+    joined by ``&`` at the top of a rule, approaches further
+    ahead are scheduled, and alerted once they enter the
+    window, even if their record doesn't change.
+    """
+    return _Upcoming(days)
+
+class Rule(NamedTuple):
+    """
+    A named condition. Alerts are made for every close
+    approach matching ``condition``.
+    """
+    name: str
+    condition: Condition
+
+class Alert(NamedTuple):
+    """
+    A close approach that started matching a rule.
+    """
+    rule: str
+    neo_reference_id: str
+    epoch: int
+    asteroid: Asteroid
+    approach: CloseApproachData
+
+class _CompiledRule:
+    """
+    A rule split in the checks of the asteroid, evaluated
+    once for all of its approaches, the checks of each
+    approach, and the time window, if any.
+    """
+    def __init__(self, rule: Rule) -> None:
+        self.name = rule.name
+        self.span: Optional[float] = None
+
+        asteroid_checks, approach_checks = [], []
+        for condition in rule.condition.conjuncts():
+            if isinstance(condition, _Upcoming) and (self.span is None or condition.span < self.span):
+                self.span = condition.span
+            elif not isinstance(condition, _Upcoming):
+                (asteroid_checks if condition.scope == ASTEROID else approach_checks).append(condition.compile())
+
+        self.asteroid_checks = asteroid_checks
+        self.approach_checks = approach_checks
+
+    def due(self, approach: CloseApproachData, now: float) -> Optional[float]:
+        """
+        Returns ``now`` if the approach is in the window,
+        when it enters the window if it's further ahead, or
+        ``None`` if it's past.
+        """
+        if self.span is None:
+            return now
+        epoch = approach.get("epoch_date_close_approach")
+        if epoch is None or epoch < now:
+            return None
+        return max(now, epoch - self.span)
+
+class AlertEngine:
+    """
+    Evaluates alert rules incrementally over refreshed
+    NeoWs feed windows (or browse pages and lookups).
+
+    Only the close approaches that are new or whose
+    asteroid changed since the previous update are
+    evaluated, using the content hash of every asteroid
+    (see :py:func:`content_hash <nasawrapper.utils.content_hash>`),
+    and a match is only alerted once, until the approach
+    stops matching. Rules are compiled once: conditions on
+    the asteroid are checked before the ones on each of its
+    approaches, and an :py:func:`upcoming` window at the
+    top of a rule is turned into a schedule, so approaches
+    entering the window are alerted without evaluating the
+    whole window again.
+
+    **Parameters**
+
+        **rules** (Iterable[:py:class:`Rule`]) - The rules.
+        Their names must be unique.
+
+        **state** (Optional[Dict[str, Any]]) - The state of a
+        previous engine, as returned by :py:meth:`state` or
+        :py:func:`load_state`, so earlier matches aren't
+        alerted again.
+
+        **ignore** (Iterable[str]) - Top-level fields left out
+        of the hash. Default is ``("links",)``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.alerts import AlertEngine, Rule, asteroid, approach, upcoming
+            from datetime import datetime, timedelta
+
+            engine = AlertEngine([
+                Rule(
+                    "hazardous-within-5-ld",
+                    (asteroid("is_potentially_hazardous_asteroid") == True)
+                    & (approach("miss_distance.lunar") <= 5)
+                    & upcoming(days=30)
+                )
+            ])
+
+            neows = SyncNeoWs("DEMO_KEY")
+            today = datetime.now()
+            feed = neows.get_neo_feed({"start_date": today, "end_date": today + timedelta(days=7)})
+            for alert in engine.update(feed):
+                print(alert.rule, alert.asteroid["name"], alert.approach["close_approach_date"])
+    """
+    def __init__(
+        self,
+        rules: Iterable[Rule],
+        state: Optional[Dict[str, Any]] = None,
+        ignore: Iterable[str] = ("links",)
+    ) -> None:
+        self._rules = [_CompiledRule(rule) for rule in rules]
+        names = [rule.name for rule in self._rules]
+        if len(set(names)) != len(names):
+            raise ValueError("rule names must be unique")
+
+        self._ignore = tuple(ignore)
+        state = state or {}
+        # record key ('<id>:<epoch>') -> hash of its asteroid
+        self._hashes: Dict[str, str] = dict(state.get("hashes", {}))
+        self._alerted: Set[Tuple[str, str]] = {tuple(match) for match in state.get("alerted", [])}
+        # (due, record key, rule name, version, asteroid, approach)
+        self._scheduled: List[Tuple[float, str, str, int, Asteroid, CloseApproachData]] = []
+        self._versions: Dict[str, int] = {}
+        for due, key, name, asteroid_, approach_ in state.get("scheduled", []):
+            self._versions[key] = 1
+            self._scheduled.append((due, key, name, 1, asteroid_, approach_))
+        heapq.heapify(self._scheduled)
+        self._evaluated = 0
+
+    @property
+    def rules(self) -> List[str]:
+        """
+        Returns the names of the rules.
+        """
+        return [rule.name for rule in self._rules]
+
+    @property
+    def evaluated(self) -> int:
+        """
+        Returns how many approaches were evaluated, which
+        only grows with the new or changed ones.
+        """
+        return self._evaluated
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _evaluate(
+        self,
+        key: str,
+        asteroid: Asteroid,
+        approach: CloseApproachData,
+        now: float,
+        alerts: List[Alert],
+        asteroid_matches: Dict[str, bool]
+    ) -> None:
+        version = self._versions.get(key, 0) + 1
+        self._versions[key] = version
+        self._evaluated += 1
+
+        for rule in self._rules:
+            matched = False
+            # shared by every approach of the asteroid
+            on_asteroid = asteroid_matches.get(rule.name)
+            if on_asteroid is None:
+                on_asteroid = asteroid_matches[rule.name] = all(check(asteroid, approach, now) for check in rule.asteroid_checks)
+
+            if on_asteroid and all(check(asteroid, approach, now) for check in rule.approach_checks):
+                due = rule.due(approach, now)
+                if due is not None and due <= now:
+                    matched = True
+                elif due is not None:
+                    heapq.heappush(self._scheduled, (due, key, rule.name, version, asteroid, approach))
+
+            self._record(rule.name, key, matched, asteroid, approach, alerts)
+
+    def _record(self, name: str, key: str, matched: bool, asteroid: Asteroid, approach: CloseApproachData, alerts: List[Alert]) -> None:
+        match = (name, key)
+        if not matched:
+            self._alerted.discard(match)
+        elif match not in self._alerted:
+            self._alerted.add(match)
+            neo_reference_id, epoch = key.rsplit(":", 1)
+            alerts.append(Alert(name, neo_reference_id, int(epoch), asteroid, approach))
+
+    def _run_schedule(self, now: float, alerts: List[Alert]) -> None:
+        rules = {rule.name: rule for rule in self._rules}
+        while self._scheduled and self._scheduled[0][0] <= now:
+            due, key, name, version, asteroid, approach = heapq.heappop(self._scheduled)
+            rule = rules.get(name)
+            # skipping records evaluated again since
+            if rule is None or self._versions.get(key) != version:
+                continue
+            self._record(name, key, rule.due(approach, now) is not None, asteroid, approach, alerts)
+
+    def update(self, results: Any, now: Optional[float] = None) -> List[Alert]:
+        """
+        Evaluates the approaches of ``results`` (feeds,
+        browse pages, lookups or any iterable of them) that
+        are new or changed, and returns the new matches,
+        including scheduled approaches that entered their
+        window. ``now`` is in milliseconds since the Unix
+        epoch; default is the current time.
+        """
+        now = time.time() * 1000 if now is None else now
+        alerts: List[Alert] = []
+        self._run_schedule(now, alerts)
+
+        for asteroid_ in iter_asteroids(results):
+            digest = None
+            asteroid_matches: Dict[str, bool] = {}
+            neo_reference_id = str(asteroid_["neo_reference_id"])
+            for approach_ in asteroid_.get("close_approach_data", []):
+                key = f"{neo_reference_id}:{approach_['epoch_date_close_approach']}"
+                if digest is None:
+                    digest = content_hash(asteroid_, self._ignore)
+                if self._hashes.get(key) == digest:
+                    continue
+
+                self._hashes[key] = digest
+                self._evaluate(key, asteroid_, approach_, now, alerts, asteroid_matches)
+
+        return alerts
+
+    def prune(self, before: Optional[float] = None) -> int:
+        """
+        Forgets the approaches that happened before
+        ``before`` (in milliseconds since the Unix epoch,
+        default is a day ago), so the state doesn't grow
+        forever. Returns how many were forgotten.
+        """
+        before = time.time() * 1000 - _DAY if before is None else before
+        old = [key for key in self._hashes if int(key.rsplit(":", 1)[1]) < before]
+        for key in old:
+            del self._hashes[key]
+            self._versions.pop(key, None)
+
+        old_keys = set(old)
+        self._alerted = {match for match in self._alerted if match[1] not in old_keys}
+        return len(old)
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Returns the state of the engine, as JSON-compatible
+        objects, to be given to the next engine.
+        """
+        scheduled = [
+            (due, key, name, asteroid_, approach_)
+            for due, key, name, version, asteroid_, approach_ in self._scheduled
+            if self._versions.get(key) == version
+        ]
+        return {
+            "hashes": self._hashes,
+            "alerted": sorted(self._alerted),
+            "scheduled": scheduled
+        }
+
+def load_state(path: str) -> Dict[str, Any]:
+    """
+    Loads the state saved by :py:func:`save_state`.
+    A missing file is taken as an empty state.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_state(path: str, state: Dict[str, Any]) -> None:
+    """
+    Saves the state of an :py:class:`AlertEngine`,
+    replacing the file atomically.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(temporary, path)
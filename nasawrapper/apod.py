@@ -1,9 +1,16 @@
-import requests
-import aiohttp
-from typing import Dict, Union, Optional, Any, List, TypedDict
-from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Union, Optional, Any, Iterable, Iterator, List, TypedDict
+from datetime import datetime, timedelta
 
-from .errors import InvalidKey, InvalidDate, InvalidApiKey, RateLimitError
+from .cache import ResponseCache
+from .errors import InvalidKey, InvalidDate
+from .rate_limit import RateBudget
+from .transport import API_ROOT, get_json, get_json_async, raise_for_error
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from .batch import BatchExecutor, BatchResult
+    from .engine import AsyncEngine
 
 class ApodResponse(TypedDict):
     copyright: Optional[str]
@@ -31,6 +38,8 @@ class Validator:
         Function to validate the options acording to
         the API requisites
         """
+        # dates are converted in a copy, so the caller's options can be reused
+        options = dict(options)
 
         # creating checks for date related keys
         checks = [key in options for key in date_related_keys]
@@ -76,6 +85,9 @@ class Validator:
         if "start_date" in options.keys():
             options["start_date"] = options["start_date"].strftime("%Y-%m-%d")
 
+        if isinstance(options.get("date"), datetime):
+            options["date"] = options["date"].strftime("%Y-%m-%d")
+
         # checking 'count' and 'date' keys
         if "count" in options.keys() and any(checks):
             raise InvalidKey("'count' can not be used with 'end_date', 'start_date' or 'date'")
@@ -86,6 +98,24 @@ class Validator:
         return options
         
 
+def _store_range(store: Any, api_key: str, results: Union[ApodResponse, List[ApodResponse]], end: datetime) -> int:
+    raise_for_error(results, api_key)
+    if isinstance(results, dict):
+        results = [results]
+    store.add(results)
+
+    # recent dates may not be published yet, so the
+    # mark only passes them once they were received
+    if end.date() < (datetime.now() - timedelta(days=1)).date():
+        mark = end.strftime("%Y-%m-%d")
+    else:
+        mark = max([result["date"] for result in results], default=None)
+
+    if mark and (store.high_water_mark is None or mark > store.high_water_mark):
+        store.high_water_mark = mark
+
+    return len(results)
+
 class SyncApod:
     """
     This class uses synchronous programming
@@ -95,9 +125,33 @@ class SyncApod:
     **Parameters**
 
         **api_key** (str) - The API key.
+
+        **cache** (Optional[:py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`]) - Where
+        responses are cached. Random pictures are never cached.
+
+        **budget** (Optional[:py:class:`RateBudget <nasawrapper.rate_limit.RateBudget>`]) - A rate
+        limit budget shared with other clients.
+
+        **engine** (Optional[:py:class:`AsyncEngine <nasawrapper.engine.AsyncEngine>`]) - If
+        given, requests are made by this engine's event loop.
+
+        **api_root** (str) - Where requests are sent, like a
+        :py:mod:`caching proxy <nasawrapper.proxy>`. Default
+        is :py:data:`API_ROOT <nasawrapper.transport.API_ROOT>`.
     """
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[RateBudget] = None,
+        engine: Optional["AsyncEngine"] = None,
+        api_root: str = API_ROOT
+    ) -> None:
         self._api_key = api_key
+        self._cache = cache
+        self._budget = budget
+        self._api_root = api_root.rstrip("/")
+        self._engine = engine
         self._allowed_keys = {
             "date": datetime,
             "start_date": datetime,
@@ -106,7 +160,7 @@ class SyncApod:
             "thumbs": bool
         }
         self._date_related_keys = list(filter(lambda item: "date" in item, self._allowed_keys.keys()))
-        self._base_url = f"https://api.nasa.gov/planetary/apod?api_key={self._api_key}"
+        self._base_url = f"{self._api_root}/planetary/apod?api_key={self._api_key}"
 
     @property
     def api_key(self):
@@ -115,6 +169,13 @@ class SyncApod:
         """
         return self._api_key
 
+    @property
+    def api_root(self):
+        """
+        Returns where requests are sent.
+        """
+        return self._api_root
+
     @property
     def allowed_keys(self):
         """
@@ -136,6 +197,27 @@ class SyncApod:
         """
         return self._base_url
 
+    @property
+    def cache(self):
+        """
+        Returns the response cache, if any.
+        """
+        return self._cache
+
+    @property
+    def budget(self):
+        """
+        Returns the rate limit budget, if any.
+        """
+        return self._budget
+
+    @property
+    def engine(self):
+        """
+        Returns the engine requests are delegated to, if any.
+        """
+        return self._engine
+
     def get_apod(self, options: Dict[str, Union[str, int, bool, datetime]]) -> Union[ApodResponse, List[ApodResponse]]:
         """
         Validate the provided options by checking their types
@@ -186,20 +268,104 @@ class SyncApod:
 
                     print(result)
         """
+        url = self._url(options)
+
+        # random pictures are neither cached nor shared
+        random = "count" in options
+        return get_json(url, self._api_key, None if random else self._cache, self._budget, engine=self._engine, coalesce=not random)
+
+    def _url(self, options: Dict[str, Union[str, int, bool, datetime]]) -> str:
         options = Validator.validate(options, self._allowed_keys, self._date_related_keys)
 
         # building query
+        url = self._base_url
         for key, value in options.items():
-            self._base_url += f"&{key}={value}"
+            url += f"&{key}={value}"
 
-        # making request
-        request = requests.get(self._base_url)
-        if request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
+        return url
+
+    def get_many(
+        self,
+        options_list: List[Dict[str, Union[str, int, bool, datetime]]],
+        return_exceptions: bool = False
+    ) -> List[Union[ApodResponse, List[ApodResponse], Exception]]:
+        """
+        Makes a :py:meth:`get_apod` request for every item of
+        ``options_list`` concurrently, on the client's engine
+        or on the shared :py:func:`default engine <nasawrapper.engine.get_default_engine>`,
+        and returns the results in order. With
+        ``return_exceptions``, failed requests give their
+        error instead of raising it.
+
+        **Example**
+
+            .. code-block:: python3
+
+                from nasawrapper import SyncApod
+                from datetime import datetime
+
+                apod = SyncApod("DEMO_KEY")
+                results = apod.get_many([
+                    {"date": datetime(2021, month, 1)} for month in range(1, 13)
+                ])
+        """
+        from .engine import get_default_engine
+
+        engine = self._engine or get_default_engine()
+        urls = [(self._url(options), "count" in options) for options in options_list]
+        return engine.gather(
+            [
+                engine.fetch(url, self._api_key, None if random else self._cache, self._budget, coalesce=not random)
+                for url, random in urls
+            ],
+            return_exceptions
+        )
+
+    def submit(
+        self,
+        options: Dict[str, Union[str, int, bool, datetime]],
+        executor: Optional["BatchExecutor"] = None
+    ) -> "Future":
+        """
+        Makes a :py:meth:`get_apod` request in a thread pool
+        (``executor`` or the shared
+        :py:func:`default executor <nasawrapper.batch.get_default_executor>`)
+        and returns a :py:class:`concurrent.futures.Future`
+        of its result.
+        """
+        from .batch import get_default_executor
 
-        return request.json()
+        return (executor or get_default_executor()).submit(self.get_apod, options)
+
+    def map(
+        self,
+        options_list: Iterable[Dict[str, Union[str, int, bool, datetime]]],
+        ordered: bool = True,
+        executor: Optional["BatchExecutor"] = None
+    ) -> Iterator["BatchResult"]:
+        """
+        Makes a :py:meth:`get_apod` request for every item of
+        ``options_list`` in a thread pool (``executor`` or the
+        shared :py:func:`default executor <nasawrapper.batch.get_default_executor>`)
+        and yields a :py:class:`BatchResult <nasawrapper.batch.BatchResult>`
+        per item, in order or, without ``ordered``, as they
+        complete. Errors are captured per item.
+
+        **Example**
+
+            .. code-block:: python3
+
+                from nasawrapper import SyncApod
+                from datetime import datetime
+
+                apod = SyncApod("DEMO_KEY")
+                options = [{"date": datetime(2021, month, 1)} for month in range(1, 13)]
+                for item in apod.map(options):
+                    print(item.result["title"] if item.ok else item.error)
+        """
+        from .batch import get_default_executor
+
+        return (executor or get_default_executor()).map(self.get_apod, options_list, ordered)
 
     def get_random(self) -> ApodResponse:
         """
@@ -219,16 +385,10 @@ class SyncApod:
         But it's not recommended, since there's
         a specific method for this.
         """
-        url = f"https://api.nasa.gov/planetary/apod?api_key={self._api_key}&count=1"
+        url = f"{self._api_root}/planetary/apod?api_key={self._api_key}&count=1"
 
         # making request
-        request = requests.get(url)
-        if request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-
-        return request.json()[0]
+        return get_json(url, self._api_key, budget=self._budget, engine=self._engine, coalesce=False)[0]
 
     def get_today_apod(self) -> ApodResponse:
         """
@@ -252,16 +412,45 @@ class SyncApod:
         to do that.
         """
         now = datetime.now().strftime("%Y-%m-%d")
-        url = f"https://api.nasa.gov/planetary/apod?api_key={self._api_key}&date={now}"
+        url = f"{self._api_root}/planetary/apod?api_key={self._api_key}&date={now}"
         
         # making request
-        request = requests.get(url)
-        if request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
+        return get_json(url, self._api_key, self._cache, self._budget, engine=self._engine)
+
+    def sync(self, store: Any, end_date: Optional[datetime] = None, max_days: int = 365) -> int:
+        """
+        Fetches only the APODs that are missing from
+        ``store`` (an :py:class:`ApodStore <nasawrapper.apod_store.ApodStore>`
+        or any object with the same members), from Jun 16,
+        1995 up to ``end_date`` (default is today). Missing
+        dates are grouped into as few range requests as
+        possible and the store's high-water mark is moved
+        forward, so a catch-up after a day of downtime costs
+        a single request. Returns how many APODs were stored.
+        Errors answered by the API are raised, leaving the
+        store and its mark as they were.
+
+        **Example**
+
+            .. code-block:: python3
+
+                from nasawrapper import SyncApod
+                from nasawrapper.apod_store import ApodStore
+
+                apod = SyncApod("DEMO_KEY")
+                store = ApodStore("apod.db")
+                print(apod.sync(store), "new APODs")
+        """
+        # imported here, so importing the clients skips sqlite3
+        from .apod_store import missing_date_ranges
+
+        end_date = end_date or datetime.now()
+        count = 0
+        for start, end in missing_date_ranges(store.dates(), end_date, store.high_water_mark, max_days):
+            results = self.get_apod({"start_date": start, "end_date": end})
+            count += _store_range(store, self._api_key, results, end)
 
-        return request.json()
+        return count
 
         
 
@@ -275,9 +464,28 @@ class AsyncApod:
     **Parameters**
         
         **api_key** (str) - The API key.
+
+        **cache** (Optional[:py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`]) - Where
+        responses are cached. Random pictures are never cached.
+
+        **budget** (Optional[:py:class:`RateBudget <nasawrapper.rate_limit.RateBudget>`]) - A rate
+        limit budget shared with other clients.
+
+        **api_root** (str) - Where requests are sent, like a
+        :py:mod:`caching proxy <nasawrapper.proxy>`. Default
+        is :py:data:`API_ROOT <nasawrapper.transport.API_ROOT>`.
     """
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[RateBudget] = None,
+        api_root: str = API_ROOT
+    ) -> None:
         self._api_key = api_key
+        self._cache = cache
+        self._budget = budget
+        self._api_root = api_root.rstrip("/")
         self._allowed_keys = {
             "date": datetime,
             "start_date": datetime,
@@ -286,7 +494,7 @@ class AsyncApod:
             "thumbs": bool
         }
         self._date_related_keys = list(filter(lambda item: "date" in item, self._allowed_keys))
-        self._base_url = f"https://api.nasa.gov/planetary/apod?api_key={self._api_key}"
+        self._base_url = f"{self._api_root}/planetary/apod?api_key={self._api_key}"
 
     @property
     def api_key(self):
@@ -295,6 +503,13 @@ class AsyncApod:
         """
         return self._api_key
 
+    @property
+    def api_root(self):
+        """
+        Returns where requests are sent.
+        """
+        return self._api_root
+
     @property
     def allowed_keys(self):
         """
@@ -316,6 +531,20 @@ class AsyncApod:
         """
         return self._base_url
 
+    @property
+    def cache(self):
+        """
+        Returns the response cache, if any.
+        """
+        return self._cache
+
+    @property
+    def budget(self):
+        """
+        Returns the rate limit budget, if any.
+        """
+        return self._budget
+
     async def get_apod(self, options: Dict[str, Union[str, int, bool, datetime]]) -> Union[ApodResponse, List[ApodResponse]]:
         """
         |coro|
@@ -345,20 +574,13 @@ class AsyncApod:
         options = Validator.validate(options, self._allowed_keys, self._date_related_keys)
 
         # building url
+        url = self._base_url
         for key, value in options.items():
-            self._base_url += f"&{key}={value}"
-
-        # making request
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self._base_url) as response:
-                if response.status == 429:
-                    raise RateLimitError("You are being rate limited")
-                elif response.status == 403:
-                    raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-                    
-                response = await response.json()
+            url += f"&{key}={value}"
 
-        return response
+        # random pictures are never cached
+        cache = None if "count" in options else self._cache
+        return await get_json_async(url, self._api_key, cache, self._budget)
 
     async def get_random(self) -> ApodResponse:
         """
@@ -383,18 +605,10 @@ class AsyncApod:
                 loop = asyncio.get_event_loop()
                 loop.run_until_complete(main())
         """
-        url = f"https://api.nasa.gov/planetary/apod?api_key={self._api_key}&count=1"
-
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 429:
-                    raise RateLimitError("You are being rate limited")
-                elif response.status == 403:
-                    raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-                    
-                response = await response.json()
+        url = f"{self._api_root}/planetary/apod?api_key={self._api_key}&count=1"
 
-        return response[0]
+        # making request
+        return (await get_json_async(url, self._api_key, budget=self._budget))[0]
 
     async def get_today_apod(self) -> ApodResponse:
         """
@@ -420,18 +634,29 @@ class AsyncApod:
                 loop.run_until_complete(main())
         """
         now = datetime.now().strftime("%Y-%m-%d")
-        url = f"https://api.nasa.gov/planetary/apod?api_key={self._api_key}&date={now}"
+        url = f"{self._api_root}/planetary/apod?api_key={self._api_key}&date={now}"
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 429:
-                    raise RateLimitError("You are being rate limited")
-                elif response.status == 403:
-                    raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
+        # making request
+        return await get_json_async(url, self._api_key, self._cache, self._budget)
+
+    async def sync(self, store: Any, end_date: Optional[datetime] = None, max_days: int = 365) -> int:
+        """
+        |coro|
+
+        Same thing as
+        :py:class:`SyncApod.sync <nasawrapper.apod.SyncApod.sync>`,
+        but with asynchronous syntax.
+        """
+        # imported here, so importing the clients skips sqlite3
+        from .apod_store import missing_date_ranges
 
-                response = await response.json()
+        end_date = end_date or datetime.now()
+        count = 0
+        for start, end in missing_date_ranges(store.dates(), end_date, store.high_water_mark, max_days):
+            results = await self.get_apod({"start_date": start, "end_date": end})
+            count += _store_range(store, self._api_key, results, end)
 
-        return response
+        return count
 
 class ApodQueryBuilder:
     """
@@ -465,9 +690,11 @@ class ApodQueryBuilder:
                 result = builder.set_date(datetime(2010, 2, 3))
                 print(result)
     """
-    def __init__(self, api_key: str, options = {}):
+    def __init__(self, api_key: str, options: Optional[Dict[str, Any]] = None, api_root: str = API_ROOT):
         self._api_key = api_key
-        self._options = options
+        self._api_root = api_root.rstrip("/")
+        # every builder owns its options, so they don't leak between builders
+        self._options = dict(options or {})
 
     @property
     def api_key(self):
@@ -476,6 +703,13 @@ class ApodQueryBuilder:
         """
         return self._api_key
 
+    @property
+    def api_root(self):
+        """
+        Returns where requests are sent.
+        """
+        return self._api_root
+
     @property
     def options(self):
         """
@@ -497,9 +731,9 @@ class ApodQueryBuilder:
         elif self._options.get("count"):
             raise InvalidKey("'date' can not be used with 'count'")
 
-        self._options["date"] = date.strftime("%Y-%m-%d")
+        self._options["date"] = date
 
-        return ApodQueryBuilder(self._api_key, self._options)
+        return ApodQueryBuilder(self._api_key, self._options, self._api_root)
 
     def set_start_date(self, start_date: datetime):
         """
@@ -511,7 +745,7 @@ class ApodQueryBuilder:
         if start_date < datetime(year=1995, month=6, day=16):
             raise InvalidDate("'end_date' must be after Jun 16, 1995.")
 
-        return ApodQueryBuilder(self._api_key, self._options)
+        return ApodQueryBuilder(self._api_key, self._options, self._api_root)
 
     def set_end_date(self, end_date: datetime):
         """
@@ -521,7 +755,7 @@ class ApodQueryBuilder:
         if not isinstance(end_date, datetime):
             raise TypeError(f"'end_date' must be an 'datetime.datetime', got '{end_date.__class__.__name__}'")
 
-        return ApodQueryBuilder(self._api_key, self._options)
+        return ApodQueryBuilder(self._api_key, self._options, self._api_root)
 
     def set_count(self, count: int):
         """
@@ -537,7 +771,7 @@ class ApodQueryBuilder:
             raise InvalidKey("'count' can not be used with 'date', 'start_date' or 'end_date'")
 
         self._options["count"] = count
-        return ApodQueryBuilder(self._api_key, self._options)
+        return ApodQueryBuilder(self._api_key, self._options, self._api_root)
 
     def set_thumbs(self, thumbs: bool):
         """
@@ -547,14 +781,14 @@ class ApodQueryBuilder:
             raise TypeError(f"'thumbs' must be 'bool', got '{thumbs.__class__.__name__}'")
 
         self._options["thumbs"] = thumbs
-        return ApodQueryBuilder(self._api_key, self._options)
+        return ApodQueryBuilder(self._api_key, self._options, self._api_root)
 
     def get_apod(self) -> Union[ApodResponse, List[ApodResponse]]:
         """
         Make the request with the provided
         information.
         """
-        url = f"https://api.nasa.gov/planetary/apod?api_key={self._api_key}"
+        url = f"{self._api_root}/planetary/apod?api_key={self._api_key}"
 
         options = Validator.validate(
             self._options,
@@ -573,10 +807,29 @@ class ApodQueryBuilder:
             url += f"&{key}={value}"
 
         # making request
-        request = requests.get(url)
-        if request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
+        return get_json(url, self._api_key)
+
+    def submit(self, executor: Optional["BatchExecutor"] = None) -> "Future":
+        """
+        Makes the request in a thread pool (``executor`` or
+        the shared :py:func:`default executor <nasawrapper.batch.get_default_executor>`)
+        and returns a :py:class:`concurrent.futures.Future`
+        of its result.
+        """
+        from .batch import get_default_executor
+
+        return (executor or get_default_executor()).submit(self.get_apod)
+
+    @staticmethod
+    def map(
+        builders: Iterable["ApodQueryBuilder"],
+        ordered: bool = True,
+        executor: Optional["BatchExecutor"] = None
+    ) -> Iterator["BatchResult"]:
+        """
+        Makes the request of every builder in a thread pool,
+        like :py:meth:`SyncApod.map <nasawrapper.apod.SyncApod.map>`.
+        """
+        from .batch import get_default_executor
 
-        return request.json()
\ No newline at end of file
+        return (executor or get_default_executor()).map(lambda builder: builder.get_apod(), builders, ordered)
\ No newline at end of file
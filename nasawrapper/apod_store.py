@@ -0,0 +1,135 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+APOD_FIRST_DATE = datetime(year=1995, month=6, day=16)
+"""
+The date of the first APOD, the floor enforced by
+:py:class:`Validator <nasawrapper.apod.Validator>`.
+"""
+
+class ApodStore:
+    """
+    A local SQLite store of APOD results used by
+    :py:meth:`SyncApod.sync <nasawrapper.apod.SyncApod.sync>`
+    and :py:meth:`AsyncApod.sync <nasawrapper.apod.AsyncApod.sync>`.
+    Besides the results, it records a high-water mark: the
+    last date up to which every APOD was already requested,
+    so dates without an APOD aren't requested again.
+
+    Any object with the same ``dates``, ``add`` and
+    ``high_water_mark`` members can be used as a store.
+
+    **Parameters**
+
+        **path** (str) - The database file. Default is
+        ``":memory:"``.
+    """
+    def __init__(self, path: str = ":memory:") -> None:
+        self._path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS apods (date TEXT PRIMARY KEY, data TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+
+    @property
+    def path(self):
+        """
+        Returns the database file.
+        """
+        return self._path
+
+    def close(self) -> None:
+        """
+        Closes the database.
+        """
+        self._connection.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM apods").fetchone()[0]
+
+    def __contains__(self, date: str) -> bool:
+        return self._connection.execute("SELECT 1 FROM apods WHERE date = ?", (date,)).fetchone() is not None
+
+    def dates(self) -> Set[str]:
+        """
+        Returns every stored date, as ``YYYY-MM-DD``.
+        """
+        return {row[0] for row in self._connection.execute("SELECT date FROM apods")}
+
+    def get(self, date: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the stored APOD of ``date`` (``YYYY-MM-DD``),
+        or ``None``.
+        """
+        row = self._connection.execute("SELECT data FROM apods WHERE date = ?", (date,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add(self, results: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> int:
+        """
+        Stores APOD results, replacing the dates that
+        were already stored. Returns how many were stored.
+        """
+        if isinstance(results, dict):
+            results = [results]
+
+        with self._connection:
+            cursor = self._connection.executemany(
+                "INSERT OR REPLACE INTO apods VALUES (?, ?)",
+                [(result["date"], json.dumps(result)) for result in results]
+            )
+        return cursor.rowcount
+
+    @property
+    def high_water_mark(self) -> Optional[str]:
+        """
+        The last date (``YYYY-MM-DD``) up to which every
+        APOD was requested, or ``None``.
+        """
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'high_water_mark'").fetchone()
+        return row[0] if row else None
+
+    @high_water_mark.setter
+    def high_water_mark(self, date: str) -> None:
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('high_water_mark', ?)", (date,))
+
+def missing_date_ranges(
+    stored: Iterable[str],
+    end_date: datetime,
+    high_water_mark: Optional[str] = None,
+    max_days: int = 365
+) -> List[Tuple[datetime, datetime]]:
+    """
+    Returns the dates between Jun 16, 1995 and ``end_date``
+    that aren't in ``stored`` and are after
+    ``high_water_mark``, grouped into as few
+    ``(start_date, end_date)`` ranges as possible, each
+    with at most ``max_days`` days. Since every request
+    costs the same rate limit, a range may also cover a
+    few stored dates between missing ones.
+    """
+    if max_days < 1:
+        raise ValueError("'max_days' must be at least 1")
+
+    stored = set(stored)
+    start = APOD_FIRST_DATE
+    if high_water_mark:
+        start = max(start, datetime.strptime(high_water_mark, "%Y-%m-%d") + timedelta(days=1))
+    end = datetime(end_date.year, end_date.month, end_date.day)
+
+    ranges = []
+    current: Optional[List[datetime]] = None
+    day = start
+    while day <= end:
+        if day.strftime("%Y-%m-%d") not in stored:
+            if current is not None and (day - current[0]).days < max_days:
+                current[1] = day
+            else:
+                current = [day, day]
+                ranges.append(current)
+        day += timedelta(days=1)
+
+    return [(first, last) for first, last in ranges]
@@ -0,0 +1,248 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, time, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from .neows import Asteroid, CloseApproachData
+from .utils.iter_asteroids import iter_asteroids
+
+LUNAR_DISTANCE_AU = 0.002569555
+KILOMETERS_PER_AU = 149597870.7
+
+_DAY = 86400000
+_UNITS = {
+    "astronomical": 1.0,
+    "lunar": LUNAR_DISTANCE_AU,
+    "kilometers": 1 / KILOMETERS_PER_AU
+}
+
+class IndexedApproach(NamedTuple):
+    """
+    A close approach returned by :py:class:`ApproachIndex`.
+    """
+    neo_reference_id: str
+    epoch: int
+    miss_distance_au: float
+    asteroid: Asteroid
+    approach: CloseApproachData
+
+def _epoch(date: Optional[datetime], default: float) -> float:
+    if date is None:
+        return default
+    if not isinstance(date, datetime):
+        raise TypeError(f"dates must be 'datetime.datetime', got '{date.__class__.__name__}'")
+
+    # epochs on API response are in UTC
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date.timestamp() * 1000
+
+class ApproachIndex:
+    """
+    In-memory index of close approaches, kept sorted
+    both by miss distance and by date. It accepts feeds,
+    lists of feeds, browse responses and lookup responses,
+    and can be filled incrementally: adding an approach
+    that's already indexed (same asteroid and epoch)
+    replaces it, so overlapping feed windows can be added
+    freely.
+
+    Every query finds, with binary search, the approaches
+    under the distance threshold and the ones inside the
+    date range, and only reads the smaller of the two.
+
+    Ranges are inclusive. An ``end`` at midnight, like
+    ``datetime(2021, 1, 5)``, stands for the whole day.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.approach_index import ApproachIndex
+            from datetime import datetime
+
+            neows = SyncNeoWs("DEMO_KEY")
+            index = ApproachIndex()
+            index.add(neows.get_neo_feed({
+                "start_date": datetime(2021, 1, 1),
+                "end_date": datetime(2021, 1, 7)
+            }))
+
+            for approach in index.query(datetime(2021, 1, 2), datetime(2021, 1, 5), max_distance=0.05):
+                print(approach.asteroid["name"], approach.miss_distance_au)
+    """
+    def __init__(self) -> None:
+        # the same approaches, sorted by (distance, epoch, id)
+        # and by (epoch, distance, id)
+        self._by_distance: List[Tuple[float, int, str]] = []
+        self._by_epoch: List[Tuple[int, float, str]] = []
+        self._approaches: Dict[Tuple[str, int], IndexedApproach] = {}
+        # epochs of the approaches of each asteroid
+        self._epochs: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._approaches)
+
+    def add(self, results: Any) -> int:
+        """
+        Indexes every close approach of ``results``.
+        Returns how many approaches were added or replaced.
+        """
+        count = 0
+        for asteroid in iter_asteroids(results):
+            neo_reference_id = asteroid["neo_reference_id"]
+            for approach in asteroid.get("close_approach_data", []):
+                self._insert(IndexedApproach(
+                    neo_reference_id,
+                    int(approach["epoch_date_close_approach"]),
+                    float(approach["miss_distance"]["astronomical"]),
+                    asteroid,
+                    approach
+                ))
+                count += 1
+
+        return count
+
+    def _insert(self, entry: IndexedApproach) -> None:
+        key = (entry.neo_reference_id, entry.epoch)
+        if key in self._approaches:
+            self._remove(self._approaches[key])
+
+        insort(self._by_distance, (entry.miss_distance_au, entry.epoch, entry.neo_reference_id))
+        insort(self._by_epoch, (entry.epoch, entry.miss_distance_au, entry.neo_reference_id))
+        self._approaches[key] = entry
+        self._epochs.setdefault(entry.neo_reference_id, set()).add(entry.epoch)
+
+    def _remove(self, entry: IndexedApproach) -> None:
+        del self._by_distance[bisect_left(self._by_distance, (entry.miss_distance_au, entry.epoch, entry.neo_reference_id))]
+        del self._by_epoch[bisect_left(self._by_epoch, (entry.epoch, entry.miss_distance_au, entry.neo_reference_id))]
+
+        del self._approaches[(entry.neo_reference_id, entry.epoch)]
+        epochs = self._epochs[entry.neo_reference_id]
+        epochs.discard(entry.epoch)
+        if not epochs:
+            del self._epochs[entry.neo_reference_id]
+
+    def remove(self, neo_reference_id: str) -> None:
+        """
+        Removes every approach of an asteroid.
+        """
+        neo_reference_id = str(neo_reference_id)
+        for epoch in list(self._epochs.get(neo_reference_id, ())):
+            self._remove(self._approaches[(neo_reference_id, epoch)])
+
+    def _bounds(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        max_distance: Optional[float],
+        unit: str
+    ) -> Tuple[float, float, float, int, int, int]:
+        # returns the epoch and distance bounds, how many
+        # approaches are under the distance, and where the
+        # date range is in the epoch order
+        if unit not in _UNITS:
+            raise ValueError(f"'unit' must be one of {', '.join(_UNITS)}, got '{unit}'")
+
+        first = _epoch(start, float("-inf"))
+        last = _epoch(end, float("inf"))
+        if end is not None and end.time() == time.min:
+            # a date alone stands for the whole day
+            last += _DAY - 1
+        if first > last:
+            raise ValueError("'start' can not be after 'end'")
+
+        limit = float("inf") if max_distance is None else max_distance * _UNITS[unit]
+        closer = bisect_right(self._by_distance, (limit, float("inf"), ""))
+        lower = bisect_left(self._by_epoch, (first, float("-inf"), ""))
+        upper = bisect_right(self._by_epoch, (last, float("inf"), ""))
+        return first, last, limit, closer, lower, upper
+
+    def query(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_distance: Optional[float] = None,
+        unit: str = "astronomical",
+        hazardous: Optional[bool] = None
+    ) -> List[IndexedApproach]:
+        """
+        Returns the approaches between ``start`` and ``end``
+        (inclusive) closer than ``max_distance``, nearest first.
+        ``unit`` can be ``"astronomical"``, ``"lunar"`` or
+        ``"kilometers"``.
+        """
+        return list(self.iter_nearest(start, end, max_distance, unit, hazardous))
+
+    def nearest(
+        self,
+        k: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_distance: Optional[float] = None,
+        unit: str = "astronomical",
+        hazardous: Optional[bool] = None
+    ) -> List[IndexedApproach]:
+        """
+        Same thing as :py:meth:`query`, but stops after
+        the ``k`` nearest approaches.
+        """
+        if not isinstance(k, int):
+            raise TypeError(f"'k' must be 'int', got '{k.__class__.__name__}'")
+
+        return list(islice(self.iter_nearest(start, end, max_distance, unit, hazardous), k))
+
+    def iter_nearest(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_distance: Optional[float] = None,
+        unit: str = "astronomical",
+        hazardous: Optional[bool] = None
+    ) -> Iterator[IndexedApproach]:
+        """
+        Lazily yields the same approaches as :py:meth:`query`.
+        """
+        first, last, limit, closer, lower, upper = self._bounds(start, end, max_distance, unit)
+
+        if closer <= upper - lower:
+            # fewer approaches under the distance than in the range
+            items: Iterable[Tuple[float, int, str]] = (
+                item for item in islice(self._by_distance, closer) if first <= item[1] <= last
+            )
+        else:
+            items = sorted(
+                (distance, epoch, neo_reference_id)
+                for epoch, distance, neo_reference_id in self._by_epoch[lower:upper]
+                if distance <= limit
+            )
+
+        for _, epoch, neo_reference_id in items:
+            entry = self._approaches[(neo_reference_id, epoch)]
+            if hazardous is None or entry.asteroid["is_potentially_hazardous_asteroid"] == hazardous:
+                yield entry
+
+    def between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        max_distance: Optional[float] = None,
+        unit: str = "astronomical"
+    ) -> List[IndexedApproach]:
+        """
+        Returns the approaches between ``start`` and ``end``
+        closer than ``max_distance``, in chronological order.
+        """
+        first, last, limit, closer, lower, upper = self._bounds(start, end, max_distance, unit)
+
+        if closer <= upper - lower:
+            items = sorted(
+                (epoch, distance, neo_reference_id)
+                for distance, epoch, neo_reference_id in islice(self._by_distance, closer)
+                if first <= epoch <= last
+            )
+        else:
+            items = [item for item in self._by_epoch[lower:upper] if item[1] <= limit]
+
+        return [self._approaches[(neo_reference_id, epoch)] for epoch, _, neo_reference_id in items]
@@ -0,0 +1,196 @@
+import atexit
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from . import transport
+
+class BatchResult(NamedTuple):
+    """
+    The outcome of one item of a batch: its position in
+    the batch, the item itself, and either its ``result``
+    or the ``error`` it raised.
+    """
+    index: int
+    item: Any
+    result: Any
+    error: Optional[BaseException]
+
+    @property
+    def ok(self) -> bool:
+        """
+        Returns whether the item succeeded.
+        """
+        return self.error is None
+
+def iter_bounded(
+    submit: Callable[[int, Any], Future],
+    items: Iterable[Any],
+    limit: int,
+    ordered: bool = True
+) -> Iterator[Tuple[int, Any, Future]]:
+    """
+    Calls ``submit(index, item)`` for every item of
+    ``items``, which hands it to a thread or process pool
+    and returns its :py:class:`concurrent.futures.Future`,
+    with at most ``limit`` futures pending at once. Yields
+    ``(index, item, future)`` once each future is done, in
+    the order of ``items`` or, without ``ordered``, as they
+    complete.
+
+    ``items`` are consumed as futures complete, so they can
+    be a long generator without being queued all at once.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.batch import iter_bounded
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor() as executor:
+                def submit(index, value):
+                    return executor.submit(pow, value, 2)
+
+                for index, value, future in iter_bounded(submit, range(1000), limit=8):
+                    print(value, future.result())
+    """
+    items = enumerate(items)
+    # futures in submission order, so the oldest comes first
+    pending: Dict[Future, Tuple[int, Any]] = {}
+
+    def fill() -> None:
+        while len(pending) < limit:
+            submitted = next(items, None)
+            if submitted is None:
+                return
+            index, item = submitted
+            pending[submit(index, item)] = index, item
+
+    fill()
+    while pending:
+        if ordered:
+            oldest = next(iter(pending))
+            done = wait([oldest])[0]
+        else:
+            done = wait(pending, return_when=FIRST_COMPLETED)[0]
+
+        for future in done:
+            index, item = pending.pop(future)
+            yield index, item, future
+        fill()
+
+class BatchExecutor:
+    """
+    A thread pool for the batch methods of the sync clients
+    and query builders (``map`` and ``submit``). Its threads
+    share one :py:class:`requests.Session`, so connections
+    are reused between requests.
+
+    Most programs can use the shared executor returned by
+    :py:func:`get_default_executor`.
+
+    **Parameters**
+
+        **workers** (int) - How many requests run at once.
+        Default is ``8``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod
+            from nasawrapper.batch import BatchExecutor
+            from datetime import datetime
+
+            apod = SyncApod("DEMO_KEY")
+            with BatchExecutor(workers=16) as executor:
+                options = [{"date": datetime(2021, 1, day)} for day in range(1, 32)]
+                for item in apod.map(options, ordered=False, executor=executor):
+                    if item.ok:
+                        print(item.result["title"])
+                    else:
+                        print(item.index, "failed:", item.error)
+    """
+    def __init__(self, workers: int = 8) -> None:
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError("'workers' must be a positive 'int'")
+
+        import requests
+
+        self._workers = workers
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="nasawrapper-batch",
+            initializer=transport.use_session,
+            initargs=(self._session,)
+        )
+
+    @property
+    def workers(self):
+        """
+        Returns how many requests run at once.
+        """
+        return self._workers
+
+    @property
+    def session(self):
+        """
+        Returns the session shared by the threads.
+        """
+        return self._session
+
+    def submit(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Runs ``function(*args, **kwargs)`` in the pool and
+        returns a :py:class:`concurrent.futures.Future`.
+        """
+        return self._executor.submit(function, *args, **kwargs)
+
+    def map(self, function: Callable[[Any], Any], items: Iterable[Any], ordered: bool = True) -> Iterator[BatchResult]:
+        """
+        Runs ``function`` on every item in the pool and
+        yields a :py:class:`BatchResult` per item, in the
+        order of ``items`` or, without ``ordered``, as they
+        complete. Errors are captured in the results instead
+        of being raised. ``items`` are consumed a few at a
+        time, so they can be a long generator.
+        """
+        def submit(index: int, item: Any) -> Future:
+            return self._executor.submit(function, item)
+
+        for index, item, future in iter_bounded(submit, items, self._workers * 2, ordered):
+            error = future.exception()
+            yield BatchResult(index, item, None if error else future.result(), error)
+
+    def close(self) -> None:
+        """
+        Waits for the running requests and stops the threads.
+        """
+        self._executor.shutdown(wait=True)
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+_default_executor: Optional[BatchExecutor] = None
+_default_lock = threading.Lock()
+
+def get_default_executor() -> BatchExecutor:
+    """
+    Returns the executor shared by the batch methods that
+    weren't given one. It's closed when the interpreter exits.
+    """
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = BatchExecutor()
+            atexit.register(_default_executor.close)
+        return _default_executor
@@ -0,0 +1,211 @@
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Union
+
+import numpy as np
+
+from .batch import iter_bounded
+from .orbits import ORBIT_DTYPE, to_orbit_table
+from .tables import APPROACH_DTYPE, to_approach_table
+
+Page = Union[bytes, bytearray, memoryview, str, "os.PathLike[str]"]
+
+_TABLES = {"approaches": APPROACH_DTYPE, "orbits": ORBIT_DTYPE}
+
+class BulkChunk(NamedTuple):
+    """
+    The tables parsed from one page by the worker
+    processes. ``paths`` maps ``"approaches"`` and
+    ``"orbits"`` to ``.npy`` files and ``rows`` to their
+    lengths; the arrays themselves never go through the
+    pool.
+    """
+    index: int
+    paths: Dict[str, str]
+    rows: Dict[str, int]
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        """
+        Returns whether the page was parsed.
+        """
+        return self.error is None
+
+    def load(self, name: str) -> np.ndarray:
+        """
+        Returns the table ``name`` (``"approaches"`` or
+        ``"orbits"``) of the chunk, memory-mapped.
+        """
+        return np.load(self.paths[name], mmap_mode="r")
+
+class BulkTables(NamedTuple):
+    """
+    The merged, memory-mapped tables returned by
+    :py:meth:`BulkParser.parse`. ``approaches`` has the
+    columns of :py:data:`APPROACH_DTYPE <nasawrapper.tables.APPROACH_DTYPE>`
+    and ``orbits`` those of :py:data:`ORBIT_DTYPE <nasawrapper.orbits.ORBIT_DTYPE>`.
+    """
+    approaches: np.ndarray
+    orbits: np.ndarray
+
+def _save(path: str, table: np.ndarray) -> None:
+    # writing atomically, since the parent reads it next
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        np.save(f, table)
+    os.replace(temporary, path)
+
+def _parse(index: int, page: Page, directory: str) -> BulkChunk:
+    # runs inside the worker processes
+    try:
+        if isinstance(page, (bytes, bytearray, memoryview)):
+            data = json.loads(bytes(page))
+        else:
+            with open(page, "rb") as f:
+                data = json.loads(f.read())
+
+        tables = {"approaches": to_approach_table(data), "orbits": to_orbit_table(data)}
+        paths, rows = {}, {}
+        for name, table in tables.items():
+            paths[name] = os.path.join(directory, f"{index:08d}.{name}.npy")
+            rows[name] = len(table)
+            _save(paths[name], table)
+
+        return BulkChunk(index, paths, rows)
+    except Exception as error:
+        return BulkChunk(index, {}, {}, error)
+
+def load_tables(directory: str) -> BulkTables:
+    """
+    Opens the tables written to ``directory`` by
+    :py:meth:`BulkParser.parse`, memory-mapped.
+    """
+    return BulkTables(*(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in _TABLES))
+
+class BulkParser:
+    """
+    Decodes NeoWs browse pages (or any other NeoWs
+    response) in a pool of processes, so reprocessing a
+    full browse crawl uses every core instead of one.
+
+    Pages are given as raw JSON bytes or as paths to
+    dumped pages, which the workers read themselves. Each
+    worker decodes its page, converts it to the tables of
+    :py:func:`to_approach_table <nasawrapper.tables.to_approach_table>`
+    and :py:func:`to_orbit_table <nasawrapper.orbits.to_orbit_table>`
+    and writes them to ``.npy`` files, so only file names
+    come back from the pool instead of pickled objects.
+
+    Pages are consumed lazily, with a bounded number of
+    them in flight, so crawls don't need to be kept in
+    memory. This module needs ``numpy``.
+
+    **Parameters**
+
+        **directory** (str) - Where the tables are written.
+
+        **workers** (Optional[int]) - Number of processes.
+        Default is the number of CPUs.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.bulk import BulkParser
+            from nasawrapper.tables import group_approaches
+            import glob
+
+            parser = BulkParser("tables")
+
+            if __name__ == "__main__":
+                tables = parser.parse(sorted(glob.glob("browse/*.json")))
+                ids, distances, counts = group_approaches(tables.approaches)
+    """
+    def __init__(self, directory: str, workers: Optional[int] = None) -> None:
+        self._directory = directory
+        self._workers = workers or os.cpu_count() or 1
+
+        os.makedirs(self.chunk_directory, exist_ok=True)
+
+    @property
+    def directory(self):
+        """
+        Returns where the tables are written.
+        """
+        return self._directory
+
+    @property
+    def chunk_directory(self):
+        """
+        Returns where the tables of every page are written
+        before being merged.
+        """
+        return os.path.join(self._directory, "chunks")
+
+    @property
+    def workers(self):
+        """
+        Returns the number of processes.
+        """
+        return self._workers
+
+    def process(self, pages: Iterable[Page], ordered: bool = True) -> Iterator[BulkChunk]:
+        """
+        Parses every page of ``pages`` and yields a
+        :py:class:`BulkChunk` per page, in the same order if
+        ``ordered`` is ``True`` or as soon as they are ready
+        otherwise. Failures are yielded, not raised.
+        """
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            def submit(index: int, page: Page) -> Future:
+                return executor.submit(_parse, index, page, self.chunk_directory)
+
+            for _, _, future in iter_bounded(submit, pages, self._workers * 2, ordered):
+                yield future.result()
+
+    def merge(self, chunks: Iterable[BulkChunk]) -> BulkTables:
+        """
+        Joins the tables of ``chunks``, in page order, into
+        ``approaches.npy`` and ``orbits.npy`` inside the
+        directory, removes the chunk files and returns the
+        merged tables, memory-mapped. The first failure of
+        ``chunks`` is raised.
+        """
+        chunks = sorted(chunks, key=lambda chunk: chunk.index)
+        try:
+            for chunk in chunks:
+                if chunk.error is not None:
+                    raise chunk.error
+
+            for name, dtype in _TABLES.items():
+                path = os.path.join(self._directory, f"{name}.npy")
+                temporary = f"{path}.tmp"
+                merged = np.lib.format.open_memmap(
+                    temporary, mode="w+", dtype=dtype,
+                    shape=(sum(chunk.rows[name] for chunk in chunks),)
+                )
+                offset = 0
+                for chunk in chunks:
+                    rows = chunk.rows[name]
+                    merged[offset:offset + rows] = chunk.load(name)
+                    offset += rows
+
+                merged.flush()
+                del merged
+                os.replace(temporary, path)
+        finally:
+            for chunk in chunks:
+                for path in chunk.paths.values():
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        return load_tables(self._directory)
+
+    def parse(self, pages: Iterable[Page]) -> BulkTables:
+        """
+        Parses every page of ``pages`` with :py:meth:`process`
+        and merges them with :py:meth:`merge`.
+        """
+        return self.merge(self.process(pages, ordered=False))
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+class ResponseCache:
+    """
+    A thread-safe, in-memory LRU cache of API responses
+    that can be given to any client class. Responses are
+    stored as the raw bytes received, keyed by the request
+    URL without the API key, so clients using different
+    keys share the same entries.
+
+    **Parameters**
+
+        **max_entries** (int) - How many responses are kept.
+        The least recently used are dropped first. Default
+        is ``1024``.
+
+        **ttl** (float) - How many seconds a response is kept
+        when :py:meth:`set` isn't given a ``ttl``. Default is
+        ``3600``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod
+            from nasawrapper.cache import ResponseCache
+
+            cache = ResponseCache()
+            apod = SyncApod("DEMO_KEY", cache=cache)
+            apod.get_today_apod() # makes a request
+            apod.get_today_apod() # served from the cache
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0) -> None:
+        if not isinstance(max_entries, int) or max_entries < 1:
+            raise ValueError("'max_entries' must be a positive 'int'")
+
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def ttl(self):
+        """
+        Returns the default time to live, in seconds.
+        """
+        return self._ttl
+
+    @property
+    def hits(self):
+        """
+        Returns how many lookups found a response.
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """
+        Returns how many lookups didn't find a response.
+        """
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the response stored under ``key``, or
+        ``None`` if there's none or it expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """
+        Stores a response for ``ttl`` seconds.
+        """
+        expires = time.monotonic() + (self._ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """
+        Removes the response stored under ``key``.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every response.
+        """
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,160 @@
+import re
+import sqlite3
+import threading
+import zlib
+from typing import Dict, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from . import transport
+from .errors import CassetteMiss
+
+_MODES = ("record", "replay")
+
+def cassette_key(url: str) -> str:
+    """
+    Returns the key of ``url`` in a cassette: its path and
+    sorted parameters, without the host and the ``api_key``,
+    so recordings don't depend on the key or on
+    :py:func:`set_api_root <nasawrapper.transport.set_api_root>`.
+    """
+    parts = urlsplit(transport.cache_key(url))
+    return urlunsplit(("", "", parts.path, parts.query, ""))
+
+class Cassette:
+    """
+    Records every request made by any client to a local
+    SQLite file, or replays them from it without network.
+    Bodies are compressed, and the API key is scrubbed from
+    both the keys (see :py:func:`cassette_key`) and the
+    bodies, so cassettes can be committed.
+
+    While replaying, every recorded response is loaded
+    in memory, and a request that wasn't recorded raises
+    :py:class:`CassetteMiss <nasawrapper.errors.CassetteMiss>`.
+    Replayed requests don't use the rate budget.
+
+    **Parameters**
+
+        **path** (str) - The cassette file.
+
+        **mode** (str) - ``"record"`` or ``"replay"``. Default
+        is ``"replay"``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.cassette import Cassette
+
+            # once, with network access
+            with Cassette("neows.cassette", mode="record"):
+                SyncNeoWs("MY_KEY").get_neo_lookup(3542519)
+
+            # in CI, without network access
+            with Cassette("neows.cassette"):
+                SyncNeoWs("ANY_KEY").get_neo_lookup(3542519)
+    """
+    def __init__(self, path: str, mode: str = "replay") -> None:
+        if mode not in _MODES:
+            raise ValueError(f"'mode' must be one of {', '.join(map(repr, _MODES))}, got '{mode}'")
+
+        self._path = path
+        self._mode = mode
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, status INTEGER NOT NULL, body BLOB NOT NULL)"
+        )
+
+        self._responses: Dict[str, Tuple[int, bytes]] = {}
+        if mode == "replay":
+            for key, status, body in self._connection.execute("SELECT key, status, body FROM responses"):
+                self._responses[key] = (status, zlib.decompress(body))
+
+    @property
+    def path(self):
+        """
+        Returns the cassette file.
+        """
+        return self._path
+
+    @property
+    def mode(self):
+        """
+        Returns ``"record"`` or ``"replay"``.
+        """
+        return self._mode
+
+    @property
+    def replaying(self) -> bool:
+        """
+        Returns whether responses are replayed.
+        """
+        return self._mode == "replay"
+
+    def __len__(self) -> int:
+        if self.replaying:
+            return len(self._responses)
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def __contains__(self, url: str) -> bool:
+        key = cassette_key(url)
+        if self.replaying:
+            return key in self._responses
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+
+    def record(self, url: str, api_key: str, status: int, body: bytes) -> None:
+        """
+        Stores a response, replacing the one recorded for
+        the same key. Called by the clients while recording.
+        """
+        if api_key:
+            # NeoWs links repeat the key
+            body = re.sub(rb"api_key=" + re.escape(api_key.encode()), b"api_key=DEMO_KEY", body)
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (cassette_key(url), status, zlib.compress(body, 9))
+            )
+
+    def play(self, url: str) -> Tuple[int, bytes]:
+        """
+        Returns the recorded ``(status, body)`` of ``url``.
+        Called by the clients while replaying.
+        """
+        key = cassette_key(url)
+        response = self._responses.get(key)
+        if response is None:
+            raise CassetteMiss(f"No response was recorded for '{key}' in '{self._path}'")
+        return response
+
+    def install(self) -> "Cassette":
+        """
+        Makes every client use this cassette.
+        """
+        transport.use_cassette(self)
+        return self
+
+    def uninstall(self) -> None:
+        """
+        Makes the clients use the network again.
+        """
+        transport.use_cassette(None)
+
+    def close(self) -> None:
+        """
+        Closes the cassette file.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *args) -> None:
+        self.uninstall()
+        self.close()
@@ -0,0 +1,138 @@
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+
+from .neows import Asteroid
+from .utils.content_hash import content_hash
+from .utils.iter_asteroids import iter_asteroids
+
+ADDED = "added"
+CHANGED = "changed"
+
+class Changes(NamedTuple):
+    """
+    The ids of the asteroids that were added, changed
+    and removed between two snapshots.
+    """
+    added: Set[str]
+    changed: Set[str]
+    removed: Set[str]
+
+def load_hashes(path: str) -> Dict[str, str]:
+    """
+    Loads the hashes saved by :py:func:`save_hashes`.
+    A missing file is taken as an empty snapshot.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_hashes(path: str, hashes: Dict[str, str]) -> None:
+    """
+    Saves a map of ``neo_reference_id`` to content hash,
+    replacing the file atomically.
+    """
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(hashes, f, separators=(",", ":"))
+    os.replace(temporary, path)
+
+class ChangeTracker:
+    """
+    Finds what changed in the NeoWs catalogue since the
+    previous crawl. Only the content hash of each asteroid
+    (see :py:func:`content_hash <nasawrapper.utils.content_hash>`)
+    is kept, never the asteroids themselves, so pages can be
+    streamed through the tracker without holding either
+    snapshot in memory.
+
+    **Parameters**
+
+        **previous** (Optional[Dict[str, str]]) - The hashes of
+        the previous snapshot, as returned by :py:attr:`hashes`
+        or :py:func:`load_hashes`.
+
+        **ignore** (Iterable[str]) - Top-level fields left out
+        of the hash. Default is ``("links",)``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.changes import ChangeTracker, load_hashes, save_hashes
+
+            tracker = ChangeTracker(load_hashes("hashes.json"))
+            for status, asteroid in tracker.track(browse_pages):
+                reprocess(asteroid) # only added or changed asteroids
+
+            changes = tracker.finish()
+            print(len(changes.removed), "asteroids were removed")
+            save_hashes("hashes.json", tracker.hashes)
+    """
+    def __init__(self, previous: Optional[Dict[str, str]] = None, ignore: Iterable[str] = ("links",)) -> None:
+        self._previous = previous or {}
+        self._ignore = tuple(ignore)
+        self._hashes: Dict[str, str] = {}
+        self._added: Set[str] = set()
+        self._changed: Set[str] = set()
+
+    @property
+    def hashes(self):
+        """
+        Returns the hashes of every asteroid seen so far,
+        to be used as ``previous`` on the next crawl.
+        """
+        return self._hashes
+
+    def check(self, asteroid: Asteroid) -> Optional[str]:
+        """
+        Records an asteroid and returns ``"added"``,
+        ``"changed"`` or ``None`` if it didn't change.
+        """
+        neo_reference_id = str(asteroid["neo_reference_id"])
+        digest = content_hash(asteroid, self._ignore)
+        self._hashes[neo_reference_id] = digest
+
+        previous = self._previous.get(neo_reference_id)
+        if previous is None:
+            self._added.add(neo_reference_id)
+            return ADDED
+        if previous != digest:
+            self._changed.add(neo_reference_id)
+            return CHANGED
+
+        return None
+
+    def track(self, results: Any) -> Iterator[Tuple[str, Asteroid]]:
+        """
+        Records every asteroid of ``results`` (browse pages,
+        feeds, lookups or any iterable of them, including
+        generators) and lazily yields ``(status, asteroid)``
+        for the ones that were added or changed.
+        """
+        for asteroid in iter_asteroids(results):
+            status = self.check(asteroid)
+            if status is not None:
+                yield status, asteroid
+
+    def finish(self) -> Changes:
+        """
+        Returns the changes found so far. Asteroids of the
+        previous snapshot that weren't seen are removed.
+        """
+        removed = {neo_reference_id for neo_reference_id in self._previous if neo_reference_id not in self._hashes}
+        return Changes(set(self._added), set(self._changed), removed)
+
+def diff(previous: Dict[str, str], results: Any, ignore: Iterable[str] = ("links",)) -> Tuple[Changes, Dict[str, str]]:
+    """
+    Compares ``results`` with the hashes of a previous
+    snapshot. Returns the changes and the hashes of
+    ``results``.
+    """
+    tracker = ChangeTracker(previous, ignore)
+    for _ in tracker.track(results):
+        pass
+
+    return tracker.finish(), tracker.hashes
@@ -0,0 +1,416 @@
+"""
+The ``nasawrapper`` command, that mirrors NASA API data to local files::
+
+    nasawrapper mirror apod --output apod.ndjson
+    nasawrapper mirror neo-feed --start-date 2020-01-01 --output feed.ndjson
+    nasawrapper mirror neo-browse --format columns --output browse
+
+Requests run in parallel (``--concurrency``) and records are written as
+they arrive, either as newline-delimited JSON or, for NeoWs, as one raw
+column file per field of :py:data:`APPROACH_DTYPE <nasawrapper.tables.APPROACH_DTYPE>`.
+Progress is saved to ``<output>.checkpoint`` after every request, so an
+interrupted mirror resumes where it stopped when run again.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .rate_limit import RateBudget
+from .transport import API_ROOT, raise_for_error
+
+APOD_START = datetime(1995, 6, 16)
+
+class Checkpoint:
+    """
+    The progress of a mirror: which requests were written,
+    and where the output ended after the last of them.
+    It's rewritten atomically after every request.
+
+    **Parameters**
+
+        **path** (str) - The checkpoint file.
+
+        **command** (str) - The mirror it belongs to, like
+        ``"apod"``.
+    """
+    def __init__(self, path: str, command: str) -> None:
+        self._path = path
+        self._command = command
+        self._done: Set[str] = set()
+        self.offset = 0
+        self.meta: Dict[str, Any] = {}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state["command"] != command:
+                raise ValueError(f"'{path}' is the checkpoint of 'mirror {state['command']}', not 'mirror {command}'")
+            self._done = set(state["done"])
+            self.offset = state["offset"]
+            self.meta = state.get("meta", {})
+
+    @property
+    def path(self):
+        """
+        Returns the checkpoint file.
+        """
+        return self._path
+
+    @property
+    def done(self):
+        """
+        Returns the written requests.
+        """
+        return self._done
+
+    def mark(self, unit: str, offset: int) -> None:
+        """
+        Records that ``unit`` was written, and that the
+        output now ends at ``offset``.
+        """
+        self._done.add(unit)
+        self.offset = offset
+        self.save()
+
+    def reset(self) -> None:
+        """
+        Forgets every written request, so the mirror starts
+        over with an empty output.
+        """
+        self._done = set()
+        self.offset = 0
+        self.meta = {}
+        self.save()
+
+    def save(self) -> None:
+        """
+        Writes the checkpoint file.
+        """
+        temporary = f"{self._path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"command": self._command, "done": sorted(self._done), "offset": self.offset, "meta": self.meta}, f)
+        os.replace(temporary, self._path)
+
+class NdjsonWriter:
+    """
+    Appends records to a newline-delimited JSON file. Its
+    offset is the size of the file, in bytes.
+    """
+    def __init__(self, path: str, offset: int, records: Callable[[Any], Iterable[Any]]) -> None:
+        self._records = records
+        self._file = open(path, "r+b" if os.path.exists(path) else "w+b")
+
+        # dropping what was written after the last checkpoint
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    @property
+    def offset(self) -> int:
+        """
+        Returns the size of the file.
+        """
+        return self._file.tell()
+
+    def write(self, result: Any) -> int:
+        """
+        Writes the records of ``result`` and returns how
+        many were written.
+        """
+        lines = [json.dumps(record, separators=(",", ":")) for record in self._records(result)]
+        if lines:
+            self._file.write(("\n".join(lines) + "\n").encode())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        return len(lines)
+
+    def close(self) -> None:
+        """
+        Closes the file.
+        """
+        self._file.close()
+
+class ColumnWriter:
+    """
+    Appends the close approaches of NeoWs results to a
+    directory holding one raw file per column of
+    :py:data:`APPROACH_DTYPE <nasawrapper.tables.APPROACH_DTYPE>`,
+    readable with :py:func:`read_columns`. Its offset is
+    the number of rows.
+    """
+    def __init__(self, directory: str, offset: int) -> None:
+        import numpy as np
+
+        from .tables import APPROACH_DTYPE, to_approach_table
+
+        self._to_table = to_approach_table
+        self._rows = offset
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "columns.json"), "w") as f:
+            json.dump({name: np.dtype(APPROACH_DTYPE[name]).str for name in APPROACH_DTYPE.names}, f)
+
+        self._files = {}
+        for name in APPROACH_DTYPE.names:
+            path = os.path.join(directory, f"{name}.bin")
+            column = open(path, "r+b" if os.path.exists(path) else "w+b")
+            # dropping what was written after the last checkpoint
+            column.truncate(offset * APPROACH_DTYPE[name].itemsize)
+            column.seek(0, os.SEEK_END)
+            self._files[name] = column
+
+    @property
+    def offset(self) -> int:
+        """
+        Returns the number of rows.
+        """
+        return self._rows
+
+    def write(self, result: Any) -> int:
+        """
+        Writes the close approaches of ``result`` and
+        returns how many were written.
+        """
+        table = self._to_table(result)
+        for name, column in self._files.items():
+            column.write(table[name].tobytes())
+            column.flush()
+            os.fsync(column.fileno())
+        self._rows += len(table)
+        return len(table)
+
+    def close(self) -> None:
+        """
+        Closes the column files.
+        """
+        for column in self._files.values():
+            column.close()
+
+def read_columns(directory: str) -> Dict[str, Any]:
+    """
+    Returns the columns written by ``--format columns``,
+    memory-mapped, as a dict of NumPy arrays.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.cli import read_columns
+
+            columns = read_columns("browse")
+            print(columns["miss_distance_lunar"].min())
+    """
+    import numpy as np
+
+    with open(os.path.join(directory, "columns.json")) as f:
+        dtypes = json.load(f)
+
+    columns = {}
+    for name, dtype in dtypes.items():
+        path = os.path.join(directory, f"{name}.bin")
+        if os.path.getsize(path):
+            columns[name] = np.memmap(path, dtype=dtype, mode="r")
+        else:
+            columns[name] = np.empty(0, dtype=dtype)
+    return columns
+
+def _date(value: str) -> datetime:
+    if value == "today":
+        return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a 'YYYY-MM-DD' date")
+
+def _windows(start: datetime, end: datetime, days: int) -> List[str]:
+    windows = []
+    while start <= end:
+        last = min(start + timedelta(days=days - 1), end)
+        windows.append(f"{start:%Y-%m-%d}/{last:%Y-%m-%d}")
+        start = last + timedelta(days=1)
+    return windows
+
+def _window_options(unit: str) -> Dict[str, datetime]:
+    start, end = unit.split("/")
+    return {"start_date": datetime.strptime(start, "%Y-%m-%d"), "end_date": datetime.strptime(end, "%Y-%m-%d")}
+
+def _expect(result: Any, api_key: str) -> Any:
+    # some endpoints send their errors as a successful body
+    raise_for_error(result, api_key)
+    return result
+
+def _mirror(
+    arguments: argparse.Namespace,
+    units: List[str],
+    fetch: Callable[[str], Any],
+    writer: Any,
+    checkpoint: Checkpoint
+) -> int:
+    from .batch import BatchExecutor
+
+    pending = [unit for unit in units if unit not in checkpoint.done]
+    records = failures = 0
+    log = (lambda *args: None) if arguments.quiet else (lambda *args: print(*args, file=sys.stderr))
+    log(f"{len(units) - len(pending)} of {len(units)} requests already mirrored")
+
+    try:
+        with BatchExecutor(arguments.concurrency) as executor:
+            for item in executor.map(fetch, pending, ordered=False):
+                if not item.ok:
+                    failures += 1
+                    print(f"{item.item}: {item.error.__class__.__name__}: {item.error}", file=sys.stderr)
+                    continue
+
+                records += writer.write(item.result)
+                checkpoint.mark(item.item, writer.offset)
+                log(f"{item.item}: {len(checkpoint.done)}/{len(units)} done, {records} records written")
+    finally:
+        writer.close()
+
+    log(f"{records} records written, {failures} requests failed")
+    if failures:
+        print(f"Run the same command again to retry the {failures} failed requests", file=sys.stderr)
+        return 1
+    return 0
+
+def _clients(arguments: argparse.Namespace) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"api_root": arguments.api_root}
+    if arguments.rate_limit:
+        options["budget"] = RateBudget(arguments.rate_limit)
+    return options
+
+def _checkpoint(arguments: argparse.Namespace, command: str) -> Checkpoint:
+    checkpoint_path = arguments.checkpoint or f"{arguments.output.rstrip(os.sep)}.checkpoint"
+    if arguments.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    try:
+        checkpoint = Checkpoint(checkpoint_path, f"{command} --format {arguments.format}")
+    except ValueError as error:
+        sys.exit(f"nasawrapper: error: {error}, use '--restart' to start over")
+    return checkpoint
+
+def _writer(arguments: argparse.Namespace, checkpoint: Checkpoint, records: Callable[[Any], Iterable[Any]]) -> Any:
+    if arguments.format == "columns":
+        writer = ColumnWriter(arguments.output, checkpoint.offset)
+    else:
+        writer = NdjsonWriter(arguments.output, checkpoint.offset, records)
+    return writer
+
+def mirror_apod(arguments: argparse.Namespace) -> int:
+    from .apod import SyncApod
+
+    apod = SyncApod(arguments.api_key, **_clients(arguments))
+    units = _windows(arguments.start_date or APOD_START, arguments.end_date, arguments.window)
+    checkpoint = _checkpoint(arguments, "apod")
+    writer = _writer(arguments, checkpoint, lambda result: result if isinstance(result, list) else [result])
+    def fetch(unit: str) -> Any:
+        return _expect(apod.get_apod(_window_options(unit)), arguments.api_key)
+
+    return _mirror(arguments, units, fetch, writer, checkpoint)
+
+def mirror_neo_feed(arguments: argparse.Namespace) -> int:
+    from .neows import SyncNeoWs
+    from .utils.iter_asteroids import iter_asteroids
+
+    neows = SyncNeoWs(arguments.api_key, **_clients(arguments))
+    units = _windows(arguments.start_date, arguments.end_date, arguments.window)
+    checkpoint = _checkpoint(arguments, "neo-feed")
+    writer = _writer(arguments, checkpoint, lambda result: list(iter_asteroids(result)))
+    def fetch(unit: str) -> Any:
+        return _expect(neows.get_neo_feed(_window_options(unit)), arguments.api_key)
+
+    return _mirror(arguments, units, fetch, writer, checkpoint)
+
+def mirror_neo_browse(arguments: argparse.Namespace) -> int:
+    from .neows import SyncNeoWs
+
+    neows = SyncNeoWs(arguments.api_key, **_clients(arguments))
+    checkpoint = _checkpoint(arguments, "neo-browse")
+    # the pages written with another size hold other asteroids,
+    # so they can't be told apart from the new ones
+    if checkpoint.meta.get("size", arguments.page_size) != arguments.page_size:
+        if not arguments.quiet:
+            print(f"The page size changed from {checkpoint.meta['size']}, starting over", file=sys.stderr)
+        checkpoint.reset()
+    writer = _writer(arguments, checkpoint, lambda result: result["near_earth_objects"])
+
+    # the number of pages is only known from a response,
+    # which is then written as the first page
+    prefetched = {}
+    total = checkpoint.meta.get("total_pages")
+    if total is None or checkpoint.meta.get("size") != arguments.page_size:
+        try:
+            first = neows.get_neo_browse(0, arguments.page_size)
+            total = _expect(first, arguments.api_key)["page"]["total_pages"]
+            prefetched["page 0"] = first
+        except Exception as error:
+            sys.exit(f"nasawrapper: error: the number of pages is unknown, {error}")
+        checkpoint.meta.update(total_pages=total, size=arguments.page_size)
+        checkpoint.save()
+    if arguments.max_pages is not None:
+        total = min(total, arguments.max_pages)
+
+    units = [f"page {page}" for page in range(total)]
+    def fetch(unit: str) -> Any:
+        result = prefetched.pop(unit, None)
+        if result is None:
+            result = neows.get_neo_browse(int(unit.split()[1]), arguments.page_size)
+        return _expect(result, arguments.api_key)
+
+    return _mirror(arguments, units, fetch, writer, checkpoint)
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="nasawrapper", description=__doc__.split("\n\n")[0].strip().rstrip(":"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    mirror = commands.add_parser("mirror", help="mirror NASA API data to local files")
+    sources = mirror.add_subparsers(dest="source", required=True)
+
+    def source(name: str, description: str, run: Callable[[argparse.Namespace], int], formats: List[str]) -> argparse.ArgumentParser:
+        subparser = sources.add_parser(name, help=description, description=description)
+        subparser.set_defaults(run=run)
+        subparser.add_argument("--output", "-o", required=True, help="the output file, or directory for '--format columns'")
+        subparser.add_argument("--format", choices=formats, default="ndjson", help="'ndjson' (default) or one raw file per column")
+        subparser.add_argument("--concurrency", "-j", type=int, default=4, help="how many requests run at once (default: 4)")
+        subparser.add_argument("--checkpoint", help="the checkpoint file (default: '<output>.checkpoint')")
+        subparser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+        subparser.add_argument("--api-key", default=os.environ.get("NASA_API_KEY", "DEMO_KEY"), help="the API key (default: $NASA_API_KEY or DEMO_KEY)")
+        subparser.add_argument("--api-root", default=os.environ.get("NASA_API_ROOT", API_ROOT), help="where requests are sent, like a 'nasawrapper.proxy'")
+        subparser.add_argument("--rate-limit", type=int, help="requests allowed per hour, shared by every request")
+        subparser.add_argument("--quiet", "-q", action="store_true", help="only print errors")
+        return subparser
+
+    apod = source("apod", "Mirrors every Astronomy Picture of the Day between two dates.", mirror_apod, ["ndjson"])
+    apod.add_argument("--start-date", type=_date, help=f"YYYY-MM-DD (default: {APOD_START:%Y-%m-%d})")
+    apod.add_argument("--end-date", type=_date, default="today", help="YYYY-MM-DD (default: today)")
+    apod.add_argument("--window", type=int, default=30, help="days per request (default: 30)")
+
+    feed = source("neo-feed", "Mirrors the NeoWs feed between two dates, one asteroid per record.", mirror_neo_feed, ["ndjson", "columns"])
+    feed.add_argument("--start-date", type=_date, required=True, help="YYYY-MM-DD")
+    feed.add_argument("--end-date", type=_date, default="today", help="YYYY-MM-DD (default: today)")
+    feed.add_argument("--window", type=int, default=7, help="days per request, up to 7 (default: 7)")
+
+    browse = source("neo-browse", "Mirrors the whole NeoWs asteroid catalogue, one asteroid per record.", mirror_neo_browse, ["ndjson", "columns"])
+    browse.add_argument("--page-size", type=int, default=20, help="asteroids per request, up to 20 (default: 20)")
+    browse.add_argument("--max-pages", type=int, help="stop after this many pages")
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _parser()
+    arguments = parser.parse_args(argv)
+    if arguments.concurrency < 1:
+        parser.error("'--concurrency' must be positive")
+    if arguments.source == "neo-feed" and not 1 <= arguments.window <= 7:
+        parser.error("'--window' must be between 1 and 7 days for NeoWs feeds")
+    if arguments.source == "apod" and arguments.window < 1:
+        parser.error("'--window' must be positive")
+
+    try:
+        return arguments.run(arguments)
+    except KeyboardInterrupt:
+        print("Interrupted, run the same command again to resume", file=sys.stderr)
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
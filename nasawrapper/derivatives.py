@@ -0,0 +1,218 @@
+import hashlib
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+from PIL import Image
+
+from .apod import SyncApod
+from .batch import iter_bounded
+from .download import ApodDownloader
+
+class Derivative(NamedTuple):
+    """
+    Describes an image derived from an APOD picture.
+    The image is resized to fit inside ``size`` (keeping
+    its aspect ratio and never upscaling) and saved as
+    ``format`` (``"JPEG"``, ``"WEBP"`` or ``"PNG"``).
+    """
+    name: str
+    size: Tuple[int, int]
+    format: str = "JPEG"
+    quality: int = 85
+
+    @property
+    def extension(self) -> str:
+        """
+        Returns the file extension of the derivative.
+        """
+        return {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}.get(self.format.upper(), f".{self.format.lower()}")
+
+    @property
+    def key(self) -> str:
+        """
+        Returns a string that changes whenever the
+        output of the derivative would change.
+        """
+        return f"{self.name}-{self.size[0]}x{self.size[1]}-{self.format.lower()}-q{self.quality}"
+
+DEFAULT_DERIVATIVES = (
+    Derivative("thumbnail", (256, 256), "JPEG", 80),
+    Derivative("web", (1280, 1280), "WEBP", 85)
+)
+"""
+The derivatives made by :py:class:`DerivativePipeline`
+by default.
+"""
+
+class DerivativeResult(NamedTuple):
+    """
+    The derivatives made from one source image. ``paths``
+    maps each derivative name to its file in the cache.
+    """
+    source: str
+    source_hash: str
+    paths: Dict[str, str]
+    created: int
+    error: Optional[Exception] = None
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+def _cache_path(directory: str, source_hash: str, derivative: Derivative) -> str:
+    return os.path.join(directory, source_hash[:2], f"{source_hash}-{derivative.key}{derivative.extension}")
+
+def _render(source: str, directory: str, derivatives: Tuple[Derivative, ...]) -> DerivativeResult:
+    # runs inside the worker processes
+    try:
+        source_hash = _hash_file(source)
+        paths = {derivative.name: _cache_path(directory, source_hash, derivative) for derivative in derivatives}
+        missing = [derivative for derivative in derivatives if not os.path.exists(paths[derivative.name])]
+        if not missing:
+            return DerivativeResult(source, source_hash, paths, 0)
+
+        os.makedirs(os.path.dirname(paths[missing[0].name]), exist_ok=True)
+        with Image.open(source) as image:
+            # decoding a reduced image when the format supports it
+            largest = (max(d.size[0] for d in missing), max(d.size[1] for d in missing))
+            image.draft("RGB", largest)
+            image.load()
+
+            for derivative in missing:
+                copy = image.copy()
+                copy.thumbnail(derivative.size)
+                if derivative.format.upper() == "JPEG" and copy.mode not in ("RGB", "L"):
+                    copy = copy.convert("RGB")
+
+                # writing atomically, since other processes may read the cache
+                path = paths[derivative.name]
+                temporary = f"{path}.{os.getpid()}.tmp"
+                copy.save(temporary, derivative.format, quality=derivative.quality)
+                os.replace(temporary, path)
+
+        return DerivativeResult(source, source_hash, paths, len(missing))
+    except Exception as error:
+        return DerivativeResult(source, "", {}, 0, error)
+
+class DerivativePipeline:
+    """
+    Makes resized copies of downloaded APOD images in a
+    pool of processes, since decoding and resizing images
+    is CPU-bound.
+
+    Derivatives are stored in a content-addressed cache:
+    the file name is made of the SHA-256 of the source
+    image and the settings of the derivative, so every
+    image is processed only once, even if it's downloaded
+    again or appears under different dates.
+
+    Sources are consumed lazily, with a bounded number of
+    images in flight, so long date ranges don't need to be
+    kept in memory. This module needs ``Pillow``.
+
+    **Parameters**
+
+        **directory** (str) - The cache directory.
+
+        **derivatives** (Iterable[Derivative]) - What to make.
+        Default is :py:data:`DEFAULT_DERIVATIVES`.
+
+        **workers** (Optional[int]) - Number of processes.
+        Default is the number of CPUs.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.derivatives import DerivativePipeline, Derivative
+
+            pipeline = DerivativePipeline("cache", [
+                Derivative("thumbnail", (200, 200)),
+                Derivative("web", (1024, 1024), "WEBP")
+            ])
+
+            if __name__ == "__main__":
+                for result in pipeline.process(["apod/2021-01-01.jpg", "apod/2021-01-02.jpg"]):
+                    print(result.paths["thumbnail"])
+    """
+    def __init__(
+        self,
+        directory: str,
+        derivatives: Iterable[Derivative] = DEFAULT_DERIVATIVES,
+        workers: Optional[int] = None
+    ) -> None:
+        self._directory = directory
+        self._derivatives = tuple(derivatives)
+        self._workers = workers or os.cpu_count() or 1
+
+        names = [derivative.name for derivative in self._derivatives]
+        if len(set(names)) != len(names):
+            raise ValueError("derivative names must be unique")
+
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def directory(self):
+        """
+        Returns the cache directory.
+        """
+        return self._directory
+
+    @property
+    def derivatives(self):
+        """
+        Returns the derivatives made by the pipeline.
+        """
+        return self._derivatives
+
+    def cached(self, source: str) -> Optional[Dict[str, str]]:
+        """
+        Returns the cached derivatives of ``source`` or
+        ``None`` if any of them is missing.
+        """
+        source_hash = _hash_file(source)
+        paths = {derivative.name: _cache_path(self._directory, source_hash, derivative) for derivative in self._derivatives}
+        if all(os.path.exists(path) for path in paths.values()):
+            return paths
+        return None
+
+    def process(self, sources: Iterable[str], ordered: bool = True) -> Iterator[DerivativeResult]:
+        """
+        Makes the derivatives of every image path of
+        ``sources`` and yields a :py:class:`DerivativeResult`
+        per source, in the same order if ``ordered`` is
+        ``True`` or as soon as they are ready otherwise.
+        Failures are yielded, not raised.
+        """
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            def submit(index: int, source: str) -> Future:
+                return executor.submit(_render, source, self._directory, self._derivatives)
+
+            for _, _, future in iter_bounded(submit, sources, self._workers * 2, ordered):
+                yield future.result()
+
+    def process_range(
+        self,
+        downloader: ApodDownloader,
+        apod: Union[str, SyncApod],
+        start_date: datetime,
+        end_date: datetime
+    ) -> Iterator[DerivativeResult]:
+        """
+        Downloads the APODs between ``start_date`` and
+        ``end_date`` with ``downloader`` (see
+        :py:meth:`download_range <nasawrapper.download.ApodDownloader.download_range>`)
+        and makes the derivatives of every downloaded image.
+        Images are given to the pool as soon as they are
+        downloaded, so decoding overlaps the downloads.
+        """
+        return self.process((
+            download.path for download in downloader.iter_range(apod, start_date, end_date)
+            if download.status != "failed" and download.path
+        ), ordered=False)
@@ -0,0 +1,343 @@
+import hashlib
+import json
+import os
+import posixpath
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+
+from .apod import ApodResponse, SyncApod
+from .batch import get_default_executor
+
+MANIFEST_NAME = ".manifest.json"
+
+class DownloadResult(NamedTuple):
+    """
+    The outcome of downloading one APOD media file.
+    ``status`` is ``"downloaded"``, ``"resumed"``,
+    ``"skipped"`` or ``"failed"``.
+    """
+    date: str
+    url: str
+    path: str
+    status: str
+    error: Optional[Exception] = None
+
+class ApodDownloader:
+    """
+    Downloads the media of APOD results to a directory,
+    many files at a time, over a single pooled
+    :py:class:`requests.Session`, by default the one shared
+    by the :py:func:`default executor <nasawrapper.batch.get_default_executor>`.
+
+    Files are streamed to disk in chunks. An interrupted
+    download is kept as ``<file>.part`` and resumed later
+    with an HTTP ``Range`` request. Finished files are
+    recorded, with their size and SHA-256, in a manifest
+    inside the directory, so files that are already there
+    are skipped without any request.
+
+    Videos have no image to download, but when the
+    results were requested with ``thumbs`` their
+    thumbnail is downloaded instead.
+
+    **Parameters**
+
+        **directory** (str) - Where the files are saved.
+
+        **hd** (bool) - Download ``hdurl`` instead of ``url``
+        when available. Default is ``False``.
+
+        **concurrency** (int) - How many files are downloaded
+        at the same time. Default is ``4``.
+
+        **chunk_size** (int) - Size, in bytes, of the chunks
+        written to disk. Default is ``65536``.
+
+        **session** (Optional[:py:class:`requests.Session`]) - The
+        session used to download. Default is the shared one.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod
+            from nasawrapper.download import ApodDownloader
+            from datetime import datetime
+
+            apod = SyncApod("DEMO_KEY")
+            results = apod.get_apod({
+                "start_date": datetime(2021, 1, 1),
+                "end_date": datetime(2021, 1, 31),
+                "thumbs": True
+            })
+
+            downloader = ApodDownloader("apod", hd=True, concurrency=8)
+            for result in downloader.download(results):
+                print(result.date, result.status)
+    """
+    def __init__(
+        self,
+        directory: str,
+        hd: bool = False,
+        concurrency: int = 4,
+        chunk_size: int = 65536,
+        session: Optional[requests.Session] = None
+    ) -> None:
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError("'concurrency' must be a positive 'int'")
+
+        self._directory = directory
+        self._hd = hd
+        self._concurrency = concurrency
+        self._chunk_size = chunk_size
+        self._session = session or get_default_executor().session
+
+        os.makedirs(directory, exist_ok=True)
+        self._manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, encoding="utf-8") as f:
+                self._manifest = json.load(f)
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        """
+        Returns the download directory.
+        """
+        return self._directory
+
+    @property
+    def manifest(self):
+        """
+        Returns the files recorded in the manifest.
+        """
+        return self._manifest
+
+    def media_url(self, result: ApodResponse) -> Optional[str]:
+        """
+        Returns the URL that would be downloaded for
+        ``result``, or ``None`` if there's nothing to
+        download (a video without thumbnail).
+        """
+        if result.get("media_type") == "video":
+            return result.get("thumbnail_url")
+
+        if self._hd:
+            # the API calls it 'hdurl'
+            return result.get("hdurl") or result.get("hd_url") or result.get("url")
+        return result.get("url")
+
+    def _filename(self, result: ApodResponse, url: str) -> str:
+        extension = posixpath.splitext(urlparse(url).path)[1] or ".jpg"
+        if result.get("media_type") == "video":
+            suffix = "-thumb"
+        elif self._hd and url in (result.get("hdurl"), result.get("hd_url")):
+            suffix = "-hd"
+        else:
+            # no HD version, the SD file keeps its usual name
+            suffix = ""
+        return f"{result['date']}{suffix}{extension}"
+
+    def download(self, results: Union[ApodResponse, Iterable[ApodResponse]]) -> List[DownloadResult]:
+        """
+        Downloads the media of ``results`` and returns a
+        :py:class:`DownloadResult` per result, in the same
+        order. Failures are returned, not raised.
+        """
+        downloads = sorted(self._iter_download(results), key=lambda download: download[0])
+        return [download for _, download in downloads]
+
+    def iter_download(self, results: Union[ApodResponse, Iterable[ApodResponse]]) -> Iterator[DownloadResult]:
+        """
+        Like :py:meth:`download`, but yields every
+        :py:class:`DownloadResult` as soon as its file is
+        ready, so they can be processed while the others
+        are still downloading.
+        """
+        for _, download in self._iter_download(results):
+            yield download
+
+    def _iter_download(self, results: Union[ApodResponse, Iterable[ApodResponse]]) -> Iterator[Tuple[int, DownloadResult]]:
+        if isinstance(results, dict):
+            results = [results]
+
+        def copy(original: DownloadResult, result: ApodResponse) -> DownloadResult:
+            return original._replace(
+                date=result.get("date", ""),
+                status="failed" if original.status == "failed" else "skipped"
+            )
+
+        # results saved to the same file (like a date given twice)
+        # are only downloaded once, so they don't race on it
+        copies: Dict[str, List[Tuple[int, ApodResponse]]] = {}
+        finished: Dict[str, DownloadResult] = {}
+        # results are read a few at a time, so long ranges
+        # aren't all queued at once
+        limit = self._concurrency * 2
+
+        def drain(futures: Dict[Future, Tuple[int, str]], block: bool) -> Iterator[Tuple[int, DownloadResult]]:
+            done = wait(futures, return_when=FIRST_COMPLETED)[0] if block else [future for future in futures if future.done()]
+            for future in done:
+                index, filename = futures.pop(future)
+                original = finished[filename] = future.result()
+                yield index, original
+                for index, result in copies.pop(filename):
+                    yield index, copy(original, result)
+
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            futures: Dict[Future, Tuple[int, str]] = {}
+            for index, result in enumerate(results):
+                url = self.media_url(result)
+                if not url:
+                    yield index, DownloadResult(result.get("date", ""), "", "", "skipped")
+                    continue
+
+                filename = self._filename(result, url)
+                if filename in finished:
+                    yield index, copy(finished[filename], result)
+                elif filename in copies:
+                    copies[filename].append((index, result))
+                else:
+                    copies[filename] = []
+                    futures[executor.submit(self._download, result)] = index, filename
+
+                yield from drain(futures, len(futures) >= limit)
+
+            while futures:
+                yield from drain(futures, True)
+
+    def _range(self, apod: Union[str, SyncApod], start_date: datetime, end_date: datetime) -> ApodResponse:
+        if isinstance(apod, str):
+            apod = SyncApod(apod)
+
+        return apod.get_apod({
+            "start_date": start_date,
+            "end_date": end_date,
+            "thumbs": True
+        })
+
+    def download_range(self, apod: Union[str, SyncApod], start_date: datetime, end_date: datetime) -> List[DownloadResult]:
+        """
+        Requests the APODs between ``start_date`` and
+        ``end_date`` (with thumbnails) and downloads
+        their media. ``apod`` is the :py:class:`SyncApod <nasawrapper.apod.SyncApod>`
+        making the request, so its ``api_root``, cache, rate
+        budget and engine are used, or an API key.
+        """
+        return self.download(self._range(apod, start_date, end_date))
+
+    def iter_range(self, apod: Union[str, SyncApod], start_date: datetime, end_date: datetime) -> Iterator[DownloadResult]:
+        """
+        Like :py:meth:`download_range`, but yields the
+        results as :py:meth:`iter_download` does.
+        """
+        return self.iter_download(self._range(apod, start_date, end_date))
+
+    def _download(self, result: ApodResponse) -> DownloadResult:
+        url = self.media_url(result)
+        if not url:
+            return DownloadResult(result.get("date", ""), "", "", "skipped")
+
+        filename = self._filename(result, url)
+        path = os.path.join(self._directory, filename)
+
+        try:
+            entry = self._manifest.get(filename)
+            if entry and entry["url"] == url and os.path.exists(path) and os.path.getsize(path) == entry["size"]:
+                return DownloadResult(result["date"], url, path, "skipped")
+
+            # a file that's not in the manifest is kept if its size matches
+            if not entry and os.path.exists(path):
+                response = self._session.head(url, allow_redirects=True, timeout=60)
+                if response.ok and response.headers.get("Content-Length") == str(os.path.getsize(path)):
+                    self._record(filename, {
+                        "url": url,
+                        "size": os.path.getsize(path),
+                        "sha256": self._hash(path)
+                    })
+                    return DownloadResult(result["date"], url, path, "skipped")
+
+            status = self._fetch(url, path)
+        except Exception as error:
+            return DownloadResult(result["date"], url, path, "failed", error)
+
+        return DownloadResult(result["date"], url, path, status)
+
+    def _fetch(self, url: str, path: str) -> str:
+        partial = f"{path}.part"
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        with self._session.get(url, headers=headers, stream=True, timeout=60) as response:
+            if response.status_code == 416:
+                # the partial file is complete only if it has
+                # the size of the file, otherwise it's stale
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total != str(offset):
+                    response.close()
+                    os.remove(partial)
+                    return self._fetch(url, path)
+                status = "resumed"
+            else:
+                response.raise_for_status()
+                resumed = offset and response.status_code == 206
+                status = "resumed" if resumed else "downloaded"
+
+                with open(partial, "ab" if resumed else "wb") as f:
+                    for chunk in response.iter_content(self._chunk_size):
+                        f.write(chunk)
+
+        # hashing from disk also covers the resumed part
+        digest = self._hash(partial)
+        os.replace(partial, path)
+        self._record(os.path.basename(path), {
+            "url": url,
+            "size": os.path.getsize(path),
+            "sha256": digest
+        })
+        return status
+
+    def _hash(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self._chunk_size), b""):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def _record(self, filename: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._manifest[filename] = entry
+            self._save_manifest()
+
+    def _save_manifest(self) -> None:
+        temporary = f"{self._manifest_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(temporary, self._manifest_path)
+
+    def verify(self) -> List[str]:
+        """
+        Checks the SHA-256 of every file of the manifest
+        and returns the names of the ones that don't match,
+        removing them from the manifest so they are
+        downloaded again.
+        """
+        broken = []
+        for filename, entry in list(self._manifest.items()):
+            path = os.path.join(self._directory, filename)
+            if not os.path.exists(path) or self._hash(path) != entry["sha256"]:
+                broken.append(filename)
+
+        with self._lock:
+            for filename in broken:
+                del self._manifest[filename]
+            self._save_manifest()
+
+        return broken
@@ -0,0 +1,210 @@
+import asyncio
+import atexit
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple
+
+from .transport import get_json_async, open_session
+
+class AsyncEngine:
+    """
+    An event loop running in a dedicated background thread,
+    with one pooled :py:class:`aiohttp.ClientSession`, that
+    the sync clients can delegate their requests to. Blocking
+    calls then reuse connections, identical requests in
+    flight are made only once, and batches of requests made
+    with ``get_many`` run concurrently, without the caller
+    using asyncio.
+
+    Most programs can use the shared engine returned by
+    :py:func:`get_default_engine`.
+
+    **Parameters**
+
+        **limit** (int) - How many connections can be open at
+        once. Default is ``100``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.engine import AsyncEngine
+
+            with AsyncEngine(limit=20) as engine:
+                neows = SyncNeoWs("DEMO_KEY", engine=engine)
+                asteroids = neows.get_many([3542519, 2000433, 3726710])
+    """
+    def __init__(self, limit: int = 100) -> None:
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError("'limit' must be a positive 'int'")
+
+        self._limit = limit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Any = None
+        self._inflight: Dict[Tuple[str, Optional[str]], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        """
+        Returns how many connections can be open at once.
+        """
+        return self._limit
+
+    @property
+    def loop(self):
+        """
+        Returns the event loop, or ``None`` if the engine
+        isn't running.
+        """
+        return self._loop
+
+    def start(self) -> "AsyncEngine":
+        """
+        Starts the event loop thread and opens the session.
+        It's called by the first request otherwise.
+        """
+        with self._lock:
+            if self._loop is not None:
+                return self
+
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="nasawrapper-engine", daemon=True)
+            self._thread.start()
+            self._loop = loop
+
+        asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+        return self
+
+    async def _open(self) -> None:
+        self._session = open_session(self._limit)
+
+    def submit(self, coroutine: Awaitable[Any]) -> Future:
+        """
+        Runs ``coroutine`` on the engine's loop and returns a
+        :py:class:`concurrent.futures.Future` of its result.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine: Awaitable[Any]) -> Any:
+        """
+        Runs ``coroutine`` on the engine's loop and waits
+        for its result.
+        """
+        if self._loop is not None and threading.current_thread() is self._thread:
+            raise RuntimeError("the engine can't wait for itself, await the coroutine instead")
+        return self.submit(coroutine).result()
+
+    async def fetch(
+        self,
+        url: str,
+        api_key: str,
+        cache: Any = None,
+        budget: Any = None,
+        not_found: Optional[str] = None,
+        coalesce: bool = True
+    ) -> Any:
+        """
+        |coro|
+
+        Same thing as :py:func:`get_json_async <nasawrapper.transport.get_json_async>`,
+        with the engine's session. With ``coalesce``, a request
+        identical to one in flight waits for its response
+        instead, and gets a copy of it.
+        """
+        if not coalesce:
+            return await get_json_async(url, api_key, cache, budget, not_found, self._session)
+
+        key = (url, not_found)
+        shared = self._inflight.get(key)
+        if shared is not None:
+            return copy.deepcopy(await asyncio.shield(shared))
+
+        shared = self._inflight[key] = asyncio.get_event_loop().create_future()
+        try:
+            result = await get_json_async(url, api_key, cache, budget, not_found, self._session)
+        except BaseException as error:
+            if isinstance(error, asyncio.CancelledError):
+                shared.cancel()
+            else:
+                shared.set_exception(error)
+                # marking it as retrieved, in case nobody else waits
+                shared.exception()
+            raise
+        else:
+            shared.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def get_json(
+        self,
+        url: str,
+        api_key: str,
+        cache: Any = None,
+        budget: Any = None,
+        not_found: Optional[str] = None,
+        coalesce: bool = True
+    ) -> Any:
+        """
+        Blocking version of :py:meth:`fetch`, used by the
+        sync clients.
+        """
+        return self.run(self.fetch(url, api_key, cache, budget, not_found, coalesce))
+
+    def gather(self, coroutines: Iterable[Awaitable[Any]], return_exceptions: bool = False) -> List[Any]:
+        """
+        Runs ``coroutines`` concurrently on the engine's loop
+        and returns their results in order. With
+        ``return_exceptions``, errors are returned in place
+        of results instead of raised.
+        """
+        coroutines = list(coroutines)
+
+        async def gather() -> List[Any]:
+            return list(await asyncio.gather(*coroutines, return_exceptions=return_exceptions))
+
+        return self.run(gather())
+
+    def close(self) -> None:
+        """
+        Closes the session and stops the loop thread.
+        """
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        async def close_session() -> None:
+            await self._session.close()
+
+        asyncio.run_coroutine_threadsafe(close_session(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+        self._session = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+_default_engine: Optional[AsyncEngine] = None
+_default_lock = threading.Lock()
+
+def get_default_engine() -> AsyncEngine:
+    """
+    Returns the engine shared by the sync clients that
+    weren't given one. It's closed when the interpreter exits.
+    """
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = AsyncEngine()
+            atexit.register(_default_engine.close)
+        return _default_engine
@@ -30,4 +30,18 @@ class RateLimitError(Exception):
     """
     Exception that's raised when the develper
     make too many requests to the API
-    """
\ No newline at end of file
+    """
+
+class ApiError(Exception):
+    """
+    Exception that's raised when the API answers
+    with an error
+    """
+    pass
+
+class CassetteMiss(Exception):
+    """
+    Exception that's raised when a request has no
+    recorded response while replaying a cassette
+    """
+    pass
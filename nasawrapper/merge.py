@@ -0,0 +1,146 @@
+from typing import Any, Dict, Iterator, List
+
+from .errors import NotFound
+from .neows import Asteroid, CloseApproachData
+from .utils.iter_asteroids import iter_asteroids
+
+class AsteroidMerger:
+    """
+    Combines any number of feed, browse and lookup
+    results into a single record per asteroid.
+
+    Records are matched by ``neo_reference_id`` with a
+    hash table, so merging ``N`` records is linear. Fields
+    of later records replace the ones of earlier records,
+    but fields missing from a record (like ``orbital_data``
+    on feeds) are kept. Close approaches are united by
+    ``epoch_date_close_approach`` and sorted by it.
+
+    Results can be added in chunks, as they arrive, and
+    the merged records can be read at any moment.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.merge import AsteroidMerger
+            from datetime import datetime
+
+            neows = SyncNeoWs("DEMO_KEY")
+            merger = AsteroidMerger()
+            merger.add(neows.get_neo_feed({
+                "start_date": datetime(2021, 1, 1),
+                "end_date": datetime(2021, 1, 7)
+            }))
+            merger.add(neows.get_neo_feed({
+                "start_date": datetime(2021, 1, 5),
+                "end_date": datetime(2021, 1, 12)
+            }))
+
+            for asteroid in merger:
+                print(asteroid["name"], len(asteroid["close_approach_data"]))
+    """
+    def __init__(self) -> None:
+        # fields without approaches, and approaches by epoch
+        self._fields: Dict[str, Dict[str, Any]] = {}
+        self._approaches: Dict[str, Dict[int, CloseApproachData]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __contains__(self, neo_reference_id: Any) -> bool:
+        return str(neo_reference_id) in self._fields
+
+    def add(self, results: Any) -> List[str]:
+        """
+        Merges every asteroid of ``results`` (feeds, browse
+        responses, lookup responses or any iterable of them).
+        Returns the ``neo_reference_id`` of every asteroid
+        that was touched, in the order they were found.
+        """
+        touched: Dict[str, None] = {}
+        for asteroid in iter_asteroids(results):
+            neo_reference_id = str(asteroid["neo_reference_id"])
+            fields = self._fields.setdefault(neo_reference_id, {})
+            approaches = self._approaches.setdefault(neo_reference_id, {})
+
+            for key, value in asteroid.items():
+                if key != "close_approach_data":
+                    fields[key] = value
+            for approach in asteroid.get("close_approach_data", []):
+                approaches[int(approach["epoch_date_close_approach"])] = approach
+
+            touched[neo_reference_id] = None
+
+        return list(touched)
+
+    def get(self, neo_reference_id: Any) -> Asteroid:
+        """
+        Returns the merged record of an asteroid.
+        """
+        neo_reference_id = str(neo_reference_id)
+        if neo_reference_id not in self._fields:
+            raise NotFound(f"Asteroid of id '{neo_reference_id}' could not be found")
+
+        approaches = self._approaches[neo_reference_id]
+        return {
+            **self._fields[neo_reference_id],
+            "close_approach_data": [approaches[epoch] for epoch in sorted(approaches)]
+        }
+
+    def pop(self, neo_reference_id: Any) -> Asteroid:
+        """
+        Returns the merged record of an asteroid and
+        forgets it, releasing its memory.
+        """
+        asteroid = self.get(neo_reference_id)
+        del self._fields[str(neo_reference_id)]
+        del self._approaches[str(neo_reference_id)]
+        return asteroid
+
+    def __iter__(self) -> Iterator[Asteroid]:
+        for neo_reference_id in list(self._fields):
+            yield self.get(neo_reference_id)
+
+def merge_asteroids(*results: Any) -> List[Asteroid]:
+    """
+    Merges feed, browse and lookup results with
+    :py:class:`AsteroidMerger` and returns one record
+    per asteroid.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.merge import merge_asteroids
+
+            asteroids = merge_asteroids(first_feed, second_feed, browse_page)
+    """
+    merger = AsteroidMerger()
+    for result in results:
+        merger.add(result)
+
+    return list(merger)
+
+def iter_merged(results: Any, key: str = "neo_reference_id") -> Iterator[Asteroid]:
+    """
+    Streaming version of :py:func:`merge_asteroids` for
+    inputs grouped by asteroid, like browse pages sorted by
+    id. Records are yielded as soon as a different asteroid
+    is found, so only one asteroid is kept in memory.
+
+    ``key`` names the field that groups the records.
+    """
+    merger = AsteroidMerger()
+    current = None
+
+    for asteroid in iter_asteroids(results):
+        if current is not None and asteroid[key] != current:
+            yield from merger
+            merger = AsteroidMerger()
+
+        current = asteroid[key]
+        merger.add(asteroid)
+
+    yield from merger
@@ -0,0 +1,246 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+"""
+The upper bounds, in seconds, of the latency histograms
+of :py:class:`RequestMetrics`.
+"""
+
+_ID = re.compile(r"/\d+(?=/|$)")
+
+class RequestEvent(NamedTuple):
+    """
+    Emitted to every hook after each request made by a
+    client, including the ones served from a cache.
+    Timings are in seconds and are ``None`` when they
+    weren't measured:
+
+    - :py:mod:`requests` doesn't expose DNS and connect
+      times, so only the async clients and the
+      :py:class:`engine <nasawrapper.engine.AsyncEngine>`
+      measure them. Sessions only trace their connections
+      when a hook is added before they are opened.
+    - ``decode`` is ``None`` when the body isn't decoded,
+      like errors and the responses of the
+      :py:mod:`proxy <nasawrapper.proxy>`.
+    - Cache hits make no request at all.
+
+    Failed requests aren't retried, so every request
+    gives its own event.
+
+    ``cache`` is ``"hit"``, ``"miss"`` or ``None`` when
+    the client has no cache.
+    """
+    endpoint: str
+    url: str
+    status: Optional[int]
+    dns: Optional[float]
+    connect: Optional[float]
+    ttfb: Optional[float]
+    total: float
+    bytes: int
+    decode: Optional[float]
+    cache: Optional[str]
+
+Hook = Callable[[RequestEvent], None]
+
+_hooks: List[Hook] = []
+
+def add_hook(hook: Hook) -> None:
+    """
+    Calls ``hook`` with a :py:class:`RequestEvent` after
+    each request made by any client. Hooks run in the
+    thread (or event loop) that made the request, so they
+    should be fast; exceptions they raise are ignored.
+    """
+    _hooks.append(hook)
+
+def remove_hook(hook: Hook) -> None:
+    """
+    Removes a hook added with :py:func:`add_hook`.
+    """
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+def has_hooks() -> bool:
+    """
+    Returns whether any hook is installed. Requests aren't
+    timed in detail otherwise.
+    """
+    return bool(_hooks)
+
+def emit(event: RequestEvent) -> None:
+    """
+    Sends ``event`` to every hook.
+    """
+    for hook in list(_hooks):
+        try:
+            hook(event)
+        except Exception:
+            pass
+
+def endpoint_of(url: str) -> str:
+    """
+    Returns the path of ``url`` with ids replaced by
+    ``{id}``, like ``/neo/rest/v1/neo/{id}``, so the
+    lookups of every asteroid share the same endpoint.
+    """
+    return _ID.sub("/{id}", urlsplit(url).path) or "/"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class RequestMetrics:
+    """
+    A hook keeping, per endpoint, a latency histogram,
+    the bytes received and the count of requests per
+    status and per cache outcome. They can be exported
+    in the Prometheus text format with
+    :py:meth:`to_prometheus`.
+
+    **Parameters**
+
+        **buckets** (Sequence[float]) - The upper bounds of the
+        histogram buckets, in seconds. Default is
+        :py:data:`DEFAULT_BUCKETS`.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod
+            from nasawrapper.metrics import RequestMetrics
+
+            metrics = RequestMetrics().install()
+            SyncApod("DEMO_KEY").get_today_apod()
+            print(metrics.to_prometheus())
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = defaultdict(float)
+        self._bytes: Dict[str, int] = defaultdict(int)
+        self._statuses: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._cache: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    @property
+    def buckets(self):
+        """
+        Returns the upper bounds of the histogram buckets.
+        """
+        return self._buckets
+
+    def install(self) -> "RequestMetrics":
+        """
+        Adds :py:meth:`observe` as a hook.
+        """
+        add_hook(self.observe)
+        return self
+
+    def uninstall(self) -> None:
+        """
+        Removes :py:meth:`observe` from the hooks.
+        """
+        remove_hook(self.observe)
+
+    def observe(self, event: RequestEvent) -> None:
+        """
+        Records a :py:class:`RequestEvent`.
+        """
+        with self._lock:
+            counts = self._counts.get(event.endpoint)
+            if counts is None:
+                # one more bucket for +Inf
+                counts = self._counts[event.endpoint] = [0] * (len(self._buckets) + 1)
+            counts[bisect_left(self._buckets, event.total)] += 1
+            self._sums[event.endpoint] += event.total
+            self._bytes[event.endpoint] += event.bytes
+
+            status = "cached" if event.status is None else str(event.status)
+            self._statuses[event.endpoint, status] += 1
+            if event.cache is not None:
+                self._cache[event.endpoint, event.cache] += 1
+
+    def count(self, endpoint: str) -> int:
+        """
+        Returns how many requests of ``endpoint`` were recorded.
+        """
+        with self._lock:
+            return sum(self._counts.get(endpoint, ()))
+
+    def quantile(self, endpoint: str, q: float) -> Optional[float]:
+        """
+        Returns the upper bound of the bucket holding the
+        ``q`` quantile (between 0 and 1) of the latencies of
+        ``endpoint``, or ``None`` without requests. It's
+        ``inf`` when the quantile is above every bucket.
+        """
+        with self._lock:
+            counts = self._counts.get(endpoint)
+            if not counts:
+                return None
+
+            target = q * sum(counts)
+            seen = 0
+            for bound, count in zip(self._buckets + (float("inf"),), counts):
+                seen += count
+                if seen >= target and seen:
+                    return bound
+            return float("inf")
+
+    def reset(self) -> None:
+        """
+        Forgets everything recorded.
+        """
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+            self._bytes.clear()
+            self._statuses.clear()
+            self._cache.clear()
+
+    def to_prometheus(self, prefix: str = "nasawrapper") -> str:
+        """
+        Returns the metrics in the Prometheus text
+        exposition format.
+        """
+        lines = []
+        with self._lock:
+            name = f"{prefix}_request_duration_seconds"
+            lines.append(f"# HELP {name} Time taken by requests, per endpoint.")
+            lines.append(f"# TYPE {name} histogram")
+            for endpoint in sorted(self._counts):
+                label = f'endpoint="{_escape(endpoint)}"'
+                cumulative = 0
+                for bound, count in zip(self._buckets + (float("inf"),), self._counts[endpoint]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f'{name}_bucket{{{label},le="{le}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{label}}} {self._sums[endpoint]!r}")
+                lines.append(f"{name}_count{{{label}}} {cumulative}")
+
+            name = f"{prefix}_response_bytes_total"
+            lines.append(f"# HELP {name} Bytes received, per endpoint.")
+            lines.append(f"# TYPE {name} counter")
+            for endpoint in sorted(self._bytes):
+                lines.append(f'{name}{{endpoint="{_escape(endpoint)}"}} {self._bytes[endpoint]}')
+
+            name = f"{prefix}_requests_total"
+            lines.append(f"# HELP {name} Requests, per endpoint and status.")
+            lines.append(f"# TYPE {name} counter")
+            for (endpoint, status), count in sorted(self._statuses.items()):
+                lines.append(f'{name}{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+
+            name = f"{prefix}_cache_lookups_total"
+            lines.append(f"# HELP {name} Cache lookups, per endpoint and outcome.")
+            lines.append(f"# TYPE {name} counter")
+            for (endpoint, outcome), count in sorted(self._cache.items()):
+                lines.append(f'{name}{{endpoint="{_escape(endpoint)}",outcome="{outcome}"}} {count}')
+
+        return "\n".join(lines) + "\n"
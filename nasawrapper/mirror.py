@@ -0,0 +1,303 @@
+import json
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .errors import NotFound
+from .neows import Asteroid
+from .utils.content_hash import content_hash
+from .utils.iter_asteroids import iter_asteroids
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS asteroids (
+    neo_reference_id TEXT PRIMARY KEY,
+    name TEXT,
+    absolute_magnitude_h REAL,
+    diameter_min_km REAL,
+    diameter_max_km REAL,
+    is_potentially_hazardous INTEGER NOT NULL,
+    is_sentry_object INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS approaches (
+    neo_reference_id TEXT NOT NULL REFERENCES asteroids (neo_reference_id),
+    epoch INTEGER NOT NULL,
+    close_approach_date TEXT NOT NULL,
+    miss_distance_au REAL,
+    miss_distance_lunar REAL,
+    orbiting_body TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (neo_reference_id, epoch)
+);
+CREATE INDEX IF NOT EXISTS asteroids_hazardous ON asteroids (is_potentially_hazardous);
+CREATE INDEX IF NOT EXISTS asteroids_sentry ON asteroids (is_sentry_object);
+CREATE INDEX IF NOT EXISTS asteroids_diameter ON asteroids (diameter_max_km);
+CREATE INDEX IF NOT EXISTS approaches_date ON approaches (close_approach_date, miss_distance_au);
+"""
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+class NeoWsMirror:
+    """
+    A local SQLite mirror of the NeoWs catalogue. Feed,
+    browse and lookup results are upserted by
+    ``neo_reference_id`` and can be queried again
+    without any request.
+
+    Syncing is incremental: an asteroid is only written
+    when its content changed since the last sync, and
+    close approaches are merged by epoch, so a feed (that
+    only has the approaches of its window) never erases
+    the approaches stored from a browse page.
+
+    **Parameters**
+
+        **path** (str) - The database file. Use ``":memory:"``
+        for a temporary mirror.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.mirror import NeoWsMirror
+            from datetime import datetime
+
+            neows = SyncNeoWs("DEMO_KEY")
+            mirror = NeoWsMirror("neows.db")
+            mirror.sync(neows.get_neo_browse())
+
+            for asteroid in mirror.query(hazardous=True, min_diameter=0.5):
+                print(asteroid["name"])
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+
+    @property
+    def path(self):
+        """
+        Returns the database file.
+        """
+        return self._path
+
+    @property
+    def connection(self):
+        """
+        Returns the underlying :py:class:`sqlite3.Connection`.
+        """
+        return self._connection
+
+    def close(self) -> None:
+        """
+        Closes the database.
+        """
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM asteroids").fetchone()[0]
+
+    def __contains__(self, neo_reference_id: Any) -> bool:
+        return self._connection.execute(
+            "SELECT 1 FROM asteroids WHERE neo_reference_id = ?", (str(neo_reference_id),)
+        ).fetchone() is not None
+
+    def sync(self, results: Any) -> int:
+        """
+        Upserts every asteroid of ``results`` (feeds, browse
+        responses, lookup responses or any iterable of them)
+        in a single transaction. Returns how many asteroid
+        and approach rows were inserted or updated.
+        """
+        changes = self._connection.total_changes
+        with self._connection:
+            for asteroid in iter_asteroids(results):
+                self._upsert(asteroid)
+
+        return self._connection.total_changes - changes
+
+    def _upsert(self, asteroid: Asteroid) -> None:
+        data = {key: value for key, value in asteroid.items() if key != "close_approach_data"}
+
+        # feeds don't have 'orbital_data', so fields missing from
+        # the new record are kept from the stored one
+        row = self._connection.execute(
+            "SELECT data FROM asteroids WHERE neo_reference_id = ?", (asteroid["neo_reference_id"],)
+        ).fetchone()
+        if row is not None:
+            data = {**json.loads(row[0]), **data}
+
+        # approaches are stored apart and links change with the api key
+        encoded = _dumps(data)
+        data_hash = content_hash(data)
+        diameter = asteroid["estimated_diameter"]["kilometers"]
+
+        self._connection.execute(
+            """
+            INSERT INTO asteroids VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (neo_reference_id) DO UPDATE SET
+                name = excluded.name,
+                absolute_magnitude_h = excluded.absolute_magnitude_h,
+                diameter_min_km = excluded.diameter_min_km,
+                diameter_max_km = excluded.diameter_max_km,
+                is_potentially_hazardous = excluded.is_potentially_hazardous,
+                is_sentry_object = excluded.is_sentry_object,
+                content_hash = excluded.content_hash,
+                data = excluded.data
+            WHERE asteroids.content_hash != excluded.content_hash
+            """,
+            (
+                asteroid["neo_reference_id"],
+                asteroid.get("name"),
+                asteroid.get("absolute_magnitude_h"),
+                float(diameter["estimated_diameter_min"]),
+                float(diameter["estimated_diameter_max"]),
+                int(bool(asteroid["is_potentially_hazardous_asteroid"])),
+                int(bool(asteroid.get("is_sentry_object", False))),
+                data_hash,
+                encoded
+            )
+        )
+
+        self._connection.executemany(
+            """
+            INSERT INTO approaches VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (neo_reference_id, epoch) DO UPDATE SET
+                close_approach_date = excluded.close_approach_date,
+                miss_distance_au = excluded.miss_distance_au,
+                miss_distance_lunar = excluded.miss_distance_lunar,
+                orbiting_body = excluded.orbiting_body,
+                data = excluded.data
+            WHERE approaches.data != excluded.data
+            """,
+            [
+                (
+                    asteroid["neo_reference_id"],
+                    int(approach["epoch_date_close_approach"]),
+                    approach["close_approach_date"],
+                    float(approach["miss_distance"]["astronomical"]),
+                    float(approach["miss_distance"]["lunar"]),
+                    approach.get("orbiting_body"),
+                    _dumps(approach)
+                )
+                for approach in asteroid.get("close_approach_data", [])
+            ]
+        )
+
+    def get(self, neo_reference_id: Any) -> Asteroid:
+        """
+        Returns a stored asteroid in the same shape as
+        :py:class:`SyncNeoWs.get_neo_lookup <nasawrapper.neows.SyncNeoWs.get_neo_lookup>`,
+        with every stored close approach.
+        """
+        row = self._connection.execute(
+            "SELECT data FROM asteroids WHERE neo_reference_id = ?", (str(neo_reference_id),)
+        ).fetchone()
+        if row is None:
+            raise NotFound(f"Asteroid of id '{neo_reference_id}' could not be found")
+
+        return self._build([(str(neo_reference_id), row[0])], "", [])[0]
+
+    def query(
+        self,
+        hazardous: Optional[bool] = None,
+        sentry: Optional[bool] = None,
+        min_diameter: Optional[float] = None,
+        max_diameter: Optional[float] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        max_distance: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Asteroid]:
+        """
+        Returns the stored asteroids matching every filter.
+        Diameters are in kilometers and compared with the
+        estimated maximum diameter; ``max_distance`` is in AU.
+
+        When ``start_date``, ``end_date`` or ``max_distance``
+        are given, only asteroids with an approach matching
+        them are returned and, just like on
+        :py:class:`SyncNeoWs.get_neo_feed <nasawrapper.neows.SyncNeoWs.get_neo_feed>`,
+        ``close_approach_data`` only has those approaches.
+        """
+        conditions = []
+        parameters: List[Any] = []
+        if hazardous is not None:
+            conditions.append("asteroids.is_potentially_hazardous = ?")
+            parameters.append(int(hazardous))
+        if sentry is not None:
+            conditions.append("asteroids.is_sentry_object = ?")
+            parameters.append(int(sentry))
+        if min_diameter is not None:
+            conditions.append("asteroids.diameter_max_km >= ?")
+            parameters.append(min_diameter)
+        if max_diameter is not None:
+            conditions.append("asteroids.diameter_max_km <= ?")
+            parameters.append(max_diameter)
+
+        approach_conditions = []
+        approach_parameters: List[Any] = []
+        for key, value, operator in (
+            ("start_date", start_date, ">="),
+            ("end_date", end_date, "<=")
+        ):
+            if value is None:
+                continue
+            if not isinstance(value, datetime):
+                raise TypeError(f"'{key}' must be 'datetime.datetime', got '{value.__class__.__name__}'")
+            approach_conditions.append(f"approaches.close_approach_date {operator} ?")
+            approach_parameters.append(value.strftime("%Y-%m-%d"))
+        if max_distance is not None:
+            approach_conditions.append("approaches.miss_distance_au <= ?")
+            approach_parameters.append(max_distance)
+
+        if approach_conditions:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM approaches WHERE approaches.neo_reference_id = asteroids.neo_reference_id AND "
+                + " AND ".join(approach_conditions) + ")"
+            )
+            parameters.extend(approach_parameters)
+
+        sql = "SELECT neo_reference_id, data FROM asteroids"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY neo_reference_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(int(limit))
+
+        rows = self._connection.execute(sql, parameters).fetchall()
+        return self._build(rows, " AND ".join(approach_conditions), approach_parameters)
+
+    def _build(self, rows: List[Any], approach_conditions: str, approach_parameters: List[Any]) -> List[Asteroid]:
+        if not rows:
+            return []
+
+        # fetching the approaches of every row at once
+        asteroids: Dict[str, Asteroid] = {}
+        for neo_reference_id, data in rows:
+            asteroid = json.loads(data)
+            asteroid["close_approach_data"] = []
+            asteroids[neo_reference_id] = asteroid
+
+        ids = list(asteroids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            sql = f"SELECT neo_reference_id, data FROM approaches WHERE neo_reference_id IN ({', '.join('?' * len(chunk))})"
+            if approach_conditions:
+                sql += " AND " + approach_conditions
+            sql += " ORDER BY neo_reference_id, epoch"
+
+            for neo_reference_id, data in self._connection.execute(sql, [*chunk, *approach_parameters]):
+                asteroids[neo_reference_id]["close_approach_data"].append(json.loads(data))
+
+        return list(asteroids.values())
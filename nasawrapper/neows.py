@@ -1,9 +1,16 @@
 from datetime import datetime, timedelta
-from typing import Dict, List, Type, TypedDict, Any
-import requests
-import aiohttp
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Type, TypedDict, Union, Any
 
+from .cache import ResponseCache
 from .errors import *
+from .rate_limit import RateBudget
+from .transport import API_ROOT, get_json, get_json_async
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from .batch import BatchExecutor, BatchResult
+    from .engine import AsyncEngine
 
 class EstimatedDiameterDetails(TypedDict):
     """
@@ -155,6 +162,9 @@ class Validator:
     """
     @classmethod
     def validate(cls, options: Dict[str, Any], allowed_keys: List[str]) -> Dict[str, str]:
+        # dates are converted in a copy, so the caller's options can be reused
+        options = dict(options)
+
         # checking keys
         if "start_date" not in options.keys() and not "end_date" in options.keys():
             raise InvalidKey("You have to provide a 'start_date' or 'end_date'")
@@ -197,9 +207,37 @@ class SyncNeoWs:
 
     Descriptions of the methods are from
     the `NASA API Portal <https://api.nasa.gov/>`_.
+
+    **Parameters**
+
+        **api_key** (str) - The API key.
+
+        **cache** (Optional[:py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`]) - Where
+        responses are cached.
+
+        **budget** (Optional[:py:class:`RateBudget <nasawrapper.rate_limit.RateBudget>`]) - A rate
+        limit budget shared with other clients.
+
+        **engine** (Optional[:py:class:`AsyncEngine <nasawrapper.engine.AsyncEngine>`]) - If
+        given, requests are made by this engine's event loop.
+
+        **api_root** (str) - Where requests are sent, like a
+        :py:mod:`caching proxy <nasawrapper.proxy>`. Default
+        is :py:data:`API_ROOT <nasawrapper.transport.API_ROOT>`.
     """
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[RateBudget] = None,
+        engine: Optional["AsyncEngine"] = None,
+        api_root: str = API_ROOT
+    ) -> None:
         self._api_key = api_key
+        self._cache = cache
+        self._budget = budget
+        self._api_root = api_root.rstrip("/")
+        self._engine = engine
         self._allowed_keys = ["start_date", "end_date"]
 
     @property
@@ -209,6 +247,13 @@ class SyncNeoWs:
         """
         return self._api_key
 
+    @property
+    def api_root(self):
+        """
+        Returns where requests are sent.
+        """
+        return self._api_root
+
     @property
     def allowed_keys(self):
         """
@@ -216,6 +261,27 @@ class SyncNeoWs:
         """
         return self._allowed_keys
 
+    @property
+    def cache(self):
+        """
+        Returns the response cache, if any.
+        """
+        return self._cache
+
+    @property
+    def budget(self):
+        """
+        Returns the rate limit budget, if any.
+        """
+        return self._budget
+
+    @property
+    def engine(self):
+        """
+        Returns the engine requests are delegated to, if any.
+        """
+        return self._engine
+
     def get_neo_feed(self, options: Dict[str, Any]) -> NeoWsFeedResponse:
         """
         Retrieve a list of Asteroids based on
@@ -244,22 +310,20 @@ class SyncNeoWs:
                     "end_date": datetime(2010, 2, 4)
                 })
         """
+        url = self._feed_url(options)
+
+        # making request
+        return get_json(url, self._api_key, self._cache, self._budget, engine=self._engine)
 
-        url = f"https://api.nasa.gov/neo/rest/v1/feed?api_key={self._api_key}"
+    def _feed_url(self, options: Dict[str, Any]) -> str:
+        url = f"{self._api_root}/neo/rest/v1/feed?api_key={self._api_key}"
         options = Validator.validate(options, self._allowed_keys)
 
         # building url
         for key, value in options.items():
             url += f"&{key}={value}"
 
-        # making request
-        request = requests.get(url)
-        if request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-
-        return request.json()
+        return url
 
     def get_today_neo_feed(self) -> NeoWsFeedResponse:
         """
@@ -305,23 +369,17 @@ class SyncNeoWs:
         if not isinstance(asteroid_id, int):
             raise TypeError(f"'asteroid_id' must be 'int', got {asteroid_id.__class__.__name__}")
 
-        url = f"https://api.nasa.gov/neo/rest/v1/neo/{asteroid_id}?api_key={self._api_key}"
+        url = f"{self._api_root}/neo/rest/v1/neo/{asteroid_id}?api_key={self._api_key}"
         
 
         # making request
-        request = requests.get(url)
-        if request.status_code == 404:
-            raise NotFound(f"Asteroid of id '{asteroid_id}' could not be found")
-        elif request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-
-        return request.json()
+        return get_json(url, self._api_key, self._cache, self._budget, f"Asteroid of id '{asteroid_id}' could not be found", self._engine)
 
-    def get_neo_browse(self) -> NeoWsBrowseResponse:
+    def get_neo_browse(self, page: Optional[int] = None, size: Optional[int] = None) -> NeoWsBrowseResponse:
         """
-        Browse the overall Asteroid data-set.
+        Browse the overall Asteroid data-set. ``page`` and
+        ``size`` select a page of the results (the API
+        allows up to 20 asteroids per page).
 
         **Example**
 
@@ -334,16 +392,100 @@ class SyncNeoWs:
                                                 # since the API's searching for all asteroids
                 print(result)
         """
-        url = f"https://api.nasa.gov/neo/rest/v1/neo/browse?api_key={self._api_key}"
+        url = f"{self._api_root}/neo/rest/v1/neo/browse?api_key={self._api_key}"
+        for key, value in (("page", page), ("size", size)):
+            if value is None:
+                continue
+            if not isinstance(value, int):
+                raise TypeError(f"'{key}' must be 'int', got '{value.__class__.__name__}'")
+            url += f"&{key}={value}"
 
         # making request
-        request = requests.get(url)
-        if request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
+        return get_json(url, self._api_key, self._cache, self._budget, engine=self._engine)
+
+    def _get_item(self, item: Union[int, Dict[str, Any]]) -> Any:
+        if isinstance(item, dict):
+            return self.get_neo_feed(item)
+        elif isinstance(item, int):
+            return self.get_neo_lookup(item)
+        raise TypeError(f"items must be 'int' or 'dict', got '{item.__class__.__name__}'")
+
+    def submit(self, item: Union[int, Dict[str, Any]], executor: Optional["BatchExecutor"] = None) -> "Future":
+        """
+        Makes a request in a thread pool (``executor`` or the
+        shared :py:func:`default executor <nasawrapper.batch.get_default_executor>`)
+        and returns a :py:class:`concurrent.futures.Future`
+        of its result. Like in :py:meth:`get_many`, an
+        ``int`` is looked up and a ``dict`` is a feed query.
+        """
+        from .batch import get_default_executor
+
+        return (executor or get_default_executor()).submit(self._get_item, item)
+
+    def map(
+        self,
+        items: Iterable[Union[int, Dict[str, Any]]],
+        ordered: bool = True,
+        executor: Optional["BatchExecutor"] = None
+    ) -> Iterator["BatchResult"]:
+        """
+        Makes a request for every item in a thread pool,
+        like :py:meth:`submit`, and yields a
+        :py:class:`BatchResult <nasawrapper.batch.BatchResult>`
+        per item, in order or, without ``ordered``, as they
+        complete. Errors are captured per item.
+
+        **Example**
+
+            .. code-block:: python3
+
+                from nasawrapper import SyncNeoWs
+
+                neows = SyncNeoWs("DEMO_KEY")
+                for item in neows.map([3542519, 2000433, 3726710], ordered=False):
+                    print(item.item, item.result["name"] if item.ok else item.error)
+        """
+        from .batch import get_default_executor
 
-        return request.json()
+        return (executor or get_default_executor()).map(self._get_item, items, ordered)
+
+    def get_many(self, items: List[Union[int, Dict[str, Any]]], return_exceptions: bool = False) -> List[Any]:
+        """
+        Makes a request for every item of ``items``
+        concurrently, on the client's engine or on the shared
+        :py:func:`default engine <nasawrapper.engine.get_default_engine>`,
+        and returns the results in order: an ``int`` is
+        looked up like in :py:meth:`get_neo_lookup`, and a
+        ``dict`` is a feed query like in :py:meth:`get_neo_feed`.
+        With ``return_exceptions``, failed requests give
+        their error instead of raising it.
+
+        **Example**
+
+            .. code-block:: python3
+
+                from nasawrapper import SyncNeoWs
+
+                neows = SyncNeoWs("DEMO_KEY")
+                asteroids = neows.get_many([3542519, 2000433, 3726710])
+        """
+        from .engine import get_default_engine
+
+        requests = []
+        for item in items:
+            if isinstance(item, dict):
+                requests.append((self._feed_url(item), None))
+            elif isinstance(item, int):
+                url = f"{self._api_root}/neo/rest/v1/neo/{item}?api_key={self._api_key}"
+                requests.append((url, f"Asteroid of id '{item}' could not be found"))
+            else:
+                raise TypeError(f"'items' must hold 'int' or 'dict', got '{item.__class__.__name__}'")
+
+        engine = self._engine or get_default_engine()
+        return engine.gather(
+            [engine.fetch(url, self._api_key, self._cache, self._budget, not_found) for url, not_found in requests],
+            return_exceptions
+        )
 
 class AsyncNeoWs:
     """
@@ -353,9 +495,32 @@ class AsyncNeoWs:
 
     Descriptions of the methods are from
     the `NASA API Portal <https://api.nasa.gov/>`_.
+
+    **Parameters**
+
+        **api_key** (str) - The API key.
+
+        **cache** (Optional[:py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`]) - Where
+        responses are cached.
+
+        **budget** (Optional[:py:class:`RateBudget <nasawrapper.rate_limit.RateBudget>`]) - A rate
+        limit budget shared with other clients.
+
+        **api_root** (str) - Where requests are sent, like a
+        :py:mod:`caching proxy <nasawrapper.proxy>`. Default
+        is :py:data:`API_ROOT <nasawrapper.transport.API_ROOT>`.
     """
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[RateBudget] = None,
+        api_root: str = API_ROOT
+    ) -> None:
         self._api_key = api_key
+        self._cache = cache
+        self._budget = budget
+        self._api_root = api_root.rstrip("/")
         self._allowed_keys = ["start_date", "end_date"]
 
     @property
@@ -365,6 +530,13 @@ class AsyncNeoWs:
         """
         return self._api_key
 
+    @property
+    def api_root(self):
+        """
+        Returns where requests are sent.
+        """
+        return self._api_root
+
     @property
     def allowed_keys(self):
         """
@@ -372,6 +544,20 @@ class AsyncNeoWs:
         """
         return self._allowed_keys
 
+    @property
+    def cache(self):
+        """
+        Returns the response cache, if any.
+        """
+        return self._cache
+
+    @property
+    def budget(self):
+        """
+        Returns the rate limit budget, if any.
+        """
+        return self._budget
+
     async def get_neo_feed(self, options: Dict[str, Any]) -> NeoWsFeedResponse:
         """
         |coro|
@@ -399,7 +585,7 @@ class AsyncNeoWs:
                 loop = asyncio.get_event_loop()
                 loop.run_until_complete(main())
         """
-        url = f"https://api.nasa.gov/neo/rest/v1/feed?api_key={self._api_key}"
+        url = f"{self._api_root}/neo/rest/v1/feed?api_key={self._api_key}"
         options = Validator.validate(options, self._allowed_keys)
 
         # building url
@@ -407,16 +593,7 @@ class AsyncNeoWs:
             url += f"&{key}={value}"
 
         # making request
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as request:
-                if request.status == 429:
-                    raise RateLimitError("You are being rate limited")
-                elif request.status == 403:
-                    raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-
-                request = await request.json()
-
-        return request
+        return await get_json_async(url, self._api_key, self._cache, self._budget)
 
     async def get_today_neo_feed(self) -> NeoWsFeedResponse:
         """
@@ -480,27 +657,18 @@ class AsyncNeoWs:
         if not isinstance(asteroid_id, int):
             raise TypeError(f"'asteroid_id' must be 'int', got {asteroid_id.__class__.__name__}")
 
-        url = f"https://api.nasa.gov/neo/rest/v1/neo/{asteroid_id}?api_key={self._api_key}"
+        url = f"{self._api_root}/neo/rest/v1/neo/{asteroid_id}?api_key={self._api_key}"
         
         # making request
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as request:
-                if request.status == 429:
-                    raise RateLimitError("You are being rate limited")
-                elif request.status == 403:
-                    raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-                elif request.status == 404:
-                    raise NotFound(f"Asteroid of id '{asteroid_id}' could not be found")
+        return await get_json_async(url, self._api_key, self._cache, self._budget, f"Asteroid of id '{asteroid_id}' could not be found")
 
-                request = await request.json()
-
-        return request
-
-    async def get_neo_browse(self) -> NeoWsBrowseResponse:
+    async def get_neo_browse(self, page: Optional[int] = None, size: Optional[int] = None) -> NeoWsBrowseResponse:
         """
         |coro|
         
-        Browse the overall asteroid data-set.
+        Browse the overall asteroid data-set. ``page`` and
+        ``size`` select a page of the results (the API
+        allows up to 20 asteroids per page).
 
         **Example**
 
@@ -518,19 +686,16 @@ class AsyncNeoWs:
                 loop = asyncio.get_event_loop()
                 loop.run_until_complete(main())
         """
-        url = f"https://api.nasa.gov/neo/rest/v1/neo/browse?api_key={self._api_key}"
+        url = f"{self._api_root}/neo/rest/v1/neo/browse?api_key={self._api_key}"
+        for key, value in (("page", page), ("size", size)):
+            if value is None:
+                continue
+            if not isinstance(value, int):
+                raise TypeError(f"'{key}' must be 'int', got '{value.__class__.__name__}'")
+            url += f"&{key}={value}"
 
         # making request
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as request:
-                if request.status == 429:
-                    raise RateLimitError("You are being rate limited")
-                elif request.status == 403:
-                    raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
-
-                request = await request.json()
-
-        return request
+        return await get_json_async(url, self._api_key, self._cache, self._budget)
 
 class NeoWsQueryBuilder:
     """
@@ -551,9 +716,11 @@ class NeoWsQueryBuilder:
             result = builder.set_start_date(datetime(2020, 2, 3)).set_end_date(datetime(2020, 2, 4)).get_feed()
             print(result)
     """
-    def __init__(self, api_key: str, options = {}) -> None:
+    def __init__(self, api_key: str, options: Optional[Dict[str, Any]] = None, api_root: str = API_ROOT) -> None:
         self._api_key = api_key
-        self._options = options
+        self._api_root = api_root.rstrip("/")
+        # every builder owns its options, so they don't leak between builders
+        self._options = dict(options or {})
 
     @property
     def api_key(self):
@@ -562,12 +729,19 @@ class NeoWsQueryBuilder:
         """
         return self._api_key
 
+    @property
+    def api_root(self):
+        """
+        Returns where requests are sent.
+        """
+        return self._api_root
+
     @property
     def options(self):
         """
         Returns the options in dict format.
         """
-        return self._api_key
+        return self._options
 
     def set_start_date(self, start_date: datetime):
         """
@@ -577,7 +751,7 @@ class NeoWsQueryBuilder:
             raise TypeError(f"'start_date' must be 'datetime.datetime', got {start_date.__class.__name__}")
 
         self._options["start_date"] = start_date   
-        return NeoWsQueryBuilder(self._api_key, self._options)     
+        return NeoWsQueryBuilder(self._api_key, self._options, self._api_root)     
 
     def set_end_date(self, end_date: datetime):
         """
@@ -587,7 +761,7 @@ class NeoWsQueryBuilder:
             raise TypeError(f"'end_date' must be 'datetime.datetime', got {end_date.__class.__name__}")
 
         self._options["end_date"] = end_date 
-        return NeoWsQueryBuilder(self._api_key, self._options)
+        return NeoWsQueryBuilder(self._api_key, self._options, self._api_root)
 
     def get_feed(self):
         """
@@ -596,17 +770,36 @@ class NeoWsQueryBuilder:
         """
         options = Validator.validate(self._options, ["start_date", "end_date"])
         
-        url = f"https://api.nasa.gov/neo/rest/v1/feed?api_key={self._api_key}"
+        url = f"{self._api_root}/neo/rest/v1/feed?api_key={self._api_key}"
 
         # building url
         for key, value in options.items():
             url += f"&{key}={value}"
 
         # making request
-        request = requests.get(url)
-        if request.status_code == 429:
-            raise RateLimitError("You are being rate limited")
-        elif request.status_code == 403:
-            raise InvalidApiKey(f"'{self._api_key}' is not a valid API key")
+        return get_json(url, self._api_key)
+
+    def submit(self, executor: Optional["BatchExecutor"] = None) -> "Future":
+        """
+        Makes the request in a thread pool (``executor`` or
+        the shared :py:func:`default executor <nasawrapper.batch.get_default_executor>`)
+        and returns a :py:class:`concurrent.futures.Future`
+        of its result.
+        """
+        from .batch import get_default_executor
+
+        return (executor or get_default_executor()).submit(self.get_feed)
+
+    @staticmethod
+    def map(
+        builders: Iterable["NeoWsQueryBuilder"],
+        ordered: bool = True,
+        executor: Optional["BatchExecutor"] = None
+    ) -> Iterator["BatchResult"]:
+        """
+        Makes the request of every builder in a thread pool,
+        like :py:meth:`SyncNeoWs.map <nasawrapper.neows.SyncNeoWs.map>`.
+        """
+        from .batch import get_default_executor
 
-        return request.json()
\ No newline at end of file
+        return (executor or get_default_executor()).map(lambda builder: builder.get_feed(), builders, ordered)
\ No newline at end of file
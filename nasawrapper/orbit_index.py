@@ -0,0 +1,312 @@
+import heapq
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .errors import NotFound
+from .orbits import ORBIT_DTYPE, to_orbit_table
+
+DEFAULT_WEIGHTS = {
+    "semi_major_axis": 1.0,
+    "eccentricity": 1.0,
+    "inclination": 1.0,
+    "ascending_node_longitude": 0.5,
+    "perihelion_argument": 0.5
+}
+"""
+The default weight of each element in the similarity
+metric used by :py:class:`OrbitIndex`.
+"""
+
+_LEAF_SIZE = 16
+
+def orbit_features(elements: np.ndarray, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Maps orbits returned by
+    :py:func:`to_orbit_table <nasawrapper.orbits.to_orbit_table>`
+    to points where the euclidean distance measures how similar
+    two orbits are. Inclination is taken in radians and the
+    ascending node and the perihelion argument are mapped to the
+    unit circle, so 359° and 1° are close to each other.
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    node = np.radians(elements["ascending_node_longitude"])
+    argument = np.radians(elements["perihelion_argument"])
+
+    return np.column_stack([
+        weights["semi_major_axis"] * elements["semi_major_axis"],
+        weights["eccentricity"] * elements["eccentricity"],
+        weights["inclination"] * np.radians(elements["inclination"]),
+        weights["ascending_node_longitude"] * np.cos(node),
+        weights["ascending_node_longitude"] * np.sin(node),
+        weights["perihelion_argument"] * np.cos(argument),
+        weights["perihelion_argument"] * np.sin(argument)
+    ])
+
+class _KDTree:
+    """
+    Static KD-tree. Nodes are kept in flat lists and
+    leaves hold up to ``_LEAF_SIZE`` points that are
+    compared at once with NumPy.
+    """
+    def __init__(self, points: np.ndarray, ids: np.ndarray, versions: np.ndarray) -> None:
+        self.size = len(points)
+        order = np.arange(self.size)
+
+        # node = (start, end, dimension, split, left, right)
+        self.nodes: List[Tuple[int, int, int, float, int, int]] = []
+        stack = [(0, self.size, -1)]
+        while stack:
+            start, end, parent = stack.pop()
+            node_index = len(self.nodes)
+            if parent >= 0:
+                # filling the parent's child slot
+                p_start, p_end, p_dimension, p_split, p_left, p_right = self.nodes[parent]
+                if p_left < 0:
+                    self.nodes[parent] = (p_start, p_end, p_dimension, p_split, node_index, p_right)
+                else:
+                    self.nodes[parent] = (p_start, p_end, p_dimension, p_split, p_left, node_index)
+
+            if end - start <= _LEAF_SIZE:
+                self.nodes.append((start, end, -1, 0.0, -1, -1))
+                continue
+
+            chunk = points[order[start:end]]
+            dimension = int(np.argmax(chunk.max(axis=0) - chunk.min(axis=0)))
+            middle = (end - start) // 2
+            partition = np.argpartition(chunk[:, dimension], middle)
+            order[start:end] = order[start:end][partition]
+            split = float(points[order[start + middle], dimension])
+
+            self.nodes.append((start, end, dimension, split, -1, -1))
+            # right is pushed first so left takes the first child slot
+            stack.append((start + middle, end, node_index))
+            stack.append((start, start + middle, node_index))
+
+        self.points = points[order]
+        self.ids = ids[order]
+        self.versions = versions[order]
+
+    def _leaf(self, start: int, end: int, point: np.ndarray, alive) -> Tuple[np.ndarray, np.ndarray]:
+        distances = np.sqrt(((self.points[start:end] - point) ** 2).sum(axis=1))
+        mask = alive(self.ids[start:end], self.versions[start:end])
+        return self.ids[start:end][mask], distances[mask]
+
+    def knn(self, point: np.ndarray, k: int, heap: List[Tuple[float, int]], alive) -> None:
+        # 'heap' is a max-heap of (-distance, id) shared between trees
+        # every entry has a lower bound of the distance to its points
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(heap) >= k and bound >= -heap[0][0]:
+                continue
+
+            start, end, dimension, split, left, right = self.nodes[node]
+            if dimension < 0:
+                ids, distances = self._leaf(start, end, point, alive)
+                for neo_id, distance in zip(ids.tolist(), distances.tolist()):
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, neo_id))
+                    elif distance < -heap[0][0]:
+                        heapq.heapreplace(heap, (-distance, neo_id))
+                continue
+
+            difference = point[dimension] - split
+            near, far = (left, right) if difference < 0 else (right, left)
+            stack.append((far, max(bound, abs(difference))))
+            stack.append((near, bound))
+
+    def radius(self, point: np.ndarray, radius: float, found: List[Tuple[float, int]], alive) -> None:
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            start, end, dimension, split, left, right = self.nodes[node]
+            if dimension < 0:
+                ids, distances = self._leaf(start, end, point, alive)
+                mask = distances <= radius
+                found.extend(zip(distances[mask].tolist(), ids[mask].tolist()))
+                continue
+
+            difference = point[dimension] - split
+            if difference - radius <= 0:
+                stack.append(left)
+            if difference + radius >= 0:
+                stack.append(right)
+
+class OrbitIndex:
+    """
+    Index of asteroid orbits that answers "which
+    asteroids have orbits similar to this one?" in
+    sub-linear time, using KD-trees over the points
+    returned by :py:func:`orbit_features`.
+
+    New browse pages can be added at any moment:
+    they go into small trees that are merged with
+    bigger ones as the index grows, so adding ``N``
+    asteroids costs ``O(N log² N)`` in total. Adding an
+    asteroid that's already indexed replaces it.
+
+    **Parameters**
+
+        **weights** (Optional[Dict[str, float]]) - Overrides
+        :py:data:`DEFAULT_WEIGHTS`.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.orbit_index import OrbitIndex
+
+            neows = SyncNeoWs("DEMO_KEY")
+            index = OrbitIndex()
+            index.add(neows.get_neo_browse())
+
+            for neo_reference_id, distance in index.query(2000433, k=5):
+                print(neo_reference_id, distance)
+    """
+    def __init__(self, weights: Optional[Dict[str, float]] = None) -> None:
+        self._weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self._trees: List[_KDTree] = []
+        self._versions: Dict[int, int] = {}
+        self._elements: Dict[int, np.void] = {}
+        self._counter = 0
+
+    @property
+    def weights(self):
+        """
+        Returns the weights of the metric.
+        """
+        return self._weights
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def __contains__(self, neo_reference_id: int) -> bool:
+        return int(neo_reference_id) in self._versions
+
+    def _alive(self, ids: np.ndarray, versions: np.ndarray) -> np.ndarray:
+        current = np.fromiter((self._versions.get(neo_id, -1) for neo_id in ids.tolist()), dtype=np.int64, count=len(ids))
+        return current == versions
+
+    def add(self, results: Any) -> int:
+        """
+        Indexes the orbits of a browse response, a
+        lookup response, an iterable of them or a table
+        returned by
+        :py:func:`to_orbit_table <nasawrapper.orbits.to_orbit_table>`.
+        Returns how many orbits were added.
+        """
+        if isinstance(results, np.ndarray) and results.dtype == ORBIT_DTYPE:
+            elements = results
+        else:
+            elements = to_orbit_table(results)
+
+        if not len(elements):
+            return 0
+
+        ids = elements["neo_reference_id"].astype(np.int64)
+        versions = np.arange(self._counter, self._counter + len(ids), dtype=np.int64)
+        self._counter += len(ids)
+        for neo_id, version, row in zip(ids.tolist(), versions.tolist(), elements):
+            self._versions[neo_id] = version
+            self._elements[neo_id] = row
+
+        self._trees.append(_KDTree(orbit_features(elements, self._weights), ids, versions))
+
+        # merging trees of similar sizes, keeping O(log N) trees
+        while len(self._trees) >= 2 and self._trees[-2].size <= 2 * self._trees[-1].size:
+            right = self._trees.pop()
+            left = self._trees.pop()
+            points = np.concatenate([left.points, right.points])
+            ids = np.concatenate([left.ids, right.ids])
+            versions = np.concatenate([left.versions, right.versions])
+            mask = self._alive(ids, versions)
+            self._trees.append(_KDTree(points[mask], ids[mask], versions[mask]))
+
+        return len(elements)
+
+    def remove(self, neo_reference_id: int) -> None:
+        """
+        Removes an asteroid from the index.
+        """
+        neo_reference_id = int(neo_reference_id)
+        if neo_reference_id not in self._versions:
+            raise NotFound(f"Asteroid of id '{neo_reference_id}' is not indexed")
+
+        del self._versions[neo_reference_id]
+        del self._elements[neo_reference_id]
+
+    def rebuild(self) -> None:
+        """
+        Rebuilds the index as a single tree, dropping
+        replaced and removed orbits.
+        """
+        if not self._elements:
+            self._trees = []
+            return
+
+        elements = np.array(list(self._elements.values()), dtype=ORBIT_DTYPE)
+        self._trees = []
+        self._versions = {}
+        self._elements = {}
+        self.add(elements)
+
+    def _point(self, orbit: Union[int, np.void, np.ndarray]) -> Tuple[np.ndarray, Optional[int]]:
+        if isinstance(orbit, (int, np.integer, str)):
+            neo_reference_id = int(orbit)
+            if neo_reference_id not in self._elements:
+                raise NotFound(f"Asteroid of id '{neo_reference_id}' is not indexed")
+            orbit = self._elements[neo_reference_id]
+        else:
+            neo_reference_id = None
+
+        elements = np.asarray(orbit, dtype=ORBIT_DTYPE).reshape(1)
+        return orbit_features(elements, self._weights)[0], neo_reference_id
+
+    def query(
+        self,
+        orbit: Union[int, np.void, np.ndarray],
+        k: int = 10,
+        include_self: bool = False
+    ) -> List[Tuple[int, float]]:
+        """
+        Returns the ``k`` asteroids with the most similar
+        orbits as a list of ``(neo_reference_id, distance)``,
+        nearest first. ``orbit`` can be the id of an indexed
+        asteroid or a row of
+        :py:func:`to_orbit_table <nasawrapper.orbits.to_orbit_table>`.
+        """
+        if not isinstance(k, int):
+            raise TypeError(f"'k' must be 'int', got '{k.__class__.__name__}'")
+
+        point, neo_reference_id = self._point(orbit)
+        skip = neo_reference_id if not include_self else None
+        wanted = k + (1 if skip is not None else 0)
+
+        heap: List[Tuple[float, int]] = []
+        for tree in self._trees:
+            tree.knn(point, wanted, heap, self._alive)
+
+        results = sorted((-distance, neo_id) for distance, neo_id in heap)
+        return [(neo_id, distance) for distance, neo_id in results if neo_id != skip][:k]
+
+    def query_radius(
+        self,
+        orbit: Union[int, np.void, np.ndarray],
+        radius: float,
+        include_self: bool = False
+    ) -> List[Tuple[int, float]]:
+        """
+        Returns every asteroid whose orbit is at most
+        ``radius`` away from ``orbit``, as a list of
+        ``(neo_reference_id, distance)``, nearest first.
+        """
+        point, neo_reference_id = self._point(orbit)
+        skip = neo_reference_id if not include_self else None
+
+        found: List[Tuple[float, int]] = []
+        for tree in self._trees:
+            tree.radius(point, radius, found, self._alive)
+
+        return [(neo_id, distance) for distance, neo_id in sorted(found) if neo_id != skip]
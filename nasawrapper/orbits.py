@@ -0,0 +1,199 @@
+from datetime import datetime, timezone
+from typing import Any, Iterable, Union
+
+import numpy as np
+
+from .utils.iter_asteroids import iter_asteroids
+
+ORBIT_DTYPE = np.dtype([
+    ("neo_reference_id", np.int64),
+    ("epoch", np.float64),
+    ("eccentricity", np.float64),
+    ("semi_major_axis", np.float64),
+    ("inclination", np.float64),
+    ("ascending_node_longitude", np.float64),
+    ("perihelion_argument", np.float64),
+    ("mean_anomaly", np.float64),
+    ("mean_motion", np.float64)
+])
+"""
+The dtype of the arrays returned by :py:func:`to_orbit_table`.
+``epoch`` is the osculation epoch as a Julian date, the
+semi-major axis is in AU, angles are in degrees and the
+mean motion is in degrees per day, just like on API response.
+"""
+
+# Gaussian gravitational constant, in degrees per day
+GAUSSIAN_CONSTANT = np.degrees(0.01720209895)
+
+# Julian date of the Unix epoch
+_UNIX_EPOCH_JD = 2440587.5
+
+def _orbital_data(asteroid: Any) -> Any:
+    # the field is 'orbital_data' on API response
+    return asteroid.get("orbital_data") or asteroid.get("orbitral_data")
+
+def to_orbit_table(results: Any) -> np.ndarray:
+    """
+    Extracts the osculating elements from the
+    ``orbital_data`` of every asteroid of a browse
+    response, a lookup response or an iterable of
+    them. Asteroids without ``orbital_data``
+    are skipped. The columns are described by
+    :py:data:`ORBIT_DTYPE`.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.orbits import to_orbit_table
+
+            neows = SyncNeoWs("DEMO_KEY")
+            elements = to_orbit_table(neows.get_neo_browse())
+            print(elements["eccentricity"].mean())
+    """
+    def rows():
+        for asteroid in iter_asteroids(results):
+            data = _orbital_data(asteroid)
+            if not data:
+                continue
+
+            semi_major_axis = float(data["semi_major_axis"])
+            mean_motion = data.get("mean_motion")
+            yield (
+                int(asteroid["neo_reference_id"]),
+                float(data["epoch_osculation"]),
+                float(data["eccentricity"]),
+                semi_major_axis,
+                float(data["inclination"]),
+                float(data["ascending_node_longitude"]),
+                float(data["perihelion_argument"]),
+                float(data["mean_anomaly"]),
+                float(mean_motion) if mean_motion else GAUSSIAN_CONSTANT / semi_major_axis ** 1.5
+            )
+
+    return np.fromiter(rows(), dtype=ORBIT_DTYPE)
+
+def julian_date(dates: Union[datetime, Iterable[datetime]]) -> np.ndarray:
+    """
+    Converts one or many :py:class:`datetime.datetime`
+    into Julian dates. Naive datetimes are taken as UTC.
+    """
+    if isinstance(dates, datetime):
+        dates = [dates]
+
+    timestamps = [
+        (date if date.tzinfo else date.replace(tzinfo=timezone.utc)).timestamp()
+        for date in dates
+    ]
+    return np.asarray(timestamps, dtype=np.float64) / 86400.0 + _UNIX_EPOCH_JD
+
+def solve_kepler(
+    mean_anomaly: np.ndarray,
+    eccentricity: np.ndarray,
+    tolerance: float = 1e-12,
+    max_iterations: int = 50
+) -> np.ndarray:
+    """
+    Solves Kepler's equation ``M = E - e sin(E)`` for the
+    eccentric anomaly ``E`` with Newton's method over whole
+    arrays at once. Angles are in radians and the arrays
+    are broadcast against each other. Hyperbolic and
+    parabolic orbits (``e >= 1``) give ``nan``.
+    """
+    mean_anomaly, eccentricity = np.broadcast_arrays(
+        np.asarray(mean_anomaly, dtype=np.float64),
+        np.asarray(eccentricity, dtype=np.float64)
+    )
+    mean_anomaly = np.remainder(mean_anomaly, 2 * np.pi)
+
+    # starting from pi converges for every elliptical orbit
+    anomaly = np.where(eccentricity < 0.8, mean_anomaly, np.pi)
+    for _ in range(max_iterations):
+        delta = (anomaly - eccentricity * np.sin(anomaly) - mean_anomaly) / (1 - eccentricity * np.cos(anomaly))
+        anomaly = anomaly - delta
+        if np.all(np.abs(delta) < tolerance):
+            break
+
+    return np.where(eccentricity < 1, anomaly, np.nan)
+
+def propagate(
+    elements: np.ndarray,
+    epochs: Union[datetime, Iterable[datetime], np.ndarray]
+) -> np.ndarray:
+    """
+    Propagates every orbit of ``elements`` (returned by
+    :py:func:`to_orbit_table`) to every epoch of ``epochs``
+    with two-body Keplerian motion. ``epochs`` can be
+    datetimes or Julian dates.
+
+    Returns an array of shape ``(len(elements), len(epochs), 3)``
+    with the heliocentric ecliptic ``x``, ``y`` and ``z``
+    positions, in AU.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.orbits import to_orbit_table, propagate
+            from datetime import datetime, timedelta
+
+            elements = to_orbit_table(browse_pages)
+            epochs = [datetime(2030, 1, 1) + timedelta(days=day) for day in range(365)]
+            positions = propagate(elements, epochs)
+            print(positions.shape)
+    """
+    if not isinstance(epochs, (datetime, np.ndarray)) and not np.isscalar(epochs):
+        # generators can only be read once
+        epochs = list(epochs)
+    if isinstance(epochs, datetime) or (
+        isinstance(epochs, list) and any(isinstance(epoch, datetime) for epoch in epochs)
+    ):
+        epochs = julian_date(epochs)
+    epochs = np.atleast_1d(np.asarray(epochs, dtype=np.float64))
+
+    # every per-orbit value is a column, every epoch is a row
+    column = lambda name: elements[name][:, np.newaxis]
+    eccentricity = column("eccentricity")
+    semi_major_axis = column("semi_major_axis")
+
+    mean_anomaly = np.radians(
+        column("mean_anomaly") + column("mean_motion") * (epochs[np.newaxis, :] - column("epoch"))
+    )
+    anomaly = solve_kepler(mean_anomaly, eccentricity)
+
+    # position in the orbital plane
+    x_plane = semi_major_axis * (np.cos(anomaly) - eccentricity)
+    y_plane = semi_major_axis * np.sqrt(1 - eccentricity ** 2) * np.sin(anomaly)
+
+    # rotating to the ecliptic frame
+    node = np.radians(column("ascending_node_longitude"))
+    argument = np.radians(column("perihelion_argument"))
+    inclination = np.radians(column("inclination"))
+    cos_node, sin_node = np.cos(node), np.sin(node)
+    cos_argument, sin_argument = np.cos(argument), np.sin(argument)
+    cos_inclination, sin_inclination = np.cos(inclination), np.sin(inclination)
+
+    positions = np.empty(anomaly.shape + (3,), dtype=np.float64)
+    positions[..., 0] = (
+        (cos_node * cos_argument - sin_node * sin_argument * cos_inclination) * x_plane
+        + (-cos_node * sin_argument - sin_node * cos_argument * cos_inclination) * y_plane
+    )
+    positions[..., 1] = (
+        (sin_node * cos_argument + cos_node * sin_argument * cos_inclination) * x_plane
+        + (-sin_node * sin_argument + cos_node * cos_argument * cos_inclination) * y_plane
+    )
+    positions[..., 2] = (
+        sin_argument * sin_inclination * x_plane
+        + cos_argument * sin_inclination * y_plane
+    )
+
+    return positions
+
+def heliocentric_distance(positions: np.ndarray) -> np.ndarray:
+    """
+    Returns the distance to the Sun, in AU, of the
+    positions returned by :py:func:`propagate`.
+    """
+    return np.linalg.norm(positions, axis=-1)
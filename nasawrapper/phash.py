@@ -0,0 +1,302 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from .apod import ApodResponse
+from .download import ApodDownloader, DownloadResult
+
+_HASH_SIZE = 8
+_SAMPLE_SIZE = 32
+
+# number of set bits of every byte
+_BITS = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+def _dct_matrix(size: int) -> np.ndarray:
+    # orthonormal DCT-II basis
+    k = np.arange(size)[:, np.newaxis]
+    n = np.arange(size)[np.newaxis, :]
+    matrix = np.sqrt(2 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+_DCT = _dct_matrix(_SAMPLE_SIZE)
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    return _BITS[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int64)
+
+def perceptual_hash(image: Union[str, Image.Image]) -> int:
+    """
+    Returns the 64 bits perceptual hash (pHash) of an image
+    or of an image file. Images that look alike, even when
+    resized, recompressed or slightly edited, have hashes
+    with a small Hamming distance.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.phash import perceptual_hash, hamming_distance
+
+            first = perceptual_hash("apod/2021-01-01.jpg")
+            second = perceptual_hash("apod/2021-01-01-hd.jpg")
+            print(hamming_distance(first, second))
+    """
+    if isinstance(image, str):
+        with Image.open(image) as opened:
+            opened.draft("L", (_SAMPLE_SIZE * 4, _SAMPLE_SIZE * 4))
+            return perceptual_hash(opened.convert("L"))
+
+    pixels = np.asarray(
+        image.convert("L").resize((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.LANCZOS),
+        dtype=np.float64
+    )
+    # the lowest frequencies, without the average (DC) term
+    frequencies = (_DCT @ pixels @ _DCT.T)[:_HASH_SIZE, :_HASH_SIZE].flatten()
+    bits = frequencies > np.median(frequencies[1:])
+
+    value = 0
+    for bit in bits.tolist():
+        value = (value << 1) | int(bit)
+    return value
+
+def hamming_distance(first: int, second: int) -> int:
+    """
+    Returns how many bits are different between two hashes.
+    """
+    return bin(first ^ second).count("1")
+
+def _hash_download(item: Tuple[str, str, str]) -> Tuple[str, str, Optional[int]]:
+    # runs inside the worker processes
+    date, url, path = item
+    try:
+        return date, url, perceptual_hash(path)
+    except Exception:
+        return date, url, None
+
+class PerceptualHashIndex:
+    """
+    Stores the perceptual hash of APOD images with their
+    dates and answers nearest-Hamming-distance queries.
+    Hashes are kept in a NumPy array and compared all at
+    once with ``XOR`` and a population count, so a query
+    over the whole archive takes a few milliseconds.
+
+    New images can be hashed incrementally, in a process
+    pool, with :py:meth:`update`; dates that are already
+    indexed are skipped. This module needs ``numpy`` and
+    ``Pillow``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod
+            from nasawrapper.download import ApodDownloader
+            from nasawrapper.phash import PerceptualHashIndex
+            from datetime import datetime
+
+            if __name__ == "__main__":
+                apod = SyncApod("DEMO_KEY")
+                results = apod.get_apod({
+                    "start_date": datetime(2021, 1, 1),
+                    "end_date": datetime(2021, 3, 1),
+                    "thumbs": True
+                })
+
+                index = PerceptualHashIndex.load("hashes.npz")
+                index.update(ApodDownloader("apod"), results)
+                index.save("hashes.npz")
+
+                for first, second, distance in index.duplicates(max_distance=6):
+                    print(first, second, distance)
+    """
+    def __init__(self) -> None:
+        self._dates: List[str] = []
+        self._urls: List[str] = []
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._positions = {}
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def __contains__(self, date: str) -> bool:
+        return date in self._positions
+
+    @property
+    def dates(self):
+        """
+        Returns the indexed dates.
+        """
+        return self._dates
+
+    def add(self, date: str, value: int, url: str = "") -> None:
+        """
+        Indexes the hash of the image of ``date``,
+        replacing any previous hash of that date.
+        """
+        self.extend([(date, url, value)])
+
+    def extend(self, items: Iterable[Tuple[str, str, int]]) -> None:
+        """
+        Indexes many ``(date, url, hash)`` tuples at once.
+        """
+        new_hashes = []
+        for date, url, value in items:
+            if date in self._positions:
+                position = self._positions[date]
+                self._urls[position] = url
+                # the date may have been added by this same call
+                if position < len(self._hashes):
+                    self._hashes[position] = value
+                else:
+                    new_hashes[position - len(self._hashes)] = value
+                continue
+
+            self._positions[date] = len(self._dates)
+            self._dates.append(date)
+            self._urls.append(url)
+            new_hashes.append(value)
+
+        if new_hashes:
+            self._hashes = np.concatenate([self._hashes, np.asarray(new_hashes, dtype=np.uint64)])
+
+    def update(
+        self,
+        downloader: ApodDownloader,
+        results: Union[ApodResponse, Iterable[ApodResponse]],
+        workers: Optional[int] = None
+    ) -> int:
+        """
+        Downloads the images of the ``results`` that aren't
+        indexed yet and hashes them in a process pool.
+        Returns how many images were indexed.
+        """
+        if isinstance(results, dict):
+            results = [results]
+
+        missing = [result for result in results if result.get("date") not in self._positions]
+        downloads = downloader.download(missing)
+        return self.update_from_downloads(downloads, workers)
+
+    def update_from_downloads(self, downloads: Iterable[DownloadResult], workers: Optional[int] = None) -> int:
+        """
+        Hashes the images of ``downloads`` (returned by
+        :py:meth:`ApodDownloader.download <nasawrapper.download.ApodDownloader.download>`)
+        in a process pool. Returns how many images were indexed.
+        """
+        items = [
+            (download.date, download.url, download.path) for download in downloads
+            if download.status != "failed" and download.path and download.date not in self._positions
+        ]
+        if not items:
+            return 0
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            hashed = [item for item in executor.map(_hash_download, items, chunksize=16) if item[2] is not None]
+
+        self.extend(hashed)
+        return len(hashed)
+
+    def distances(self, value: int) -> np.ndarray:
+        """
+        Returns the Hamming distance between ``value`` and
+        every indexed hash, in the order of :py:attr:`dates`.
+        """
+        return _popcount(np.bitwise_xor(self._hashes, np.uint64(value)))
+
+    def nearest(self, value: int, k: int = 10) -> List[Tuple[str, int]]:
+        """
+        Returns the ``k`` dates with the closest hashes
+        as ``(date, distance)``, nearest first.
+        """
+        distances = self.distances(value)
+        k = min(k, len(distances))
+        if k <= 0:
+            return []
+
+        indexes = np.argpartition(distances, k - 1)[:k]
+        indexes = indexes[np.argsort(distances[indexes], kind="stable")]
+        return [(self._dates[index], int(distances[index])) for index in indexes.tolist()]
+
+    def within(self, value: int, max_distance: int) -> List[Tuple[str, int]]:
+        """
+        Returns every date whose hash is at most
+        ``max_distance`` bits away, nearest first.
+        """
+        distances = self.distances(value)
+        indexes = np.flatnonzero(distances <= max_distance)
+        indexes = indexes[np.argsort(distances[indexes], kind="stable")]
+        return [(self._dates[index], int(distances[index])) for index in indexes.tolist()]
+
+    def duplicates(self, max_distance: int = 4) -> List[Tuple[str, str, int]]:
+        """
+        Returns every pair of dates whose images are
+        near-duplicates, as ``(date, other_date, distance)``.
+
+        Hashes are split in ``max_distance + 1`` chunks: two
+        hashes at most ``max_distance`` bits apart have at
+        least one identical chunk, so only the hashes sharing
+        a chunk are compared, instead of every pair.
+        """
+        count = len(self._hashes)
+        chunks = min(max_distance + 1, 64)
+        bounds = np.linspace(0, 64, chunks + 1).astype(int).tolist()
+
+        firsts, seconds = [], []
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            keys = (self._hashes >> np.uint64(low)) & np.uint64((1 << (high - low)) - 1)
+            order = np.argsort(keys, kind="stable")
+            keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if count else np.empty(0, dtype=np.int64)
+            ends = np.r_[starts[1:], count].astype(np.int64)
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end - start > 1:
+                    members = np.sort(order[start:end])
+                    first, second = np.triu_indices(end - start, 1)
+                    firsts.append(members[first])
+                    seconds.append(members[second])
+
+        if not firsts:
+            return []
+
+        # pairs sharing many chunks were found more than once
+        pairs = np.unique(np.concatenate(firsts).astype(np.int64) * count + np.concatenate(seconds))
+        firsts, seconds = np.divmod(pairs, count)
+        distances = _popcount(np.bitwise_xor(self._hashes[firsts], self._hashes[seconds]))
+        near = np.flatnonzero(distances <= max_distance)
+        return [
+            (self._dates[first], self._dates[second], distance)
+            for first, second, distance in zip(firsts[near].tolist(), seconds[near].tolist(), distances[near].tolist())
+        ]
+
+    def save(self, path: str) -> None:
+        """
+        Saves the index to a ``.npz`` file. The suffix is
+        added to ``path`` if it's missing.
+        """
+        np.savez(
+            path,
+            dates=np.asarray(self._dates, dtype=str),
+            urls=np.asarray(self._urls, dtype=str),
+            hashes=self._hashes
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PerceptualHashIndex":
+        """
+        Loads an index saved by :py:meth:`save`, with the
+        same ``path``. A missing file gives an empty index.
+        """
+        if not path.endswith(".npz"):
+            path += ".npz"
+
+        index = cls()
+        if not os.path.exists(path):
+            return index
+
+        with np.load(path) as data:
+            index.extend(zip(data["dates"].tolist(), data["urls"].tolist(), data["hashes"].tolist()))
+        return index
@@ -0,0 +1,316 @@
+"""
+A caching reverse proxy for the NASA API, that many programs
+can share::
+
+    python -m nasawrapper.proxy --api-key MY_KEY --port 8080
+
+Clients then send their requests to it with
+``SyncApod("ANY_KEY", api_root="http://localhost:8080")``.
+"""
+import argparse
+import asyncio
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import ClientError, ClientSession, web
+
+from . import transport
+from .cache import ResponseCache
+from .errors import RateLimitError
+from .rate_limit import RateBudget
+
+Upstream = Tuple[int, bytes]
+
+class CachingProxy:
+    """
+    An HTTP server exposing the endpoints of the NASA API,
+    so programs using this library (through the ``api_root``
+    of the clients) or any other HTTP client share one
+    upstream API key, one response cache, and one rate
+    budget.
+
+    Requests are forwarded with the proxy's key, whatever
+    key was sent. Successful responses are cached, and a
+    request identical to one in flight waits for its
+    response instead of being forwarded, so the upstream
+    only sees every distinct question once per ``ttl``.
+    Random APOD pictures (with ``count``) are always
+    forwarded.
+    When the budget is exhausted, a ``429`` is returned
+    instead of waiting more than ``timeout`` seconds.
+
+    Every response has a ``X-Cache`` header, which is
+    ``HIT``, ``MISS`` or ``COALESCED``. Links to the
+    upstream in bodies, like the pagination links of
+    NeoWs, are rewritten to point at the proxy.
+
+    **Parameters**
+
+        **api_key** (str) - The key used upstream.
+
+        **cache** (Optional[:py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`]) - Where
+        responses are cached. Default is a new cache.
+
+        **budget** (Optional[:py:class:`RateBudget <nasawrapper.rate_limit.RateBudget>`]) - The
+        rate limit budget of the key. Default is a new budget.
+
+        **upstream** (str) - Where requests are forwarded.
+        Default is :py:data:`API_ROOT <nasawrapper.transport.API_ROOT>`.
+
+        **limit** (int) - How many upstream connections can
+        be open at once. Default is ``100``.
+
+        **timeout** (float) - How many seconds a request can
+        wait for the budget. Default is ``30``.
+
+        **host** (str) - The interface to listen on. Default
+        is ``"127.0.0.1"``.
+
+        **port** (int) - The port to listen on. Default is
+        ``0``, any free port.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.proxy import CachingProxy
+
+            with CachingProxy("MY_KEY", port=8080) as proxy:
+                neows = SyncNeoWs("ANY_KEY", api_root=proxy.url)
+                neows.get_neo_lookup(3542519)
+    """
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[RateBudget] = None,
+        upstream: str = transport.API_ROOT,
+        limit: int = 100,
+        timeout: float = 30.0,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ) -> None:
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError("'limit' must be a positive 'int'")
+
+        self._api_key = api_key
+        self._cache = cache if cache is not None else ResponseCache()
+        self._budget = budget if budget is not None else RateBudget()
+        self._upstream = upstream.rstrip("/")
+        # the API writes its links with either scheme
+        netloc = urlsplit(self._upstream).netloc
+        self._upstream_origins = [f"https://{netloc}".encode(), f"http://{netloc}".encode()]
+        self._limit = limit
+        self._timeout = timeout
+        self._host = host
+        self.port = port
+
+        self._session: Optional[ClientSession] = None
+        self._inflight: Dict[str, "asyncio.Future[Upstream]"] = {}
+        self._counts = {"HIT": 0, "MISS": 0, "COALESCED": 0}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    @property
+    def url(self):
+        """
+        Returns the root URL of the proxy, to be given as
+        the ``api_root`` of the clients.
+        """
+        host = "127.0.0.1" if self._host in ("", "0.0.0.0") else self._host
+        return f"http://{host}:{self.port}"
+
+    @property
+    def cache(self):
+        """
+        Returns the response cache.
+        """
+        return self._cache
+
+    @property
+    def budget(self):
+        """
+        Returns the rate limit budget.
+        """
+        return self._budget
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """
+        Returns how many requests were answered from the
+        cache (``HIT``), forwarded (``MISS``) or shared with
+        a forwarded request (``COALESCED``).
+        """
+        return dict(self._counts)
+
+    def _upstream_url(self, request: web.Request) -> str:
+        query = [(key, value) for key, value in request.query.items() if key != "api_key"]
+        query.append(("api_key", self._api_key))
+        return self._upstream + str(request.rel_url.with_query(query))
+
+    async def _forward(self, url: str) -> Upstream:
+        return await transport.get_body_async(url, self._session, self._budget, self._timeout, "miss")
+
+    async def _fetch(self, url: str, random: bool = False) -> Tuple[int, bytes, str]:
+        if random:
+            # random pictures are neither cached nor shared
+            status, body = await self._forward(url)
+            return status, body, "MISS"
+
+        key = transport.cache_key(url)
+        body = self._cache.get(key)
+        if body is not None:
+            return 200, body, "HIT"
+
+        shared = self._inflight.get(key)
+        if shared is not None:
+            status, body = await asyncio.shield(shared)
+            return status, body, "COALESCED"
+
+        shared = self._inflight[key] = asyncio.get_event_loop().create_future()
+        try:
+            status, body = await self._forward(url)
+        except BaseException as error:
+            if isinstance(error, asyncio.CancelledError):
+                shared.cancel()
+            else:
+                shared.set_exception(error)
+                # marking it as retrieved, in case nobody else waits
+                shared.exception()
+            raise
+        else:
+            if status == 200:
+                self._cache.set(key, body)
+            shared.set_result((status, body))
+            return status, body, "MISS"
+        finally:
+            del self._inflight[key]
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        try:
+            status, body, outcome = await self._fetch(self._upstream_url(request), "count" in request.query)
+        except RateLimitError:
+            delay = self._budget.delay()
+            return web.json_response(
+                {"error": {"code": "OVER_RATE_LIMIT", "message": "The proxy's rate budget is exhausted"}},
+                status=429,
+                headers={"Retry-After": str(max(1, round(delay)))}
+            )
+        except (ClientError, asyncio.TimeoutError) as error:
+            return web.json_response({"code": 502, "msg": f"Upstream request failed: {error}"}, status=502)
+
+        self._counts[outcome] += 1
+
+        # NeoWs links repeat the key, and point at the upstream,
+        # so pagination has to come back through the proxy
+        key = request.query.get("api_key", "DEMO_KEY")
+        body = body.replace(f"api_key={self._api_key}".encode(), f"api_key={key}".encode())
+        origin = str(request.url.origin()).encode()
+        for upstream in self._upstream_origins:
+            body = body.replace(upstream, origin)
+        return web.Response(
+            body=body,
+            status=status,
+            content_type="application/json",
+            headers={"X-Cache": outcome, "X-RateLimit-Remaining": str(self._budget.remaining)}
+        )
+
+    async def _open(self, app: web.Application) -> None:
+        self._session = transport.open_session(self._limit)
+
+    async def _close(self, app: web.Application) -> None:
+        await self._session.close()
+        self._session = None
+
+    def app(self) -> web.Application:
+        """
+        Returns the :py:class:`aiohttp.web.Application` of
+        the proxy, to be served by any aiohttp runner.
+        """
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self._handle)
+        app.on_startup.append(self._open)
+        app.on_cleanup.append(self._close)
+        return app
+
+    def run(self) -> None:
+        """
+        Serves the proxy until it's interrupted.
+        """
+        web.run_app(self.app(), host=self._host, port=self.port, access_log=None, print=None)
+
+    def _serve(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        runner = web.AppRunner(self.app(), access_log=None)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, self._host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = runner.addresses[0][1]
+
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(runner.cleanup())
+        self._loop.close()
+
+    def start(self) -> "CachingProxy":
+        """
+        Starts the proxy in a background thread and waits
+        until it accepts requests.
+        """
+        self._thread = threading.Thread(target=self._serve, name="nasawrapper-proxy", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the proxy started with :py:meth:`start`.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m nasawrapper.proxy", description=__doc__.split("\n\n")[0].strip().rstrip(":"))
+    parser.add_argument("--api-key", default=os.environ.get("NASA_API_KEY", "DEMO_KEY"), help="the key used upstream, $NASA_API_KEY by default")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--upstream", default=transport.API_ROOT, help="where requests are forwarded")
+    parser.add_argument("--rate-limit", type=int, default=1000, help="upstream requests allowed per period")
+    parser.add_argument("--period", type=float, default=3600.0, help="the rate limit period, in seconds")
+    parser.add_argument("--cache-size", type=int, default=4096, help="how many responses are cached")
+    parser.add_argument("--ttl", type=float, default=3600.0, help="how many seconds responses are cached")
+    parser.add_argument("--connections", type=int, default=100, help="how many upstream connections can be open")
+    parser.add_argument("--timeout", type=float, default=30.0, help="how many seconds a request can wait for the budget")
+    arguments = parser.parse_args(argv)
+
+    proxy = CachingProxy(
+        arguments.api_key,
+        ResponseCache(arguments.cache_size, arguments.ttl),
+        RateBudget(arguments.rate_limit, arguments.period),
+        arguments.upstream,
+        arguments.connections,
+        arguments.timeout,
+        arguments.host,
+        arguments.port
+    )
+    print(f"Serving the NASA API on {proxy.url}, forwarding to {arguments.upstream}")
+    proxy.run()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
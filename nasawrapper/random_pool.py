@@ -0,0 +1,282 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Union
+
+from .apod import ApodResponse, AsyncApod, SyncApod
+from .transport import raise_for_error
+
+class RandomApodPool:
+    """
+    Keeps random APOD pictures in memory and refills
+    itself in a background thread with larger
+    ``count`` requests, so
+    :py:meth:`get` usually returns instantly instead of
+    costing a round-trip and a rate limit token per picture.
+
+    **Parameters**
+
+        **apod** (Union[str, :py:class:`SyncApod <nasawrapper.apod.SyncApod>`]) - The
+        client making the requests, so its ``api_root`` and
+        rate budget are used, or an API key.
+
+        **batch_size** (int) - How many pictures each refill
+        requests. Default is ``20``.
+
+        **low_water_mark** (int) - A refill starts when fewer
+        pictures than this are left, or when the pool is
+        empty. Default is ``5``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod
+            from nasawrapper.random_pool import RandomApodPool
+
+            pool = RandomApodPool(SyncApod("DEMO_KEY"), batch_size=50)
+            for _ in range(10):
+                print(pool.get()["title"])
+            pool.close()
+    """
+    def __init__(self, apod: Union[str, SyncApod], batch_size: int = 20, low_water_mark: int = 5) -> None:
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("'batch_size' must be a positive 'int'")
+        if not isinstance(low_water_mark, int) or not 0 <= low_water_mark <= batch_size:
+            raise ValueError("'low_water_mark' must be an 'int' between 0 and 'batch_size'")
+
+        self._apod = SyncApod(apod) if isinstance(apod, str) else apod
+        self._batch_size = batch_size
+        self._low_water_mark = low_water_mark
+        self._items: Deque[ApodResponse] = deque()
+        self._condition = threading.Condition()
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def batch_size(self):
+        """
+        Returns how many pictures each refill requests.
+        """
+        return self._batch_size
+
+    @property
+    def low_water_mark(self):
+        """
+        Returns the low-water mark.
+        """
+        return self._low_water_mark
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def start(self) -> "RandomApodPool":
+        """
+        Starts the refill thread. It's started by the
+        first :py:meth:`get` otherwise.
+        """
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="nasawrapper-random-pool", daemon=True)
+                self._thread.start()
+
+        return self
+
+    def _fetch(self) -> List[ApodResponse]:
+        items = self._apod.get_apod({"count": self._batch_size})
+        raise_for_error(items, self._apod.api_key)
+        return items
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            with self._condition:
+                while not self._closed and len(self._items) >= max(self._low_water_mark, 1):
+                    self._condition.wait()
+                if self._closed:
+                    return
+
+            try:
+                items = self._fetch()
+            except Exception as error:
+                with self._condition:
+                    self._error = error
+                    self._condition.notify_all()
+                    # waiting before trying again, unless closed
+                    self._condition.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+
+            backoff = 1.0
+            with self._condition:
+                self._items.extend(items)
+                self._error = None
+                self._condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> ApodResponse:
+        """
+        Returns a random picture, waiting for a refill
+        only if the pool is empty. If the last refill
+        failed and the pool is empty, its error is raised.
+        """
+        self.start()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("the pool is closed")
+
+            while not self._items:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+                self._condition.notify_all()
+                if not self._condition.wait(timeout):
+                    raise TimeoutError("no random picture was received in time")
+
+            item = self._items.popleft()
+            if len(self._items) < max(self._low_water_mark, 1):
+                self._condition.notify_all()
+
+            return item
+
+    def close(self) -> None:
+        """
+        Stops the refill thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+class AsyncRandomApodPool:
+    """
+    Same thing as :py:class:`RandomApodPool`, but with
+    asynchronous syntax: refills run in an asyncio task,
+    with an :py:class:`AsyncApod <nasawrapper.apod.AsyncApod>`
+    or an API key.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.random_pool import AsyncRandomApodPool
+            import asyncio
+
+            async def main():
+                async with AsyncRandomApodPool("DEMO_KEY", batch_size=50) as pool:
+                    for _ in range(10):
+                        picture = await pool.get()
+                        print(picture["title"])
+
+            loop = asyncio.get_event_loop()
+            loop.run_until_complete(main())
+    """
+    def __init__(self, apod: Union[str, AsyncApod], batch_size: int = 20, low_water_mark: int = 5) -> None:
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("'batch_size' must be a positive 'int'")
+        if not isinstance(low_water_mark, int) or not 0 <= low_water_mark <= batch_size:
+            raise ValueError("'low_water_mark' must be an 'int' between 0 and 'batch_size'")
+
+        self._apod = AsyncApod(apod) if isinstance(apod, str) else apod
+        self._batch_size = batch_size
+        self._low_water_mark = low_water_mark
+        self._items: Deque[ApodResponse] = deque()
+        self._error: Optional[Exception] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refill: Optional[asyncio.Event] = None
+        self._filled: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def start(self) -> "AsyncRandomApodPool":
+        """
+        Starts the refill task. It must be called from
+        a running event loop and is called by the first
+        :py:meth:`get` otherwise.
+        """
+        if self._task is None:
+            self._refill = asyncio.Event()
+            self._filled = asyncio.Event()
+            self._refill.set()
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+        return self
+
+    async def _fetch(self) -> List[ApodResponse]:
+        items = await self._apod.get_apod({"count": self._batch_size})
+        raise_for_error(items, self._apod.api_key)
+        return items
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            await self._refill.wait()
+            self._refill.clear()
+            if len(self._items) >= max(self._low_water_mark, 1):
+                continue
+
+            try:
+                items = await self._fetch()
+            except Exception as error:
+                self._error = error
+                self._filled.set()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                self._refill.set()
+                continue
+
+            backoff = 1.0
+            self._items.extend(items)
+            self._error = None
+            self._filled.set()
+
+    async def get(self, timeout: Optional[float] = None) -> ApodResponse:
+        """
+        |coro|
+
+        Same thing as :py:meth:`RandomApodPool.get`.
+        """
+        self.start()
+        while not self._items:
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+
+            self._filled.clear()
+            self._refill.set()
+            await asyncio.wait_for(self._filled.wait(), timeout)
+
+        item = self._items.popleft()
+        if len(self._items) < max(self._low_water_mark, 1):
+            self._refill.set()
+
+        return item
+
+    async def close(self) -> None:
+        """
+        |coro|
+
+        Cancels the refill task.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
@@ -0,0 +1,132 @@
+import threading
+import time
+from typing import Mapping, Optional
+
+from .errors import RateLimitError
+
+class RateBudget:
+    """
+    A token bucket shared by every client that's given
+    it, so many clients (sync or async, in many threads)
+    stay inside the same rate limit. Tokens come back
+    continuously, ``limit`` per ``period`` seconds, and the
+    bucket also follows the ``X-RateLimit-Remaining``
+    header of every response.
+
+    **Parameters**
+
+        **limit** (int) - Requests allowed per period. Default
+        is ``1000``, the hourly limit of a regular API key.
+
+        **period** (float) - The period, in seconds. Default is
+        ``3600``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod, SyncNeoWs
+            from nasawrapper.rate_limit import RateBudget
+
+            budget = RateBudget(limit=1000)
+            apod = SyncApod("MY_KEY", budget=budget)
+            neows = SyncNeoWs("MY_KEY", budget=budget)
+    """
+    def __init__(self, limit: int = 1000, period: float = 3600.0) -> None:
+        if not isinstance(limit, int) or limit < 1:
+            raise ValueError("'limit' must be a positive 'int'")
+
+        self._limit = limit
+        self._period = period
+        self._tokens = float(limit)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        """
+        Returns the requests allowed per period.
+        """
+        return self._limit
+
+    @property
+    def remaining(self) -> int:
+        """
+        Returns how many requests can be made right now.
+        """
+        with self._lock:
+            self._refill()
+            return int(self._tokens)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._limit, self._tokens + (now - self._updated) * self._limit / self._period)
+        self._updated = now
+
+    def try_acquire(self, reserve: int = 0) -> bool:
+        """
+        Takes a token if more than ``reserve`` tokens are
+        left, without waiting. Background work can pass a
+        ``reserve`` to leave tokens for user requests.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= reserve + 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def delay(self) -> float:
+        """
+        Returns how many seconds until a token is available.
+        """
+        with self._lock:
+            self._refill()
+            return max(0.0, (1 - self._tokens) * self._period / self._limit)
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        """
+        Takes a token, waiting for one if needed. Raises
+        :py:class:`RateLimitError <nasawrapper.errors.RateLimitError>`
+        if it would wait more than ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire():
+            delay = self.delay()
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise RateLimitError("The shared rate budget is exhausted")
+            time.sleep(delay)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> None:
+        """
+        |coro|
+
+        Same thing as :py:meth:`acquire`, but waits without
+        blocking the event loop.
+        """
+        import asyncio
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire():
+            delay = self.delay()
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise RateLimitError("The shared rate budget is exhausted")
+            await asyncio.sleep(delay)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Lowers the tokens to the ``X-RateLimit-Remaining``
+        of a response, when the API says fewer are left.
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, float(remaining))
@@ -0,0 +1,338 @@
+import json
+import math
+import re
+import sqlite3
+import unicodedata
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .apod import ApodResponse
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 parameters and field weights
+_K1 = 1.2
+_B = 0.75
+_TITLE_WEIGHT = 10.0
+_EXPLANATION_WEIGHT = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apods (
+    date TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+# the FTS rows share the rowid of the apods rows, and
+# triggers keep them in sync
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS apods_fts USING fts5 (
+    title,
+    explanation,
+    content = 'apods',
+    content_rowid = 'rowid',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS apods_fts_insert AFTER INSERT ON apods BEGIN
+    INSERT INTO apods_fts (rowid, title, explanation) VALUES (new.rowid, new.title, new.explanation);
+END;
+CREATE TRIGGER IF NOT EXISTS apods_fts_delete AFTER DELETE ON apods BEGIN
+    INSERT INTO apods_fts (apods_fts, rowid, title, explanation) VALUES ('delete', old.rowid, old.title, old.explanation);
+END;
+CREATE TRIGGER IF NOT EXISTS apods_fts_update AFTER UPDATE ON apods BEGIN
+    INSERT INTO apods_fts (apods_fts, rowid, title, explanation) VALUES ('delete', old.rowid, old.title, old.explanation);
+    INSERT INTO apods_fts (rowid, title, explanation) VALUES (new.rowid, new.title, new.explanation);
+END;
+"""
+
+class SearchResult(NamedTuple):
+    """
+    An APOD found by :py:class:`ApodSearchIndex`. The
+    higher the ``score``, the better the match.
+    """
+    apod: ApodResponse
+    score: float
+
+def _tokens(text: str) -> List[str]:
+    # like the 'remove_diacritics 2' option of FTS5
+    text = "".join(char for char in unicodedata.normalize("NFD", text.lower()) if not unicodedata.combining(char))
+    return _TOKEN.findall(text)
+
+def _parse(query: str) -> List[List[str]]:
+    # every item is a term or a quoted phrase, as a list of tokens
+    items = []
+    for phrase, word in _QUERY.findall(query):
+        tokens = _tokens(phrase if phrase else word)
+        if tokens:
+            items.append(tokens)
+
+    return items
+
+def _has_fts5(connection: sqlite3.Connection) -> bool:
+    try:
+        connection.execute("CREATE VIRTUAL TABLE temp.fts5_check USING fts5 (content)")
+        connection.execute("DROP TABLE temp.fts5_check")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+class _InvertedIndex:
+    """
+    Fallback for SQLite builds without FTS5. Keeps,
+    for every token, the dates where it appears and how
+    many times, per field.
+    """
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[str, Tuple[int, int]]] = defaultdict(dict)
+        self.lengths: Dict[str, Tuple[int, int]] = {}
+        self.texts: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    def add(self, date: str, title: str, explanation: str) -> None:
+        self.remove(date)
+        title_tokens, explanation_tokens = _tokens(title), _tokens(explanation)
+        title_counts, explanation_counts = Counter(title_tokens), Counter(explanation_tokens)
+        for token in set(title_counts) | set(explanation_counts):
+            self.postings[token][date] = (title_counts[token], explanation_counts[token])
+
+        self.lengths[date] = (len(title_tokens), len(explanation_tokens))
+        self.texts[date] = (title_tokens, explanation_tokens)
+
+    def remove(self, date: str) -> None:
+        if date not in self.texts:
+            return
+
+        title_tokens, explanation_tokens = self.texts.pop(date)
+        for token in set(title_tokens) | set(explanation_tokens):
+            del self.postings[token][date]
+            if not self.postings[token]:
+                del self.postings[token]
+        del self.lengths[date]
+
+    def search(self, items: List[List[str]]) -> Dict[str, float]:
+        # every term and phrase must match
+        candidates = None
+        for tokens in items:
+            for token in tokens:
+                dates = set(self.postings.get(token, ()))
+                candidates = dates if candidates is None else candidates & dates
+        if not candidates:
+            return {}
+
+        phrases = [tokens for tokens in items if len(tokens) > 1]
+        if phrases:
+            candidates = {date for date in candidates if all(self._has_phrase(date, phrase) for phrase in phrases)}
+
+        total = len(self.lengths)
+        average_title = sum(length[0] for length in self.lengths.values()) / total or 1
+        average_explanation = sum(length[1] for length in self.lengths.values()) / total or 1
+
+        scores = {}
+        for date in candidates:
+            title_length, explanation_length = self.lengths[date]
+            score = 0.0
+            for token in {token for tokens in items for token in tokens}:
+                postings = self.postings[token]
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                title_count, explanation_count = postings[date]
+                for count, length, average, weight in (
+                    (title_count, title_length, average_title, _TITLE_WEIGHT),
+                    (explanation_count, explanation_length, average_explanation, _EXPLANATION_WEIGHT)
+                ):
+                    if count:
+                        score += weight * idf * count * (_K1 + 1) / (count + _K1 * (1 - _B + _B * length / average))
+            scores[date] = score
+
+        return scores
+
+    def _has_phrase(self, date: str, phrase: List[str]) -> bool:
+        size = len(phrase)
+        for tokens in self.texts[date]:
+            for start in range(len(tokens) - size + 1):
+                if tokens[start:start + size] == phrase:
+                    return True
+        return False
+
+class ApodSearchIndex:
+    """
+    A local full-text index over the ``title`` and
+    ``explanation`` of APOD results. It uses SQLite FTS5
+    when it's available and an in-memory inverted index
+    otherwise; both rank results with BM25, giving more
+    weight to titles.
+
+    Queries are made of words, that must all appear, and
+    quoted phrases, like ``crab "supernova remnant"``.
+
+    **Parameters**
+
+        **path** (str) - The database file. Default is
+        ``":memory:"``.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod
+            from nasawrapper.search import ApodSearchIndex
+            from datetime import datetime
+
+            apod = SyncApod("DEMO_KEY")
+            index = ApodSearchIndex("apod.db")
+            index.add(apod.get_apod({
+                "start_date": datetime(2021, 1, 1),
+                "end_date": datetime(2021, 3, 1)
+            }))
+
+            for result in index.search('"crab nebula"', limit=5):
+                print(result.apod["date"], result.apod["title"])
+    """
+    def __init__(self, path: str = ":memory:") -> None:
+        self._path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+        self._fts = _has_fts5(self._connection)
+
+        if self._fts:
+            self._connection.executescript(_FTS_SCHEMA)
+            self._inverted = None
+        else:
+            self._inverted = _InvertedIndex()
+            for date, title, explanation in self._connection.execute("SELECT date, title, explanation FROM apods"):
+                self._inverted.add(date, title, explanation)
+
+    @property
+    def path(self):
+        """
+        Returns the database file.
+        """
+        return self._path
+
+    @property
+    def uses_fts5(self):
+        """
+        Returns whether SQLite FTS5 is being used.
+        """
+        return self._fts
+
+    def close(self) -> None:
+        """
+        Closes the database.
+        """
+        self._connection.close()
+
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM apods").fetchone()[0]
+
+    def __contains__(self, date: str) -> bool:
+        return self._connection.execute("SELECT 1 FROM apods WHERE date = ?", (date,)).fetchone() is not None
+
+    def add(self, results: Union[ApodResponse, Iterable[ApodResponse]]) -> int:
+        """
+        Indexes APOD results, replacing the dates that
+        were already indexed if they changed. Returns how
+        many dates were added or updated.
+        """
+        if isinstance(results, dict):
+            results = [results]
+
+        count = 0
+        with self._connection:
+            for result in results:
+                date = result["date"]
+                data = json.dumps(result, sort_keys=True)
+                row = self._connection.execute("SELECT data FROM apods WHERE date = ?", (date,)).fetchone()
+                if row is not None and row[0] == data:
+                    continue
+
+                title, explanation = result.get("title", ""), result.get("explanation", "")
+                # an upsert keeps the rowid, which the FTS triggers rely on
+                self._connection.execute(
+                    """
+                    INSERT INTO apods VALUES (?, ?, ?, ?)
+                    ON CONFLICT (date) DO UPDATE SET
+                        title = excluded.title, explanation = excluded.explanation, data = excluded.data
+                    """,
+                    (date, title, explanation, data)
+                )
+                if not self._fts:
+                    self._inverted.add(date, title, explanation)
+                count += 1
+
+        return count
+
+    def latest_date(self) -> Optional[str]:
+        """
+        Returns the most recent indexed date.
+        """
+        return self._connection.execute("SELECT MAX(date) FROM apods").fetchone()[0]
+
+    def search(
+        self,
+        query: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: Optional[int] = 10
+    ) -> List[SearchResult]:
+        """
+        Returns the APODs matching ``query`` between
+        ``start_date`` and ``end_date`` (inclusive),
+        best matches first.
+        """
+        if not isinstance(query, str):
+            raise TypeError(f"'query' must be 'str', got '{query.__class__.__name__}'")
+
+        bounds = []
+        for key, value in (("start_date", start_date), ("end_date", end_date)):
+            if value is not None and not isinstance(value, datetime):
+                raise TypeError(f"'{key}' must be 'datetime.datetime', got '{value.__class__.__name__}'")
+            bounds.append(value.strftime("%Y-%m-%d") if value else None)
+        first, last = bounds
+
+        items = _parse(query)
+        if not items:
+            return []
+
+        if self._fts:
+            return self._search_fts(items, first, last, limit)
+
+        scores = self._inverted.search(items)
+        dates = sorted(
+            (date for date in scores if (first is None or date >= first) and (last is None or date <= last)),
+            key=lambda date: (-scores[date], date)
+        )
+        if limit is not None:
+            dates = dates[:limit]
+
+        results = []
+        for date in dates:
+            data = self._connection.execute("SELECT data FROM apods WHERE date = ?", (date,)).fetchone()[0]
+            results.append(SearchResult(json.loads(data), scores[date]))
+
+        return results
+
+    def _search_fts(self, items: List[List[str]], first: Optional[str], last: Optional[str], limit: Optional[int]) -> List[SearchResult]:
+        # quoting every item, so user input can't use FTS5 syntax
+        match = " ".join('"' + " ".join(tokens) + '"' for tokens in items)
+
+        sql = f"""
+            SELECT apods.data, bm25(apods_fts, {_TITLE_WEIGHT}, {_EXPLANATION_WEIGHT}) AS rank
+            FROM apods_fts JOIN apods ON apods.rowid = apods_fts.rowid
+            WHERE apods_fts MATCH ?
+        """
+        parameters: List[Any] = [match]
+        if first is not None:
+            sql += " AND apods.date >= ?"
+            parameters.append(first)
+        if last is not None:
+            sql += " AND apods.date <= ?"
+            parameters.append(last)
+        sql += " ORDER BY rank, apods.date"
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(int(limit))
+
+        # bm25() is lower for better matches
+        return [SearchResult(json.loads(data), -rank) for data, rank in self._connection.execute(sql, parameters)]
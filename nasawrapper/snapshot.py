@@ -0,0 +1,406 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .errors import NotFound
+from .merge import AsteroidMerger
+from .neows import Asteroid
+
+SNAPSHOT_VERSION = 1
+
+_ASTEROID_COLUMNS = {
+    "neo_reference_id": np.int64,
+    "absolute_magnitude_h": np.float64,
+    "diameter_min_km": np.float64,
+    "diameter_max_km": np.float64,
+    "is_potentially_hazardous": np.bool_,
+    "is_sentry_object": np.bool_,
+    "epoch_osculation": np.float64,
+    "eccentricity": np.float64,
+    "semi_major_axis": np.float64,
+    "inclination": np.float64,
+    "ascending_node_longitude": np.float64,
+    "perihelion_argument": np.float64,
+    "mean_anomaly": np.float64,
+    "mean_motion": np.float64,
+    "approach_start": np.int64,
+    "approach_count": np.int64
+}
+_ASTEROID_STRINGS = ["id", "name", "nasa_jpl_url", "self_link", "orbit_class_type"]
+
+_APPROACH_COLUMNS = {
+    "neo_reference_id": np.int64,
+    "epoch": np.int64,
+    "miss_distance_km": np.float64,
+    "miss_distance_lunar": np.float64,
+    "miss_distance_au": np.float64,
+    "miss_distance_miles": np.float64,
+    "velocity_km_s": np.float64,
+    "velocity_km_h": np.float64,
+    "velocity_mph": np.float64
+}
+_APPROACH_STRINGS = ["orbiting_body"]
+
+_ORBITAL_ELEMENTS = [
+    "epoch_osculation",
+    "eccentricity",
+    "semi_major_axis",
+    "inclination",
+    "ascending_node_longitude",
+    "perihelion_argument",
+    "mean_anomaly",
+    "mean_motion"
+]
+
+def _float(value: Any) -> float:
+    return float("nan") if value in (None, "") else float(value)
+
+def _save_strings(directory: str, name: str, values: List[str]) -> None:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+
+    np.save(os.path.join(directory, f"{name}.offsets.npy"), offsets)
+    np.save(os.path.join(directory, f"{name}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+def write_snapshot(path: str, results: Any) -> int:
+    """
+    Writes the asteroids of ``results`` (feeds, browse
+    responses, lookup responses or any iterable of them)
+    to ``path`` as a columnar snapshot: one ``.npy`` file
+    per numeric column and an offsets/bytes pair per
+    string column. Asteroids that appear more than once
+    are merged with
+    :py:class:`AsteroidMerger <nasawrapper.merge.AsteroidMerger>`.
+
+    The snapshot is written to a temporary directory and
+    moved to ``path`` at the end, so readers never see a
+    half-written snapshot. Returns the number of asteroids
+    written.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.snapshot import write_snapshot
+
+            neows = SyncNeoWs("DEMO_KEY")
+            write_snapshot("catalogue", neows.get_neo_browse())
+    """
+    # one record per asteroid, sorted by id
+    merger = AsteroidMerger()
+    merger.add(results)
+    asteroids: Dict[int, Asteroid] = {int(asteroid["neo_reference_id"]): asteroid for asteroid in merger}
+    ids = sorted(asteroids)
+
+    columns: Dict[str, List[Any]] = {name: [] for name in _ASTEROID_COLUMNS}
+    strings: Dict[str, List[str]] = {name: [] for name in _ASTEROID_STRINGS}
+    approach_columns: Dict[str, List[Any]] = {name: [] for name in _APPROACH_COLUMNS}
+    approach_strings: Dict[str, List[str]] = {name: [] for name in _APPROACH_STRINGS}
+
+    for neo_reference_id in ids:
+        asteroid = asteroids[neo_reference_id]
+        diameter = asteroid["estimated_diameter"]["kilometers"]
+        orbital_data = asteroid.get("orbital_data") or asteroid.get("orbitral_data") or {}
+        approaches = sorted(asteroid.get("close_approach_data", []), key=lambda item: int(item["epoch_date_close_approach"]))
+
+        columns["neo_reference_id"].append(neo_reference_id)
+        columns["absolute_magnitude_h"].append(_float(asteroid.get("absolute_magnitude_h")))
+        columns["diameter_min_km"].append(float(diameter["estimated_diameter_min"]))
+        columns["diameter_max_km"].append(float(diameter["estimated_diameter_max"]))
+        columns["is_potentially_hazardous"].append(bool(asteroid["is_potentially_hazardous_asteroid"]))
+        columns["is_sentry_object"].append(bool(asteroid.get("is_sentry_object", False)))
+        for element in _ORBITAL_ELEMENTS:
+            columns[element].append(_float(orbital_data.get(element)))
+        columns["approach_start"].append(len(approach_columns["epoch"]))
+        columns["approach_count"].append(len(approaches))
+
+        strings["id"].append(str(asteroid.get("id", neo_reference_id)))
+        strings["name"].append(asteroid.get("name", ""))
+        strings["nasa_jpl_url"].append(asteroid.get("nasa_jpl_url", ""))
+        strings["self_link"].append(asteroid.get("links", {}).get("self", ""))
+        strings["orbit_class_type"].append(orbital_data.get("orbit_class", {}).get("orbit_class_type", ""))
+
+        for approach in approaches:
+            miss_distance = approach["miss_distance"]
+            velocity = approach["relative_velocity"]
+            approach_columns["neo_reference_id"].append(neo_reference_id)
+            approach_columns["epoch"].append(int(approach["epoch_date_close_approach"]))
+            approach_columns["miss_distance_km"].append(_float(miss_distance.get("kilometers")))
+            approach_columns["miss_distance_lunar"].append(_float(miss_distance.get("lunar")))
+            approach_columns["miss_distance_au"].append(_float(miss_distance.get("astronomical")))
+            approach_columns["miss_distance_miles"].append(_float(miss_distance.get("miles")))
+            approach_columns["velocity_km_s"].append(_float(velocity.get("kilometers_per_second")))
+            approach_columns["velocity_km_h"].append(_float(velocity.get("kilometers_per_hour")))
+            approach_columns["velocity_mph"].append(_float(velocity.get("miles_per_hour")))
+            approach_strings["orbiting_body"].append(approach.get("orbiting_body", ""))
+
+    # writing everything to a temporary directory first
+    path = os.path.abspath(path)
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        shutil.rmtree(temporary)
+
+    for table, numeric, text, dtypes in (
+        ("asteroids", columns, strings, _ASTEROID_COLUMNS),
+        ("approaches", approach_columns, approach_strings, _APPROACH_COLUMNS)
+    ):
+        directory = os.path.join(temporary, table)
+        os.makedirs(directory)
+        for name, values in numeric.items():
+            np.save(os.path.join(directory, f"{name}.npy"), np.asarray(values, dtype=dtypes[name]))
+        for name, values in text.items():
+            _save_strings(directory, name, values)
+
+    with open(os.path.join(temporary, "meta.json"), "w") as f:
+        json.dump({
+            "version": SNAPSHOT_VERSION,
+            "asteroids": len(ids),
+            "approaches": len(approach_columns["epoch"]),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }, f)
+
+    # swapping the old snapshot with the new one
+    if os.path.exists(path):
+        old = f"{path}.old"
+        if os.path.exists(old):
+            shutil.rmtree(old)
+        os.rename(path, old)
+        os.rename(temporary, path)
+        shutil.rmtree(old)
+    else:
+        os.rename(temporary, path)
+
+    return len(ids)
+
+class StringColumn:
+    """
+    A memory-mapped string column of a
+    :py:class:`Snapshot`. Strings are only decoded
+    when they are accessed.
+    """
+    def __init__(self, offsets: np.ndarray, data: np.ndarray) -> None:
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string column index out of range")
+
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return bytes(self._data[start:end]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+class _Table:
+    def __init__(self, directory: str, columns: Dict[str, type], strings: List[str]) -> None:
+        self._columns = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+            for name in columns
+        }
+        self._strings = {
+            name: StringColumn(
+                np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, f"{name}.data.npy"), mmap_mode="r")
+            )
+            for name in strings
+        }
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self._columns:
+            return self._columns[name]
+        return self._strings[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns or name in self._strings
+
+    @property
+    def columns(self) -> List[str]:
+        return [*self._columns, *self._strings]
+
+class Snapshot:
+    """
+    Opens a snapshot written by :py:func:`write_snapshot`.
+    Every column is memory-mapped, so opening it doesn't
+    read the data and the pages are shared, through the
+    page cache, between every process that opens the
+    same snapshot.
+
+    Columns are accessed with ``snapshot.asteroids[name]``
+    and ``snapshot.approaches[name]``; numeric columns are
+    read-only NumPy arrays and string columns are
+    :py:class:`StringColumn`.
+
+    **Parameters**
+
+        **path** (str) - The snapshot directory.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.snapshot import Snapshot
+
+            snapshot = Snapshot("catalogue")
+            hazardous = snapshot.asteroids["is_potentially_hazardous"]
+            print(hazardous.sum(), "hazardous asteroids")
+            print(snapshot.get(3542519)["name"])
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self._meta = json.load(f)
+
+        if self._meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"'{path}' has snapshot version {self._meta.get('version')}, expected {SNAPSHOT_VERSION}")
+
+        self._asteroids = _Table(os.path.join(path, "asteroids"), _ASTEROID_COLUMNS, _ASTEROID_STRINGS)
+        self._approaches = _Table(os.path.join(path, "approaches"), _APPROACH_COLUMNS, _APPROACH_STRINGS)
+
+    @property
+    def path(self):
+        """
+        Returns the snapshot directory.
+        """
+        return self._path
+
+    @property
+    def meta(self):
+        """
+        Returns the snapshot metadata.
+        """
+        return self._meta
+
+    @property
+    def asteroids(self):
+        """
+        Returns the asteroid columns, one row per
+        asteroid, sorted by ``neo_reference_id``.
+        """
+        return self._asteroids
+
+    @property
+    def approaches(self):
+        """
+        Returns the close approach columns, one row
+        per approach, grouped by asteroid and sorted
+        by epoch.
+        """
+        return self._approaches
+
+    def __len__(self) -> int:
+        return self._meta["asteroids"]
+
+    def __contains__(self, neo_reference_id: int) -> bool:
+        return self.find(neo_reference_id) is not None
+
+    def find(self, neo_reference_id: int) -> Optional[int]:
+        """
+        Returns the row of an asteroid, found with
+        binary search, or ``None``.
+        """
+        ids = self._asteroids["neo_reference_id"]
+        neo_reference_id = int(neo_reference_id)
+        row = int(np.searchsorted(ids, neo_reference_id))
+        if row < len(ids) and ids[row] == neo_reference_id:
+            return row
+        return None
+
+    def get(self, neo_reference_id: int) -> Asteroid:
+        """
+        Returns an asteroid in the same shape as
+        :py:class:`SyncNeoWs.get_neo_lookup <nasawrapper.neows.SyncNeoWs.get_neo_lookup>`.
+        Only the fields stored in the snapshot are
+        filled.
+        """
+        row = self.find(neo_reference_id)
+        if row is None:
+            raise NotFound(f"Asteroid of id '{neo_reference_id}' could not be found")
+
+        return self.asteroid(row)
+
+    def asteroid(self, row: int) -> Asteroid:
+        """
+        Rebuilds the asteroid stored at ``row``.
+        """
+        table = self._asteroids
+        neo_reference_id = str(int(table["neo_reference_id"][row]))
+        diameter_min = float(table["diameter_min_km"][row])
+        diameter_max = float(table["diameter_max_km"][row])
+
+        def diameter(factor: float) -> Dict[str, float]:
+            return {
+                "estimated_diameter_min": diameter_min * factor,
+                "estimated_diameter_max": diameter_max * factor
+            }
+
+        asteroid = {
+            "links": {"self": table["self_link"][row]},
+            "id": table["id"][row],
+            "neo_reference_id": neo_reference_id,
+            "name": table["name"][row],
+            "nasa_jpl_url": table["nasa_jpl_url"][row],
+            "absolute_magnitude_h": float(table["absolute_magnitude_h"][row]),
+            "estimated_diameter": {
+                "kilometers": diameter(1.0),
+                "meters": diameter(1000.0),
+                "miles": diameter(0.621371192),
+                "feet": diameter(3280.839895)
+            },
+            "is_potentially_hazardous_asteroid": bool(table["is_potentially_hazardous"][row]),
+            "close_approach_data": self._close_approach_data(
+                int(table["approach_start"][row]),
+                int(table["approach_count"][row])
+            ),
+            "is_sentry_object": bool(table["is_sentry_object"][row])
+        }
+
+        if not np.isnan(table["semi_major_axis"][row]):
+            asteroid["orbital_data"] = {
+                **{element: repr(float(table[element][row])) for element in _ORBITAL_ELEMENTS},
+                "orbit_class": {"orbit_class_type": table["orbit_class_type"][row]}
+            }
+
+        return asteroid
+
+    def _close_approach_data(self, start: int, count: int) -> List[Dict[str, Any]]:
+        table = self._approaches
+        approaches = []
+        for row in range(start, start + count):
+            epoch = int(table["epoch"][row])
+            date = datetime.fromtimestamp(epoch / 1000, timezone.utc)
+            approaches.append({
+                "close_approach_date": date.strftime("%Y-%m-%d"),
+                "close_approach_date_full": date.strftime("%Y-%b-%d %H:%M"),
+                "epoch_date_close_approach": epoch,
+                "relative_velocity": {
+                    "kilometers_per_second": repr(float(table["velocity_km_s"][row])),
+                    "kilometers_per_hour": repr(float(table["velocity_km_h"][row])),
+                    "miles_per_hour": repr(float(table["velocity_mph"][row]))
+                },
+                "miss_distance": {
+                    "astronomical": repr(float(table["miss_distance_au"][row])),
+                    "lunar": repr(float(table["miss_distance_lunar"][row])),
+                    "kilometers": repr(float(table["miss_distance_km"][row])),
+                    "miles": repr(float(table["miss_distance_miles"][row]))
+                },
+                "orbiting_body": table["orbiting_body"][row]
+            })
+
+        return approaches
+
+    def __iter__(self) -> Iterator[Asteroid]:
+        for row in range(len(self)):
+            yield self.asteroid(row)
@@ -0,0 +1,219 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .utils.iter_asteroids import iter_asteroids
+
+APPROACH_DTYPE = np.dtype([
+    ("neo_reference_id", np.int64),
+    ("epoch", np.int64),
+    ("miss_distance_km", np.float64),
+    ("miss_distance_lunar", np.float64),
+    ("miss_distance_au", np.float64),
+    ("velocity_km_s", np.float64),
+    ("diameter_min_km", np.float64),
+    ("diameter_max_km", np.float64),
+    ("is_potentially_hazardous", np.bool_),
+    ("is_sentry_object", np.bool_)
+])
+"""
+The dtype of the arrays returned by :py:func:`to_approach_table`.
+``epoch`` is in milliseconds since the Unix epoch, just
+like ``epoch_date_close_approach`` on API response.
+"""
+
+def _approach_rows(results: Any) -> Iterable[Tuple]:
+    for asteroid in iter_asteroids(results):
+        neo_reference_id = int(asteroid["neo_reference_id"])
+        diameter = asteroid["estimated_diameter"]["kilometers"]
+        diameter_min = float(diameter["estimated_diameter_min"])
+        diameter_max = float(diameter["estimated_diameter_max"])
+        hazardous = bool(asteroid["is_potentially_hazardous_asteroid"])
+        sentry = bool(asteroid.get("is_sentry_object", False))
+
+        for approach in asteroid.get("close_approach_data", []):
+            miss_distance = approach["miss_distance"]
+            yield (
+                neo_reference_id,
+                int(approach["epoch_date_close_approach"]),
+                float(miss_distance["kilometers"]),
+                float(miss_distance["lunar"]),
+                float(miss_distance["astronomical"]),
+                float(approach["relative_velocity"]["kilometers_per_second"]),
+                diameter_min,
+                diameter_max,
+                hazardous,
+                sentry
+            )
+
+def to_approach_table(results: Any) -> np.ndarray:
+    """
+    Flattens a feed, a list of feeds, a browse response
+    or a stream of browse pages into a NumPy structured
+    array with one row per close approach. The columns are
+    described by :py:data:`APPROACH_DTYPE`.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.tables import to_approach_table
+            from datetime import datetime
+
+            neows = SyncNeoWs("DEMO_KEY")
+            table = to_approach_table(neows.get_neo_feed({
+                "start_date": datetime(2010, 2, 3),
+                "end_date": datetime(2010, 2, 4)
+            }))
+            print(table["miss_distance_lunar"].min())
+    """
+    return np.fromiter(_approach_rows(results), dtype=APPROACH_DTYPE)
+
+def concat_approach_tables(tables: Iterable[np.ndarray]) -> np.ndarray:
+    """
+    Joins many tables returned by :py:func:`to_approach_table`
+    into a single one.
+    """
+    tables = list(tables)
+    if not tables:
+        return np.empty(0, dtype=APPROACH_DTYPE)
+
+    return np.concatenate(tables)
+
+def filter_approaches(
+    table: np.ndarray,
+    bounds: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+    hazardous: Optional[bool] = None,
+    sentry: Optional[bool] = None
+) -> np.ndarray:
+    """
+    Returns the rows of ``table`` matching every
+    condition. ``bounds`` maps a numeric column to an
+    inclusive ``(minimum, maximum)`` pair, where ``None``
+    means unbounded.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.tables import filter_approaches
+
+            close = filter_approaches(
+                table,
+                {"miss_distance_lunar": (None, 10)},
+                hazardous=True
+            )
+    """
+    mask = np.ones(len(table), dtype=np.bool_)
+
+    for column, (minimum, maximum) in (bounds or {}).items():
+        if column not in table.dtype.names:
+            raise KeyError(f"'{column}' is not a column of the table")
+
+        values = table[column]
+        if minimum is not None:
+            mask &= values >= minimum
+        if maximum is not None:
+            mask &= values <= maximum
+
+    if hazardous is not None:
+        mask &= table["is_potentially_hazardous"] == hazardous
+    if sentry is not None:
+        mask &= table["is_sentry_object"] == sentry
+
+    return table[mask]
+
+def top_approaches(
+    table: np.ndarray,
+    k: int,
+    column: str = "miss_distance_km",
+    largest: bool = False
+) -> np.ndarray:
+    """
+    Returns the ``k`` rows with the smallest (or largest,
+    if ``largest`` is ``True``) values of ``column``,
+    sorted. It runs in linear time plus ``O(k log k)``,
+    so it's faster than sorting the whole table.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.tables import top_approaches
+
+            # the 10 closest approaches
+            closest = top_approaches(table, 10)
+    """
+    if not isinstance(k, int):
+        raise TypeError(f"'k' must be 'int', got '{k.__class__.__name__}'")
+
+    values = table[column]
+    if largest:
+        values = -values
+
+    k = min(k, len(table))
+    if k <= 0:
+        return table[:0]
+
+    indexes = np.argpartition(values, k - 1)[:k]
+    indexes = indexes[np.argsort(values[indexes], kind="stable")]
+    return table[indexes]
+
+def group_approaches(
+    table: np.ndarray,
+    by: str = "neo_reference_id",
+    column: str = "miss_distance_km",
+    reduce: str = "min"
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Groups ``table`` by the column ``by`` and reduces
+    ``column`` inside every group. ``reduce`` can be
+    ``"min"``, ``"max"``, ``"sum"`` or ``"mean"``.
+
+    Returns a tuple with the group keys, the reduced
+    values and the number of rows of each group.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper.tables import group_approaches
+
+            # closest approach of each asteroid
+            ids, distances, counts = group_approaches(table)
+    """
+    reducers = {
+        "min": np.minimum.reduceat,
+        "max": np.maximum.reduceat,
+        "sum": np.add.reduceat,
+        "mean": np.add.reduceat
+    }
+    if reduce not in reducers:
+        raise ValueError(f"'reduce' must be one of {', '.join(reducers)}, got '{reduce}'")
+
+    if not len(table):
+        return table[by][:0], np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+
+    order = np.argsort(table[by], kind="stable")
+    keys = table[by][order]
+    values = table[column][order]
+
+    # indexes where a new group starts
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(starts, len(keys)))
+    reduced = reducers[reduce](values, starts)
+    if reduce == "mean":
+        reduced = reduced / counts
+
+    return keys[starts], reduced, counts
+
+def approach_tables(results: Iterable[Any]) -> Iterable[np.ndarray]:
+    """
+    Yields one table per item of ``results``, so very
+    large browse crawls can be processed in chunks
+    instead of being loaded at once.
+    """
+    for result in results:
+        yield to_approach_table(result)
+
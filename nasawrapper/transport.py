@@ -0,0 +1,367 @@
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from . import metrics
+from .errors import ApiError, InvalidApiKey, NotFound, RateLimitError
+
+API_ROOT = "https://api.nasa.gov"
+"""
+The root of every URL built by the clients.
+"""
+
+_api_root = API_ROOT
+
+def set_api_root(root: str = API_ROOT) -> None:
+    """
+    Sends every request made by the clients to ``root``
+    instead of :py:data:`API_ROOT`, like a local stand-in
+    server used by benchmarks. Without arguments, requests
+    go to NASA again.
+    """
+    global _api_root
+    _api_root = root.rstrip("/")
+
+_cassette: Any = None
+
+def use_cassette(cassette: Any = None) -> None:
+    """
+    Makes every request go through ``cassette`` (a
+    :py:class:`Cassette <nasawrapper.cassette.Cassette>`),
+    that records them or replays them. Without arguments,
+    requests go to the network again.
+    """
+    global _cassette
+    _cassette = cassette
+
+_local = threading.local()
+
+def use_session(session: Any = None) -> None:
+    """
+    Makes the sync requests of the current thread use
+    ``session`` (a :py:class:`requests.Session`), so they
+    reuse its connections. Called by the threads of
+    :py:class:`BatchExecutor <nasawrapper.batch.BatchExecutor>`.
+    """
+    _local.session = session
+
+def _rewrite(url: str) -> str:
+    if _api_root != API_ROOT and url.startswith(API_ROOT):
+        return _api_root + url[len(API_ROOT):]
+    return url
+
+def cache_key(url: str) -> str:
+    """
+    Returns ``url`` without its ``api_key`` and with
+    sorted parameters, so the same question asked with
+    different keys gets the same key.
+    """
+    parts = urlsplit(url)
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "api_key")
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+def _check_status(status: int, api_key: str, not_found: Optional[str]) -> None:
+    if status == 429:
+        raise RateLimitError("You are being rate limited")
+    elif status == 403:
+        raise InvalidApiKey(f"'{api_key}' is not a valid API key")
+    elif status == 404 and not_found is not None:
+        raise NotFound(not_found)
+
+def raise_for_error(data: Any, api_key: str) -> None:
+    """
+    Raises the exception matching ``data`` if it's an
+    error body of the API, like ``{"code": 400, "msg": ...}``
+    or ``{"error": {"code": "OVER_RATE_LIMIT", ...}}``, which
+    some endpoints return instead of the expected results.
+    """
+    if not isinstance(data, dict):
+        return
+
+    if isinstance(data.get("error"), dict):
+        code, message = data["error"].get("code"), data["error"].get("message", "")
+    elif "code" in data and "msg" in data:
+        code, message = data["code"], data["msg"]
+    else:
+        return
+
+    if code in (429, "OVER_RATE_LIMIT"):
+        raise RateLimitError("You are being rate limited")
+    elif code in (403, "API_KEY_INVALID", "API_KEY_MISSING"):
+        raise InvalidApiKey(f"'{api_key}' is not a valid API key")
+    elif code == 404:
+        raise NotFound(message)
+    raise ApiError(f"{code}: {message}")
+
+def _report(
+    url: str,
+    status: Optional[int],
+    started: float,
+    size: int,
+    decode: Optional[float],
+    cache_outcome: Optional[str],
+    timings: Optional[Dict[str, float]]
+) -> None:
+    timings = timings or {}
+    metrics.emit(metrics.RequestEvent(
+        endpoint=metrics.endpoint_of(url),
+        url=cache_key(url),
+        status=status,
+        dns=timings.get("dns"),
+        connect=timings.get("connect"),
+        ttfb=timings.get("ttfb"),
+        total=time.perf_counter() - started,
+        bytes=size,
+        decode=decode,
+        cache=cache_outcome
+    ))
+
+def _check(
+    status: int,
+    api_key: str,
+    not_found: Optional[str],
+    url: str,
+    started: float,
+    size: int,
+    cache_outcome: Optional[str],
+    timings: Optional[Dict[str, float]]
+) -> None:
+    try:
+        _check_status(status, api_key, not_found)
+    except Exception:
+        if metrics.has_hooks():
+            _report(url, status, started, size, None, cache_outcome, timings)
+        raise
+
+def _decode(
+    body: bytes,
+    url: str,
+    status: Optional[int],
+    started: float,
+    cache_outcome: Optional[str],
+    timings: Optional[Dict[str, float]] = None
+) -> Any:
+    if not metrics.has_hooks():
+        return json.loads(body)
+
+    decode_started = time.perf_counter()
+    data = json.loads(body)
+    _report(url, status, started, len(body), time.perf_counter() - decode_started, cache_outcome, timings)
+    return data
+
+def _trace_config() -> Any:
+    # aiohttp tracing; timings are written to the dict given
+    # as the request's 'trace_request_ctx', if any
+    import aiohttp
+
+    trace = aiohttp.TraceConfig()
+
+    async def dns_start(session, context, params):
+        context.dns_started = time.perf_counter()
+
+    async def dns_end(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx["dns"] = time.perf_counter() - context.dns_started
+
+    async def connect_start(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def connect_end(session, context, params):
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx["connect"] = time.perf_counter() - context.connect_started
+
+    async def request_start(session, context, params):
+        context.request_started = time.perf_counter()
+
+    async def request_end(session, context, params):
+        # called once the response headers are received
+        if context.trace_request_ctx is not None:
+            context.trace_request_ctx["ttfb"] = time.perf_counter() - context.request_started
+
+    trace.on_dns_resolvehost_start.append(dns_start)
+    trace.on_dns_resolvehost_end.append(dns_end)
+    trace.on_connection_create_start.append(connect_start)
+    trace.on_connection_create_end.append(connect_end)
+    trace.on_request_start.append(request_start)
+    trace.on_request_end.append(request_end)
+    return trace
+
+def open_session(limit: int = 100) -> Any:
+    """
+    Returns a new :py:class:`aiohttp.ClientSession` keeping
+    at most ``limit`` connections open at once. Its requests
+    are timed for the hooks of :py:mod:`nasawrapper.metrics`
+    only if a hook is installed when it's opened. It must be
+    called from a running event loop.
+    """
+    import aiohttp
+
+    # tracing costs a few callbacks per request, so it's
+    # only set up if someone listens
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=limit),
+        trace_configs=[_trace_config()] if metrics.has_hooks() else None
+    )
+
+def get_json(
+    url: str,
+    api_key: str,
+    cache: Any = None,
+    budget: Any = None,
+    not_found: Optional[str] = None,
+    engine: Any = None,
+    coalesce: bool = True
+) -> Any:
+    """
+    Makes a request with :py:mod:`requests` and returns
+    the decoded response. Every sync client goes through
+    here: responses are read from and written to ``cache``
+    (a :py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`)
+    and a token is taken from ``budget`` (a
+    :py:class:`RateBudget <nasawrapper.rate_limit.RateBudget>`)
+    before each request, when they are given.
+
+    ``not_found`` is the message of the
+    :py:class:`NotFound <nasawrapper.errors.NotFound>`
+    raised on ``404``; without it, the ``404`` body is
+    returned.
+
+    After each call, a :py:class:`RequestEvent <nasawrapper.metrics.RequestEvent>`
+    is sent to the hooks added with
+    :py:func:`add_hook <nasawrapper.metrics.add_hook>`.
+
+    With an ``engine`` (an :py:class:`AsyncEngine <nasawrapper.engine.AsyncEngine>`),
+    the request is made by its event loop instead, and
+    is shared with identical requests in flight unless
+    ``coalesce`` is ``False``.
+    """
+    if engine is not None:
+        return engine.get_json(url, api_key, cache, budget, not_found, coalesce)
+
+    started = time.perf_counter()
+    url = _rewrite(url)
+    key = cache_key(url) if cache is not None else None
+    if cache is not None:
+        body = cache.get(key)
+        if body is not None:
+            return _decode(body, url, None, started, "hit")
+
+    outcome = "miss" if cache is not None else None
+    if _cassette is not None and _cassette.replaying:
+        status, body = _cassette.play(url)
+        timings = None
+    else:
+        # imported here, so replaying doesn't need it
+        import requests
+
+        if budget is not None:
+            budget.acquire()
+
+        # making request
+        session = getattr(_local, "session", None)
+        request = (session or requests).get(url)
+        if budget is not None:
+            budget.update(request.headers)
+
+        status, body = request.status_code, request.content
+        timings = {"ttfb": request.elapsed.total_seconds()} if metrics.has_hooks() else None
+        if _cassette is not None:
+            _cassette.record(url, api_key, status, body)
+
+    _check(status, api_key, not_found, url, started, len(body), outcome, timings)
+
+    if cache is not None and status == 200:
+        cache.set(key, body)
+
+    return _decode(body, url, status, started, outcome, timings)
+
+async def _read(session: Any, url: str, budget: Any, timings: Optional[Dict[str, float]]) -> Tuple[int, bytes]:
+    async with session.get(url, trace_request_ctx=timings) as response:
+        if budget is not None:
+            budget.update(response.headers)
+
+        return response.status, await response.read()
+
+async def get_json_async(
+    url: str,
+    api_key: str,
+    cache: Any = None,
+    budget: Any = None,
+    not_found: Optional[str] = None,
+    session: Any = None
+) -> Any:
+    """
+    |coro|
+
+    Same thing as :py:func:`get_json`, but with
+    :py:mod:`aiohttp`. Every async client goes through here.
+    The request is made with ``session`` (an
+    :py:class:`aiohttp.ClientSession`) when it's given, or
+    with a new one.
+    """
+    started = time.perf_counter()
+    url = _rewrite(url)
+    key = cache_key(url) if cache is not None else None
+    if cache is not None:
+        body = cache.get(key)
+        if body is not None:
+            return _decode(body, url, None, started, "hit")
+
+    outcome = "miss" if cache is not None else None
+    if _cassette is not None and _cassette.replaying:
+        status, body = _cassette.play(url)
+        timings = None
+    else:
+        if budget is not None:
+            await budget.acquire_async()
+
+        timings = {} if metrics.has_hooks() else None
+
+        # making request
+        if session is None:
+            async with open_session() as session:
+                status, body = await _read(session, url, budget, timings)
+        else:
+            status, body = await _read(session, url, budget, timings)
+        if _cassette is not None:
+            _cassette.record(url, api_key, status, body)
+
+    _check(status, api_key, not_found, url, started, len(body), outcome, timings)
+
+    if cache is not None and status == 200:
+        cache.set(key, body)
+
+    return _decode(body, url, status, started, outcome, timings)
+
+async def get_body_async(
+    url: str,
+    session: Any,
+    budget: Any = None,
+    timeout: Optional[float] = None,
+    cache_outcome: Optional[str] = None
+) -> Tuple[int, bytes]:
+    """
+    |coro|
+
+    Makes a request to ``url``, as is, with ``session`` and
+    returns its status and body, neither checked nor
+    decoded, for programs forwarding responses like the
+    :py:mod:`proxy <nasawrapper.proxy>`. A token is taken
+    from ``budget`` first, raising
+    :py:class:`RateLimitError <nasawrapper.errors.RateLimitError>`
+    if it would wait more than ``timeout`` seconds.
+
+    The :py:class:`RequestEvent <nasawrapper.metrics.RequestEvent>`
+    sent to the hooks has ``cache_outcome`` as its ``cache``.
+    """
+    started = time.perf_counter()
+    if budget is not None:
+        await budget.acquire_async(timeout)
+
+    timings = {} if metrics.has_hooks() else None
+    status, body = await _read(session, url, budget, timings)
+    if timings is not None:
+        _report(url, status, started, len(body), None, cache_outcome, timings)
+    return status, body
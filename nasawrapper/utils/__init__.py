@@ -1 +1,3 @@
-from .get_remaining_rate_limit import get_remaining_rate_limit
\ No newline at end of file
+from .get_remaining_rate_limit import get_remaining_rate_limit
+from .iter_asteroids import iter_asteroids
+from .content_hash import content_hash
@@ -0,0 +1,29 @@
+import hashlib
+import json
+from typing import Any, Iterable
+
+def content_hash(asteroid: Any, ignore: Iterable[str] = ("links",)) -> str:
+    """
+    Returns a stable SHA-1 hash of an asteroid (or any
+    other JSON object). Keys are sorted before hashing,
+    so the hash doesn't depend on their order, and the
+    top-level fields in ``ignore`` are left out. By
+    default, ``links`` is ignored, since it changes with
+    the API key used to make the request.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.utils import content_hash
+
+            neows = SyncNeoWs("DEMO_KEY")
+            print(content_hash(neows.get_neo_lookup(3542519)))
+    """
+    ignore = set(ignore)
+    if ignore and isinstance(asteroid, dict):
+        asteroid = {key: value for key, value in asteroid.items() if key not in ignore}
+
+    encoded = json.dumps(asteroid, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
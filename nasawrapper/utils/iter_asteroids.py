@@ -0,0 +1,56 @@
+from typing import Any, Iterable, Iterator, Union
+
+from ..neows import Asteroid, NeoWsBrowseResponse, NeoWsFeedResponse
+
+def iter_asteroids(
+    results: Union[NeoWsFeedResponse, NeoWsBrowseResponse, Asteroid, Iterable[Any]]
+) -> Iterator[Asteroid]:
+    """
+    Yields every asteroid contained in a NeoWs
+    result, no matter its shape. It accepts the
+    return of
+    :py:class:`SyncNeoWs.get_neo_feed <nasawrapper.neows.SyncNeoWs.get_neo_feed>`,
+    :py:class:`SyncNeoWs.get_neo_browse <nasawrapper.neows.SyncNeoWs.get_neo_browse>`,
+    :py:class:`SyncNeoWs.get_neo_lookup <nasawrapper.neows.SyncNeoWs.get_neo_lookup>`
+    or any iterable of them, like a list of feeds
+    covering a date range or a generator of browse pages.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncNeoWs
+            from nasawrapper.utils import iter_asteroids
+            from datetime import datetime
+
+            neows = SyncNeoWs("DEMO_KEY")
+            feed = neows.get_neo_feed({
+                "start_date": datetime(2010, 2, 3),
+                "end_date": datetime(2010, 2, 4)
+            })
+            for asteroid in iter_asteroids(feed):
+                print(asteroid["name"])
+    """
+    if isinstance(results, dict):
+        # a single asteroid, from /neo/{id}
+        if "neo_reference_id" in results:
+            yield results
+            return
+
+        near_earth_objects = results.get("near_earth_objects")
+        if near_earth_objects is None:
+            raise TypeError("'results' is not a NeoWs feed, browse or lookup response")
+
+        # /feed groups asteroids by date, /browse doesn't
+        if isinstance(near_earth_objects, dict):
+            for asteroids in near_earth_objects.values():
+                yield from asteroids
+        else:
+            yield from near_earth_objects
+        return
+
+    if isinstance(results, (str, bytes)):
+        raise TypeError(f"'results' must be a NeoWs response, got '{results.__class__.__name__}'")
+
+    for result in results:
+        yield from iter_asteroids(result)
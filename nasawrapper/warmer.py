@@ -0,0 +1,287 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from .apod import SyncApod
+from .cache import ResponseCache
+from .errors import RateLimitError
+from .neows import SyncNeoWs
+from .rate_limit import RateBudget
+from .transport import API_ROOT
+
+class _WarmingCache:
+    """
+    Given to the warmer's own clients: lookups always miss,
+    so every request refreshes the shared cache, and entries
+    are stored for the warmer's ``ttl``.
+    """
+    def __init__(self, cache: ResponseCache, ttl: float) -> None:
+        self._cache = cache
+        self._ttl = ttl
+
+    def get(self, key: str) -> None:
+        # a hit would hand back the very entry being refreshed,
+        # and the warmer would never make a request
+        return None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, self._ttl)
+
+class _ReservedBudget:
+    """
+    Given to the warmer's own clients: a request is only
+    made if more than ``reserve`` tokens are left, so warming
+    never takes the tokens of user requests.
+    """
+    def __init__(self, budget: RateBudget, reserve: int) -> None:
+        self._budget = budget
+        self._reserve = reserve
+
+    def acquire(self, timeout: Optional[float] = None) -> None:
+        if not self._budget.try_acquire(self._reserve):
+            raise RateLimitError("The warmer's share of the rate budget is exhausted")
+
+    def update(self, headers: Any) -> None:
+        self._budget.update(headers)
+
+class CacheWarmer:
+    """
+    Fills a :py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`
+    ahead of user requests: today's APOD, polled right after
+    it's published, and the NeoWs feeds of the next few days.
+    Clients given the same cache then never pay for a cold
+    request of those.
+
+    The warmer's requests always go to the API and are
+    stored for twice the ``interval``, so entries are
+    refreshed before they expire. Today's APOD is polled
+    every ``poll_interval`` seconds, doubling up to
+    ``interval``, for ``poll_window`` seconds after the first
+    attempt of the day. With a ``budget``, a request is
+    skipped unless more than ``reserve`` tokens are left.
+
+    **Parameters**
+
+        **api_key** (str) - The API key.
+
+        **cache** (:py:class:`ResponseCache <nasawrapper.cache.ResponseCache>`) - The
+        cache shared with the user-facing clients.
+
+        **budget** (Optional[:py:class:`RateBudget <nasawrapper.rate_limit.RateBudget>`]) - The
+        rate budget shared with the user-facing clients.
+
+        **feed_days** (int) - How many days of feeds, starting
+        today, are loaded. Default is ``7``.
+
+        **interval** (float) - Seconds between two warming
+        rounds. Default is ``1800``.
+
+        **poll_interval** (float) - Seconds before polling for
+        today's APOD again. Default is ``60``.
+
+        **poll_window** (float) - Seconds during which today's
+        APOD is polled with backoff. Default is ``7200``.
+
+        **reserve** (int) - Tokens of the ``budget`` left to user
+        requests. Default is ``50``.
+
+        **api_root** (str) - Where requests are sent, like the
+        :py:mod:`caching proxy <nasawrapper.proxy>` the clients
+        use. Default is :py:data:`API_ROOT <nasawrapper.transport.API_ROOT>`.
+
+    **Example**
+
+        .. code-block:: python3
+
+            from nasawrapper import SyncApod, SyncNeoWs
+            from nasawrapper.cache import ResponseCache
+            from nasawrapper.rate_limit import RateBudget
+            from nasawrapper.warmer import CacheWarmer
+
+            cache, budget = ResponseCache(), RateBudget()
+            apod = SyncApod("MY_KEY", cache=cache, budget=budget)
+            neows = SyncNeoWs("MY_KEY", cache=cache, budget=budget)
+
+            with CacheWarmer("MY_KEY", cache, budget):
+                ...
+                apod.get_today_apod() # served from the cache
+                neows.get_today_neo_feed() # served from the cache
+    """
+    def __init__(
+        self,
+        api_key: str,
+        cache: ResponseCache,
+        budget: Optional[RateBudget] = None,
+        feed_days: int = 7,
+        interval: float = 1800.0,
+        poll_interval: float = 60.0,
+        poll_window: float = 7200.0,
+        reserve: int = 50,
+        api_root: str = API_ROOT
+    ) -> None:
+        if not isinstance(feed_days, int) or feed_days < 0:
+            raise ValueError("'feed_days' must be an 'int' of at least 0")
+        if interval <= 0 or poll_interval <= 0:
+            raise ValueError("'interval' and 'poll_interval' must be positive")
+
+        warming_cache = _WarmingCache(cache, interval * 2)
+        reserved = _ReservedBudget(budget, reserve) if budget is not None else None
+        self._apod = SyncApod(api_key, cache=warming_cache, budget=reserved, api_root=api_root)
+        self._neows = SyncNeoWs(api_key, cache=warming_cache, budget=reserved, api_root=api_root)
+
+        self._cache = cache
+        self._feed_days = feed_days
+        self._interval = interval
+        self._poll_interval = poll_interval
+        self._poll_window = poll_window
+
+        self._apod_date: Optional[str] = None
+        self._poll_date: Optional[str] = None
+        self._poll_started = 0.0
+        self._backoff = poll_interval
+        self._feeds_warmed: Optional[float] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def cache(self):
+        """
+        Returns the cache being warmed.
+        """
+        return self._cache
+
+    @property
+    def apod_date(self):
+        """
+        Returns the date (``YYYY-MM-DD``) of the last APOD
+        warmed, or ``None``.
+        """
+        return self._apod_date
+
+    def warm_apod(self) -> bool:
+        """
+        Requests today's APOD. Returns whether it was
+        published and is now cached.
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        try:
+            result = self._apod.get_today_apod()
+        except RateLimitError:
+            return False
+
+        # before publication, the API answers with an error body
+        if isinstance(result, dict) and result.get("date") == today:
+            self._apod_date = today
+            return True
+        return False
+
+    def warm_feeds(self) -> int:
+        """
+        Requests the feed of each of the next ``feed_days``
+        days, and the feeds of the whole period, 8 days at a
+        time. Returns how many feeds were cached.
+        """
+        today = datetime.now()
+        today = datetime(today.year, today.month, today.day)
+        days = [today + timedelta(days=offset) for offset in range(self._feed_days)]
+
+        windows = [(day, day) for day in days]
+        for position in range(0, len(days), 8):
+            chunk = days[position:position + 8]
+            if len(chunk) > 1:
+                windows.append((chunk[0], chunk[-1]))
+
+        count = 0
+        for start_date, end_date in windows:
+            try:
+                self._neows.get_neo_feed({"start_date": start_date, "end_date": end_date})
+            except RateLimitError:
+                break
+            count += 1
+
+        return count
+
+    def run_once(self) -> float:
+        """
+        Runs one warming round and returns how many seconds
+        to wait before the next one.
+        """
+        now = time.monotonic()
+        if self._feeds_warmed is None or now - self._feeds_warmed >= self._interval:
+            self.warm_feeds()
+            self._feeds_warmed = now
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        if self._apod_date == today:
+            # already published, only keeping it fresh
+            self.warm_apod()
+            return self._interval
+
+        if self._poll_date != today:
+            self._poll_date = today
+            self._poll_started = time.monotonic()
+            self._backoff = self._poll_interval
+
+        if self.warm_apod() or time.monotonic() - self._poll_started > self._poll_window:
+            return self._interval
+
+        delay = self._backoff
+        self._backoff = min(self._backoff * 2, self._interval)
+        return delay
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                delay = self.run_once()
+            except Exception:
+                delay = self._poll_interval
+            self._stop.wait(delay)
+
+    def start(self) -> "CacheWarmer":
+        """
+        Starts warming in a background thread.
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="nasawrapper-cache-warmer", daemon=True)
+            self._thread.start()
+
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the background thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def run_async(self) -> None:
+        """
+        |coro|
+
+        Warms forever from an asyncio task, until it's
+        cancelled. Rounds run in the default executor, so
+        the event loop is never blocked.
+
+        .. code-block:: python3
+
+            task = asyncio.get_event_loop().create_task(warmer.run_async())
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                delay = await loop.run_in_executor(None, self.run_once)
+            except Exception:
+                delay = self._poll_interval
+            await asyncio.sleep(delay)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -20,7 +20,7 @@ setup(
     description="A simple wrapper to fetch NASA Open APIs using Python",
     long_description=readme,
     long_description_content_type="text/markdown",
-    python_requires=">=3.6.0",
+    python_requires=">=3.7.0",
     classifiers=[
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3.8",
@@ -32,5 +32,12 @@ setup(
         "Development Status :: 3 - Alpha"
     ],
     packages=find_packages(),
-    install_requires=requirements
+    install_requires=requirements,
+    extras_require={
+        "numpy": ["numpy"],
+        "images": ["Pillow"]
+    },
+    entry_points={
+        "console_scripts": ["nasawrapper=nasawrapper.cli:main"]
+    }
 )
\ No newline at end of file
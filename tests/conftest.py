@@ -0,0 +1,108 @@
+import os
+import random
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import StubServer, _asteroid
+
+from nasawrapper import transport
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        yield server
+
+@pytest.fixture
+def api_root(stub):
+    """
+    Sends the requests of every client to the stub server.
+    """
+    transport.set_api_root(stub.url)
+    yield stub
+    transport.set_api_root()
+
+@pytest.fixture
+def make_asteroid():
+    """
+    Returns a function making a NeoWs asteroid, like the
+    ones of the API.
+    """
+    def make(asteroid_id, date=datetime(2021, 1, 1), approaches=1, orbital_data=False, seed=0):
+        return _asteroid(asteroid_id, date, random.Random(f"{seed}:{asteroid_id}"), approaches, orbital_data)
+
+    return make
+
+class MediaServer(ThreadingHTTPServer):
+    """
+    Serves the bytes of ``files`` by path, or a few bytes
+    derived from the path of any other request, like the
+    images of the APOD, and counts the requests per path.
+    ``Range`` requests are answered like a real server, and
+    their headers are kept in ``ranges``.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _MediaHandler)
+        self.files = {}
+        self.hits = {}
+        self.ranges = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @staticmethod
+    def body(path):
+        return path.encode() * 100
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    def _headers(self):
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+            requested = self.headers.get("Range")
+            if requested:
+                self.server.ranges.append(requested)
+        body = self.server.files.get(self.path) or MediaServer.body(self.path)
+
+        offset = int(requested[len("bytes="):].rstrip("-")) if requested else 0
+        if offset >= len(body) > 0:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(body)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return b""
+        elif offset:
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {offset}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) - offset))
+        self.end_headers()
+        return body[offset:]
+
+    def do_HEAD(self):
+        self._headers()
+
+    def do_GET(self):
+        self.wfile.write(self._headers())
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def media():
+    server = MediaServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
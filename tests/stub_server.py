@@ -0,0 +1,366 @@
+"""
+A local stand-in for the NASA APIs used by the tests and the benchmarks.
+
+It serves ``/planetary/apod``, ``/neo/rest/v1/feed``,
+``/neo/rest/v1/neo/{id}`` and ``/neo/rest/v1/neo/browse`` with
+deterministic payloads of realistic sizes, sleeps according to a
+latency distribution, sends ``X-RateLimit-*`` headers and can inject
+``429`` and ``5xx`` responses.
+"""
+import asyncio
+import json
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+_WORDS = (
+    "galaxy nebula star comet light dust cloud planet moon spiral cluster "
+    "telescope image night sky bright dark gas stellar cosmic orbit solar "
+    "eclipse aurora supernova remnant crater jupiter saturn mars milky way"
+).split()
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Returns a function drawing a latency, in seconds, from
+    a distribution written as ``fixed:0.02``,
+    ``uniform:0.01,0.05``, ``exponential:0.02`` or
+    ``lognormal:-4,0.5``. ``none`` means no latency.
+    """
+    name, _, arguments = spec.partition(":")
+    values = [float(value) for value in arguments.split(",") if value]
+
+    if name == "none":
+        return lambda generator: 0.0
+    elif name == "fixed":
+        return lambda generator: values[0]
+    elif name == "uniform":
+        return lambda generator: generator.uniform(values[0], values[1])
+    elif name == "exponential":
+        return lambda generator: generator.expovariate(1 / values[0])
+    elif name == "lognormal":
+        return lambda generator: generator.lognormvariate(values[0], values[1])
+
+    raise ValueError(f"unknown latency distribution '{spec}'")
+
+def _apod(date: datetime, generator: random.Random) -> Dict[str, Any]:
+    day = date.strftime("%Y-%m-%d")
+    return {
+        "copyright": "Stub Observatory",
+        "date": day,
+        # real explanations are a few hundred words
+        "explanation": " ".join(generator.choice(_WORDS) for _ in range(180)),
+        "hdurl": f"https://apod.nasa.gov/apod/image/{day}_hd.jpg",
+        "media_type": "image",
+        "service_version": "v1",
+        "title": " ".join(generator.choice(_WORDS) for _ in range(4)).title(),
+        "url": f"https://apod.nasa.gov/apod/image/{day}.jpg"
+    }
+
+def _approach(date: datetime, generator: random.Random) -> Dict[str, Any]:
+    kilometers = generator.uniform(1e5, 7e7)
+    speed = generator.uniform(2, 40)
+    return {
+        "close_approach_date": date.strftime("%Y-%m-%d"),
+        "close_approach_date_full": date.strftime("%Y-%b-%d 12:00"),
+        "epoch_date_close_approach": int(date.timestamp() * 1000),
+        "relative_velocity": {
+            "kilometers_per_second": str(speed),
+            "kilometers_per_hour": str(speed * 3600),
+            "miles_per_hour": str(speed * 2236.94)
+        },
+        "miss_distance": {
+            "astronomical": str(kilometers / 149597870.7),
+            "lunar": str(kilometers / 384400),
+            "kilometers": str(kilometers),
+            "miles": str(kilometers * 0.621371)
+        },
+        "orbiting_body": "Earth"
+    }
+
+def _asteroid(
+    asteroid_id: int,
+    date: datetime,
+    generator: random.Random,
+    approaches: int = 1,
+    orbital_data: bool = False
+) -> Dict[str, Any]:
+    diameter = generator.uniform(0.01, 2)
+    asteroid = {
+        "links": {"self": f"http://api.nasa.gov/neo/rest/v1/neo/{asteroid_id}"},
+        "id": str(asteroid_id),
+        "neo_reference_id": str(asteroid_id),
+        "name": f"({asteroid_id % 10000} XY{asteroid_id % 97})",
+        "nasa_jpl_url": f"http://ssd.jpl.nasa.gov/sbdb.cgi?sstr={asteroid_id}",
+        "absolute_magnitude_h": generator.uniform(15, 30),
+        "estimated_diameter": {
+            unit: {"estimated_diameter_min": diameter * factor, "estimated_diameter_max": diameter * factor * 2.2}
+            for unit, factor in (("kilometers", 1), ("meters", 1000), ("miles", 0.621371), ("feet", 3280.84))
+        },
+        "is_potentially_hazardous_asteroid": generator.random() < 0.1,
+        "close_approach_data": [
+            _approach(date + timedelta(days=365 * index), generator) for index in range(approaches)
+        ],
+        "is_sentry_object": generator.random() < 0.02
+    }
+    if orbital_data:
+        asteroid["orbital_data"] = {
+            "orbit_id": "42",
+            "orbit_determination_date": "2021-04-15 06:00:00",
+            "first_observation_date": "1990-01-01",
+            "last_observation_date": "2021-04-01",
+            "data_arc_in_days": 11413,
+            "observations_used": 512,
+            "orbit_uncertainty": "0",
+            "minimum_orbit_intersection": str(generator.uniform(0, 0.5)),
+            "jupiter_tisserand_invariant": str(generator.uniform(2, 6)),
+            "epoch_osculation": "2459396.5",
+            "eccentricity": str(generator.uniform(0, 0.9)),
+            "semi_major_axis": str(generator.uniform(0.6, 4)),
+            "inclination": str(generator.uniform(0, 40)),
+            "ascending_node_longitude": str(generator.uniform(0, 360)),
+            "orbital_period": str(generator.uniform(200, 3000)),
+            "perihelion_distance": str(generator.uniform(0.1, 1.3)),
+            "perihelion_argument": str(generator.uniform(0, 360)),
+            "aphelion_distance": str(generator.uniform(1, 6)),
+            "perihelion_time": "2459500.5",
+            "mean_anomaly": str(generator.uniform(0, 360)),
+            "mean_motion": str(generator.uniform(0.1, 2)),
+            "equinox": "J2000",
+            "orbit_class": {
+                "orbit_class_type": "APO",
+                "orbit_class_description": "Near-Earth asteroid orbits which cross the Earth's orbit",
+                "orbit_class_range": "a (semi-major axis) > 1.0 AU; q (perihelion) < 1.017 AU"
+            }
+        }
+
+    return asteroid
+
+class StubServer:
+    """
+    Runs the stand-in API in a background thread, so both
+    the sync and the async clients can use it.
+
+    **Parameters**
+
+        **latency** (str) - A distribution accepted by
+        :py:func:`parse_latency`. Default is ``"none"``.
+
+        **error_rate** (float) - The share of requests
+        answered with a ``500`` or ``503``. Default is ``0``.
+
+        **rate_limited_rate** (float) - The share of requests
+        answered with a ``429``. Default is ``0``.
+
+        **rate_limit** (int) - The ``X-RateLimit-Limit`` sent.
+        Default is ``1000``.
+
+        **seed** (int) - Seed of the payloads, latencies and
+        injected errors. Default is ``0``.
+    """
+    def __init__(
+        self,
+        latency: str = "none",
+        error_rate: float = 0.0,
+        rate_limited_rate: float = 0.0,
+        rate_limit: int = 1000,
+        seed: int = 0
+    ) -> None:
+        self._latency = parse_latency(latency)
+        self._error_rate = error_rate
+        self._rate_limited_rate = rate_limited_rate
+        self._rate_limit = rate_limit
+        self._seed = seed
+        self._random = random.Random(seed)
+        self._remaining = rate_limit
+        self._requests = 0
+        self._cache: Dict[Any, bytes] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self.port = 0
+
+    @property
+    def url(self):
+        """
+        Returns the root URL of the server.
+        """
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def requests(self):
+        """
+        Returns how many requests were answered.
+        """
+        return self._requests
+
+    def _payload(self, key: Any, build: Callable[[random.Random], Any]) -> bytes:
+        # payloads are built once per key, with their own seed
+        body = self._cache.get(key)
+        if body is None:
+            body = self._cache[key] = json.dumps(build(random.Random(f"{self._seed}:{key}"))).encode()
+        return body
+
+    def _apod_body(self, query: Any) -> bytes:
+        if "count" in query:
+            count = int(query["count"])
+            first = datetime(1995, 6, 16)
+            return json.dumps([
+                _apod(first + timedelta(days=self._random.randrange(9000)), self._random) for _ in range(count)
+            ]).encode()
+
+        if "start_date" in query:
+            start = datetime.strptime(query["start_date"], "%Y-%m-%d")
+            end = datetime.strptime(query.get("end_date", start.strftime("%Y-%m-%d")), "%Y-%m-%d")
+            days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+            return self._payload(("apod", query["start_date"], end), lambda generator: [_apod(day, generator) for day in days])
+
+        date = datetime.strptime(query.get("date", "2021-01-01"), "%Y-%m-%d")
+        return self._payload(("apod", date), lambda generator: _apod(date, generator))
+
+    def _feed_body(self, query: Any) -> bytes:
+        start = datetime.strptime(query["start_date"], "%Y-%m-%d")
+        end = datetime.strptime(query.get("end_date", query["start_date"]), "%Y-%m-%d")
+
+        def build(generator: random.Random) -> Dict[str, Any]:
+            objects: Dict[str, List[Any]] = {}
+            for offset in range((end - start).days + 1):
+                day = start + timedelta(days=offset)
+                # around 15 asteroids approach per day
+                objects[day.strftime("%Y-%m-%d")] = [
+                    _asteroid(2000000 + generator.randrange(10 ** 6), day, generator) for _ in range(15)
+                ]
+            return {
+                "links": {},
+                "element_count": sum(len(items) for items in objects.values()),
+                "near_earth_objects": objects
+            }
+
+        return self._payload(("feed", start, end), build)
+
+    def _lookup_body(self, asteroid_id: int) -> bytes:
+        # a lookup lists every close approach, often a hundred or more
+        return self._payload(
+            ("lookup", asteroid_id),
+            lambda generator: _asteroid(asteroid_id, datetime(1900, 1, 1), generator, approaches=120, orbital_data=True)
+        )
+
+    def _browse_body(self, page: int, size: int) -> bytes:
+        def build(generator: random.Random) -> Dict[str, Any]:
+            return {
+                # like the API, links point at the server itself
+                "links": {
+                    "next": f"{self.url}/neo/rest/v1/neo/browse?page={page + 1}&size={size}",
+                    "self": f"{self.url}/neo/rest/v1/neo/browse?page={page}&size={size}"
+                },
+                "page": {"size": size, "total_elements": 30000, "total_pages": -(-30000 // size), "number": page},
+                "near_earth_objects": [
+                    _asteroid(2000000 + page * size + index, datetime(1950, 1, 1), generator, approaches=60, orbital_data=True)
+                    for index in range(size)
+                ]
+            }
+
+        return self._payload(("browse", page, size), build)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self._requests += 1
+        delay = self._latency(self._random)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        self._remaining = max(self._remaining - 1, 0)
+        headers = {
+            "X-RateLimit-Limit": str(self._rate_limit),
+            "X-RateLimit-Remaining": str(self._remaining)
+        }
+
+        draw = self._random.random()
+        if draw < self._rate_limited_rate:
+            return web.json_response({"error": {"code": "OVER_RATE_LIMIT"}}, status=429, headers=headers)
+        elif draw < self._rate_limited_rate + self._error_rate:
+            status = self._random.choice((500, 503))
+            return web.json_response({"code": status, "msg": "Internal Service Error"}, status=status, headers=headers)
+
+        path = request.path.rstrip("/")
+        query = request.query
+        if path == "/planetary/apod":
+            body = self._apod_body(query)
+        elif path == "/neo/rest/v1/feed":
+            body = self._feed_body(query)
+        elif path == "/neo/rest/v1/neo/browse":
+            body = self._browse_body(int(query.get("page", 0)), min(int(query.get("size", 20)), 20))
+        elif path.startswith("/neo/rest/v1/neo/") and path.rsplit("/", 1)[1].isdigit():
+            body = self._lookup_body(int(path.rsplit("/", 1)[1]))
+        else:
+            return web.json_response({"code": 404, "msg": "Not Found"}, status=404, headers=headers)
+
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    def reset_rate_limit(self) -> None:
+        """
+        Gives back every ``X-RateLimit-Remaining`` token.
+        """
+        self._remaining = self._rate_limit
+
+    def _serve(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        app = web.Application()
+        app.router.add_get("/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def start(self) -> "StubServer":
+        """
+        Starts the server and waits until it accepts requests.
+        """
+        self._thread = threading.Thread(target=self._serve, name="nasawrapper-stub-server", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Serve the NASA API stand-in until interrupted.")
+    parser.add_argument("--latency", default="none")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limited-rate", type=float, default=0.0)
+    arguments = parser.parse_args()
+
+    with StubServer(arguments.latency, arguments.error_rate, arguments.rate_limited_rate) as server:
+        print(f"serving on {server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
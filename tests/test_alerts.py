@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+
+from nasawrapper.alerts import AlertEngine, Condition, Rule, approach, asteroid, load_state, save_state, upcoming
+
+DAY = 86400000
+NOW = datetime(2021, 1, 1).timestamp() * 1000
+
+class Counting(Condition):
+    def __init__(self):
+        self.calls = 0
+
+    def compile(self):
+        def check(asteroid_, approach_, now):
+            self.calls += 1
+            return True
+        return check
+
+def feed(*asteroids):
+    return {"near_earth_objects": {"2021-01-01": list(asteroids)}}
+
+def test_condition_needs_compile():
+    class Incomplete(Condition):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_conditions_compare_numbers_sent_as_strings(make_asteroid):
+    item = make_asteroid(2000001)
+    lunar = float(item["close_approach_data"][0]["miss_distance"]["lunar"])
+    engine = AlertEngine([Rule("near", approach("miss_distance.lunar") <= lunar), Rule("far", approach("miss_distance.lunar") < lunar)])
+
+    assert [alert.rule for alert in engine.update(feed(item), NOW)] == ["near"]
+
+def test_asteroid_checks_run_once_per_asteroid(make_asteroid):
+    counting = Counting()
+    engine = AlertEngine([Rule("any", counting & (approach("orbiting_body") == "Earth"))])
+
+    alerts = engine.update(feed(make_asteroid(2000001, approaches=5)), NOW)
+    assert len(alerts) == 5 and counting.calls == 1
+
+def test_matches_are_alerted_once(make_asteroid):
+    item = make_asteroid(2000001)
+    engine = AlertEngine([Rule("earth", approach("orbiting_body") == "Earth")])
+
+    assert len(engine.update(feed(item), NOW)) == 1
+    assert engine.update(feed(item), NOW) == []
+    # unchanged records aren't evaluated again
+    assert engine.evaluated == 1
+
+def test_changed_records_are_evaluated_again(make_asteroid):
+    item = make_asteroid(2000001)
+    engine = AlertEngine([Rule("hazardous", asteroid("is_potentially_hazardous_asteroid") == True)])
+
+    engine.update(feed(dict(item, is_potentially_hazardous_asteroid=False)), NOW)
+    alerts = engine.update(feed(dict(item, is_potentially_hazardous_asteroid=True)), NOW)
+    assert [alert.neo_reference_id for alert in alerts] == ["2000001"]
+
+def test_upcoming_approaches_are_scheduled(make_asteroid):
+    item = make_asteroid(2000001, date=datetime(2021, 1, 20))
+    engine = AlertEngine([Rule("soon", (approach("orbiting_body") == "Earth") & upcoming(days=7))])
+
+    assert engine.update(feed(item), NOW) == []
+    assert engine.update([], NOW + 11 * DAY) == []
+    assert [alert.rule for alert in engine.update([], NOW + 13 * DAY)] == ["soon"]
+
+def test_state_round_trip(tmp_path, make_asteroid):
+    rules = [Rule("soon", (approach("orbiting_body") == "Earth") & upcoming(days=7))]
+    engine = AlertEngine(rules)
+    engine.update(feed(make_asteroid(2000001, date=datetime(2021, 1, 1)), make_asteroid(2000002, date=datetime(2021, 1, 20))), NOW)
+    save_state(str(tmp_path / "state.json"), engine.state())
+
+    restored = AlertEngine(rules, load_state(str(tmp_path / "state.json")))
+    assert [alert.neo_reference_id for alert in restored.update([], NOW + 13 * DAY)] == ["2000002"]
+    assert load_state(str(tmp_path / "missing.json")) == {}
+
+def test_rule_names_must_be_unique():
+    with pytest.raises(ValueError):
+        AlertEngine([Rule("a", approach("orbiting_body") == "Earth"), Rule("a", upcoming(1))])
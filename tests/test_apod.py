@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+
+from nasawrapper import AsyncApod, SyncApod
+from nasawrapper.cache import ResponseCache
+
+def test_get_apod_caches_dates(stub):
+    apod = SyncApod("DEMO_KEY", cache=ResponseCache(), api_root=stub.url)
+
+    first = apod.get_apod({"date": datetime(2021, 1, 1)})
+    assert apod.get_apod({"date": datetime(2021, 1, 1)}) == first
+    assert stub.requests == 1
+
+def test_get_apod_never_caches_random_pictures(stub):
+    apod = SyncApod("DEMO_KEY", cache=ResponseCache(), api_root=stub.url)
+
+    apod.get_apod({"count": 2})
+    apod.get_apod({"count": 2})
+    apod.get_many([{"count": 2}, {"count": 2}])
+    assert stub.requests == 4
+
+def test_async_get_apod_never_caches_random_pictures(stub):
+    apod = AsyncApod("DEMO_KEY", cache=ResponseCache(), api_root=stub.url)
+
+    async def main():
+        await apod.get_apod({"count": 2})
+        await apod.get_apod({"count": 2})
+        await apod.get_apod({"date": datetime(2021, 1, 1)})
+        await apod.get_apod({"date": datetime(2021, 1, 1)})
+
+    asyncio.run(main())
+    assert stub.requests == 3
+
+def test_options_can_be_reused(stub):
+    apod = SyncApod("DEMO_KEY", api_root=stub.url)
+    options = {"date": datetime(2021, 1, 1)}
+
+    assert apod.get_apod(options) == apod.get_apod(options)
+    assert options == {"date": datetime(2021, 1, 1)}
+
+def test_builders_have_their_own_options(stub):
+    from nasawrapper import ApodQueryBuilder
+
+    builders = [ApodQueryBuilder("DEMO_KEY", api_root=stub.url).set_date(datetime(2021, 1, day)) for day in range(1, 6)]
+    results = [result.result for result in ApodQueryBuilder.map(builders)]
+
+    assert [result["date"] for result in results] == [f"2021-01-0{day}" for day in range(1, 6)]
+    assert builders[0].options == {"date": datetime(2021, 1, 1)}
@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from stub_server import StubServer
+
+from nasawrapper import AsyncApod, SyncApod
+from nasawrapper.apod_store import ApodStore, missing_date_ranges
+from nasawrapper.errors import ApiError, RateLimitError
+
+def test_missing_date_ranges_skips_stored_dates():
+    stored = {"1995-06-16", "1995-06-18"}
+    ranges = missing_date_ranges(stored, datetime(1995, 6, 20), max_days=2)
+
+    assert ranges == [(datetime(1995, 6, 17), datetime(1995, 6, 17)), (datetime(1995, 6, 19), datetime(1995, 6, 20))]
+
+def test_missing_date_ranges_starts_after_the_high_water_mark():
+    assert missing_date_ranges([], datetime(2021, 1, 3), "2021-01-01") == [(datetime(2021, 1, 2), datetime(2021, 1, 3))]
+
+def test_sync_requests_only_missing_dates(stub):
+    apod = SyncApod("DEMO_KEY", api_root=stub.url)
+    store = ApodStore()
+    store.high_water_mark = "2020-12-31"
+
+    assert apod.sync(store, datetime(2021, 1, 10)) == 10
+    assert apod.sync(store, datetime(2021, 1, 10)) == 0
+    assert stub.requests == 1
+    assert store.high_water_mark == "2021-01-10"
+
+def test_sync_raises_error_bodies():
+    with StubServer(error_rate=1.0) as stub:
+        store = ApodStore()
+        store.high_water_mark = "2020-12-31"
+
+        with pytest.raises(ApiError):
+            SyncApod("DEMO_KEY", api_root=stub.url).sync(store, datetime(2021, 1, 10))
+        with pytest.raises(ApiError):
+            asyncio.run(AsyncApod("DEMO_KEY", api_root=stub.url).sync(store, datetime(2021, 1, 10)))
+
+    assert len(store) == 0 and store.high_water_mark == "2020-12-31"
+
+def test_sync_raises_rate_limits():
+    with StubServer(rate_limited_rate=1.0) as stub:
+        store = ApodStore()
+        store.high_water_mark = "2020-12-31"
+
+        with pytest.raises(RateLimitError):
+            SyncApod("DEMO_KEY", api_root=stub.url).sync(store, datetime(2021, 1, 10))
@@ -0,0 +1,94 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from nasawrapper.approach_index import ApproachIndex
+
+def _asteroid(make_asteroid, asteroid_id, day, distance_au, hazardous=False):
+    asteroid = make_asteroid(asteroid_id, datetime(2021, 1, 1) + timedelta(days=day))
+    asteroid["is_potentially_hazardous_asteroid"] = hazardous
+    asteroid["close_approach_data"][0]["miss_distance"]["astronomical"] = str(distance_au)
+    return asteroid
+
+@pytest.fixture
+def index(make_asteroid):
+    index = ApproachIndex()
+    index.add([
+        _asteroid(make_asteroid, 1, 0, 0.30),
+        _asteroid(make_asteroid, 2, 1, 0.10, hazardous=True),
+        _asteroid(make_asteroid, 3, 1, 0.05),
+        _asteroid(make_asteroid, 4, 3, 0.20),
+        _asteroid(make_asteroid, 5, 5, 0.01)
+    ])
+    return index
+
+def _ids(approaches):
+    return [approach.neo_reference_id for approach in approaches]
+
+def test_query_returns_the_range_nearest_first(index):
+    assert _ids(index.query(datetime(2021, 1, 1), datetime(2021, 1, 4, 23))) == ["3", "2", "4", "1"]
+
+def test_query_filters_by_distance_and_hazard(index):
+    assert _ids(index.query(max_distance=0.15)) == ["5", "3", "2"]
+    assert _ids(index.query(hazardous=True)) == ["2"]
+
+def test_max_distance_in_lunar_distances(index):
+    assert _ids(index.query(max_distance=10, unit="lunar")) == ["5"]
+
+def test_nearest_and_between(index):
+    assert _ids(index.nearest(2)) == ["5", "3"]
+    assert _ids(index.between(max_distance=0.25)) == ["3", "2", "4", "5"]
+
+def test_adding_the_same_approach_replaces_it(index, make_asteroid):
+    index.add(_asteroid(make_asteroid, 1, 0, 0.001))
+
+    assert len(index) == 5
+    assert _ids(index.nearest(1)) == ["1"]
+
+def test_remove_drops_every_approach_of_an_asteroid(index, make_asteroid):
+    index.add(make_asteroid(9, approaches=3))
+    assert len(index) == 8
+
+    index.remove(9)
+    index.remove("1")
+    assert len(index) == 4
+    assert "1" not in _ids(index.query())
+
+def test_start_after_end_is_rejected(index):
+    with pytest.raises(ValueError):
+        index.query(datetime(2021, 2, 1), datetime(2021, 1, 1))
+
+def test_an_end_at_midnight_covers_the_whole_day(make_asteroid):
+    asteroid = make_asteroid(1)
+    asteroid["close_approach_data"][0]["epoch_date_close_approach"] = int(datetime(2021, 1, 5, 18, tzinfo=timezone.utc).timestamp() * 1000)
+    index = ApproachIndex()
+    index.add(asteroid)
+
+    assert _ids(index.query(datetime(2021, 1, 5), datetime(2021, 1, 5))) == ["1"]
+    assert _ids(index.between(end=datetime(2021, 1, 5))) == ["1"]
+    assert _ids(index.query(end=datetime(2021, 1, 5, 12))) == []
+    assert _ids(index.query(start=datetime(2021, 1, 5, 19))) == []
+
+def test_queries_match_a_full_scan(make_asteroid):
+    generator = random.Random(0)
+    index = ApproachIndex()
+    index.add([
+        _asteroid(make_asteroid, asteroid_id, generator.randrange(60), generator.random())
+        for asteroid_id in range(300)
+    ])
+    entries = index.query()
+
+    for _ in range(50):
+        first, span = generator.randrange(60), generator.randrange(30)
+        start, end = datetime(2021, 1, 1) + timedelta(days=first), datetime(2021, 1, 1) + timedelta(days=first + span)
+        # from a narrow range to most of the index
+        max_distance = generator.choice([0.01, 0.2, 0.9, None])
+        expected = [
+            entry for entry in entries
+            if start <= datetime.fromtimestamp(entry.epoch / 1000, timezone.utc).replace(tzinfo=None) < end + timedelta(days=1)
+            and (max_distance is None or entry.miss_distance_au <= max_distance)
+        ]
+
+        assert index.query(start, end, max_distance) == expected
+        assert index.between(start, end, max_distance) == sorted(expected, key=lambda entry: (entry.epoch, entry.miss_distance_au))
@@ -0,0 +1,95 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from nasawrapper import SyncApod, SyncNeoWs, transport
+from nasawrapper.batch import BatchExecutor, BatchResult, iter_bounded
+
+def _slow_square(value: int) -> int:
+    time.sleep(0.03 * (5 - value))
+    if value == 3:
+        raise ValueError(value)
+    return value * value
+
+def test_map_keeps_the_order_and_captures_errors():
+    with BatchExecutor(workers=4) as executor:
+        results = list(executor.map(_slow_square, range(5)))
+
+    assert [result.index for result in results] == [0, 1, 2, 3, 4]
+    assert [result.result for result in results] == [0, 1, 4, None, 16]
+    assert [result.ok for result in results] == [True, True, True, False, True]
+    assert isinstance(results[3].error, ValueError) and results[3].item == 3
+
+def test_unordered_map_yields_as_completed():
+    with BatchExecutor(workers=5) as executor:
+        results = list(executor.map(_slow_square, range(5), ordered=False))
+
+    assert [result.index for result in results] == [4, 3, 2, 1, 0]
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_map_consumes_items_lazily(ordered):
+    consumed = []
+    items = (consumed.append(value) or value for value in itertools.count())
+
+    with BatchExecutor(workers=2) as executor:
+        for result in executor.map(lambda value: value, items, ordered):
+            if result.index == 9:
+                break
+
+    assert len(consumed) <= 10 + 2 * 2
+
+def test_threads_share_the_session():
+    with BatchExecutor(workers=3) as executor:
+        sessions = {result.result for result in executor.map(lambda _: transport._local.session, range(9))}
+
+    assert sessions == {executor.session}
+
+def test_client_batches(stub):
+    apod = SyncApod("DEMO_KEY", api_root=stub.url)
+    neows = SyncNeoWs("DEMO_KEY", api_root=stub.url)
+
+    with BatchExecutor(workers=4) as executor:
+        pictures = list(apod.map([{"date": datetime(2021, 1, day)} for day in range(1, 9)], executor=executor))
+        future = neows.submit(3542519, executor=executor)
+        asteroid = future.result()
+
+    assert all(isinstance(picture, BatchResult) and picture.ok for picture in pictures)
+    assert [picture.result["date"] for picture in pictures] == [f"2021-01-0{day}" for day in range(1, 9)]
+    assert asteroid["id"] == "3542519"
+    assert stub.requests == 9
+
+def test_executor_checks_its_workers():
+    with pytest.raises(ValueError):
+        BatchExecutor(workers=0)
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_iter_bounded_limits_pending_futures(ordered):
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work(value):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        submitted = []
+
+        def submit(index, value):
+            submitted.append(index)
+            return executor.submit(work, value)
+
+        results = [(index, item, future.result()) for index, item, future in iter_bounded(submit, range(20), 3, ordered)]
+
+    assert peak[0] <= 3
+    assert sorted(results) == [(value, value, value * 2) for value in range(20)]
+    if ordered:
+        assert [index for index, _, _ in results] == list(range(20))
@@ -0,0 +1,80 @@
+import json
+import os
+import random
+import sys
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import run
+from stub_server import StubServer, parse_latency
+
+def _get(url: str):
+    try:
+        with urlopen(url) as response:
+            return response.status, dict(response.headers), json.loads(response.read())
+    except HTTPError as error:
+        return error.code, dict(error.headers), json.loads(error.read())
+
+def test_parse_latency():
+    generator = random.Random(0)
+    assert parse_latency("none")(generator) == 0.0
+    assert parse_latency("fixed:0.02")(generator) == 0.02
+    assert 0.01 <= parse_latency("uniform:0.01,0.05")(generator) <= 0.05
+    assert parse_latency("exponential:0.02")(generator) > 0
+    assert parse_latency("lognormal:-4,0.5")(generator) > 0
+    with pytest.raises(ValueError):
+        parse_latency("normal:1")
+
+def test_stub_payloads_are_deterministic(stub):
+    first = _get(f"{stub.url}/planetary/apod?date=2021-01-01")[2]
+    with StubServer() as other:
+        second = _get(f"{other.url}/planetary/apod?date=2021-01-01")[2]
+
+    assert first == second and first["date"] == "2021-01-01"
+    assert len(_get(f"{stub.url}/planetary/apod?count=5")[2]) == 5
+    assert len(_get(f"{stub.url}/planetary/apod?start_date=2021-01-01&end_date=2021-01-10")[2]) == 10
+
+def test_stub_counts_down_the_rate_limit(stub):
+    remaining = [int(_get(f"{stub.url}/neo/rest/v1/neo/3542519")[1]["X-RateLimit-Remaining"]) for _ in range(3)]
+    assert remaining == [999, 998, 997]
+    assert stub.requests == 3
+    assert _get(f"{stub.url}/unknown")[0] == 404
+
+@pytest.mark.parametrize("failure, statuses", [
+    ({"error_rate": 1.0}, {500, 503}),
+    ({"rate_limited_rate": 1.0}, {429})
+])
+def test_stub_injects_errors(failure, statuses):
+    with StubServer(**failure) as stub:
+        status, _, body = _get(f"{stub.url}/planetary/apod")
+
+    assert status in statuses
+    assert "error" in body or body["code"] == status
+
+def test_run_reports_and_compares(tmp_path, capsys):
+    output, slower = tmp_path / "results.json", tmp_path / "slower.json"
+    arguments = ["--iterations", "3", "--warmup", "0", "--filter", "get_neo_lookup"]
+
+    assert run.main(arguments + ["--output", str(output)]) == 0
+    results = json.loads(output.read_text())["results"]
+    assert [result["name"] for result in results] == ["SyncNeoWs.get_neo_lookup", "AsyncNeoWs.get_neo_lookup"]
+    assert all(result["requests"] == 3 and result["errors"] == 0 for result in results)
+
+    # a baseline a thousand times faster can only be a regression
+    baseline = json.loads(output.read_text())
+    for result in baseline["results"]:
+        result["p50"] /= 1000
+        result["p99"] /= 1000
+        result["throughput"] *= 1000
+    slower.write_text(json.dumps(baseline))
+    assert run.main(arguments + ["--output", str(output), "--baseline", str(slower)]) == 1
+    assert "SyncNeoWs.get_neo_lookup: p50 went from" in capsys.readouterr().err
+
+def test_run_counts_errors(tmp_path):
+    output = tmp_path / "results.json"
+    run.main(["--iterations", "2", "--warmup", "0", "--filter", "SyncApod.get_apod[date]", "--error-rate", "1", "--output", str(output)])
+    assert json.loads(output.read_text())["results"][0]["errors"] == 2
@@ -0,0 +1,59 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from nasawrapper.bulk import BulkParser, load_tables
+from nasawrapper.orbits import to_orbit_table
+from nasawrapper.tables import to_approach_table
+
+@pytest.fixture
+def pages(make_asteroid):
+    return [
+        {"near_earth_objects": [make_asteroid(2000000 + page * 10 + index, approaches=3, orbital_data=True) for index in range(10)]}
+        for page in range(6)
+    ]
+
+def test_parse_merges_pages_in_order(tmp_path, pages):
+    parser = BulkParser(str(tmp_path / "tables"), workers=2)
+    tables = parser.parse(json.dumps(page).encode() for page in pages)
+
+    assert np.array_equal(tables.approaches, to_approach_table(pages))
+    assert np.array_equal(tables.orbits, to_orbit_table(pages))
+    assert len(tables.approaches) == 6 * 10 * 3
+    assert os.listdir(parser.chunk_directory) == []
+
+    reloaded = load_tables(parser.directory)
+    assert np.array_equal(reloaded.approaches, tables.approaches)
+
+def test_parse_reads_dumped_pages(tmp_path, pages):
+    paths = []
+    for index, page in enumerate(pages):
+        path = tmp_path / f"{index}.json"
+        path.write_text(json.dumps(page))
+        paths.append(str(path))
+
+    tables = BulkParser(str(tmp_path / "tables"), workers=2).parse(paths)
+    assert np.array_equal(tables.orbits, to_orbit_table(pages))
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_process_yields_a_chunk_per_page(tmp_path, pages, ordered):
+    parser = BulkParser(str(tmp_path), workers=2)
+    chunks = list(parser.process((json.dumps(page).encode() for page in pages), ordered))
+
+    assert sorted(chunk.index for chunk in chunks) == list(range(6))
+    if ordered:
+        assert [chunk.index for chunk in chunks] == list(range(6))
+    assert all(chunk.ok and chunk.rows == {"approaches": 30, "orbits": 10} for chunk in chunks)
+    assert np.array_equal(chunks[0].load("approaches"), to_approach_table(pages[chunks[0].index]))
+
+def test_failures_are_yielded_then_raised(tmp_path, pages):
+    parser = BulkParser(str(tmp_path), workers=2)
+    chunks = list(parser.process([json.dumps(pages[0]).encode(), b"{not json", str(tmp_path / "missing.json")]))
+
+    assert [chunk.ok for chunk in chunks] == [True, False, False]
+    with pytest.raises(ValueError):
+        parser.merge(chunks)
+    assert os.listdir(parser.chunk_directory) == []
+    assert not os.path.exists(os.path.join(parser.directory, "approaches.npy"))
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from nasawrapper import SyncApod, cache as cache_module
+from nasawrapper.cache import ResponseCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+def test_cache_evicts_the_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+    cache.set("c", b"3")
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert len(cache) == 2
+
+def test_cache_expires_entries(clock):
+    cache = ResponseCache(ttl=10)
+    cache.set("default", b"1")
+    cache.set("longer", b"2", ttl=60)
+
+    clock[0] += 10
+    assert cache.get("default") is None
+    assert cache.get("longer") == b"2"
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_cache_delete_and_clear():
+    cache = ResponseCache()
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.delete("a")
+    cache.delete("missing")
+    assert "a" not in cache and "b" in cache
+
+    cache.clear()
+    assert len(cache) == 0
+
+def test_cache_checks_its_size():
+    with pytest.raises(ValueError):
+        ResponseCache(max_entries=0)
+
+def test_clients_share_responses_across_keys(api_root):
+    cache = ResponseCache()
+    first = SyncApod("FIRST_KEY", cache=cache).get_apod({"date": datetime(2021, 1, 1)})
+    second = SyncApod("SECOND_KEY", cache=cache).get_apod({"date": datetime(2021, 1, 1)})
+
+    assert first == second
+    assert api_root.requests == 1
+    assert (cache.hits, cache.misses) == (1, 1)
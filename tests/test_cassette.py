@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from nasawrapper import AsyncNeoWs, SyncNeoWs
+from nasawrapper.cassette import Cassette, cassette_key
+from nasawrapper.errors import CassetteMiss
+
+def test_cassette_key_ignores_host_key_and_order():
+    assert cassette_key("https://api.nasa.gov/neo/rest/v1/feed?end_date=b&api_key=SECRET&start_date=a") == \
+        cassette_key("http://127.0.0.1:1234/neo/rest/v1/feed?start_date=a&end_date=b&api_key=OTHER")
+
+def test_replay_without_network(tmp_path, stub):
+    path = str(tmp_path / "neows.cassette")
+    with Cassette(path, mode="record"):
+        recorded = SyncNeoWs("SECRET", api_root=stub.url).get_neo_lookup(2000433)
+    requests = stub.requests
+
+    with Cassette(path) as cassette:
+        assert len(cassette) == 1
+        # another host and key give the same recording
+        assert SyncNeoWs("ANY_KEY", api_root="http://127.0.0.1:9").get_neo_lookup(2000433) == recorded
+        assert asyncio.run(AsyncNeoWs("ANY_KEY", api_root="http://127.0.0.1:9").get_neo_lookup(2000433)) == recorded
+    assert stub.requests == requests
+
+def test_record_scrubs_the_api_key(tmp_path):
+    with Cassette(str(tmp_path / "c"), mode="record") as cassette:
+        cassette.record("https://api.nasa.gov/neo/rest/v1/neo/1?api_key=SECRET", "SECRET", 200, b'{"link": "?api_key=SECRET"}')
+
+    with Cassette(str(tmp_path / "c")) as cassette:
+        assert cassette.play("https://api.nasa.gov/neo/rest/v1/neo/1") == (200, b'{"link": "?api_key=DEMO_KEY"}')
+
+def test_replay_raises_on_unrecorded_requests(tmp_path):
+    with Cassette(str(tmp_path / "empty.cassette")):
+        with pytest.raises(CassetteMiss):
+            SyncNeoWs("ANY_KEY").get_neo_lookup(2000433)
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "c"), mode="rewind")
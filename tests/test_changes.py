@@ -0,0 +1,36 @@
+from nasawrapper.changes import ADDED, CHANGED, ChangeTracker, diff, load_hashes, save_hashes
+from nasawrapper.utils import content_hash
+
+def test_content_hash_ignores_key_order_and_links(make_asteroid):
+    asteroid = make_asteroid(2000001)
+    reordered = dict(reversed(list(asteroid.items())), links={"self": "?api_key=OTHER"})
+
+    assert content_hash(asteroid) == content_hash(reordered)
+    assert content_hash(asteroid) != content_hash(dict(asteroid, name="renamed"))
+
+def test_diff_between_crawls(make_asteroid):
+    first = [make_asteroid(2000000 + index) for index in range(4)]
+    changes, hashes = diff({}, first)
+    assert changes.added == {str(2000000 + index) for index in range(4)} and not changes.changed
+
+    second = [first[0], dict(first[1], name="renamed"), first[2], make_asteroid(2000009)]
+    changes, _ = diff(hashes, second)
+    assert changes.added == {"2000009"}
+    assert changes.changed == {"2000001"}
+    assert changes.removed == {"2000003"}
+
+def test_track_yields_only_new_or_changed(make_asteroid):
+    asteroids = [make_asteroid(2000001), make_asteroid(2000002)]
+    _, hashes = diff({}, asteroids)
+    tracker = ChangeTracker(hashes)
+
+    pages = ({"near_earth_objects": [asteroid]} for asteroid in [asteroids[0], dict(asteroids[1], name="x"), make_asteroid(2000003)])
+    assert [(status, asteroid["neo_reference_id"]) for status, asteroid in tracker.track(pages)] == \
+        [(CHANGED, "2000002"), (ADDED, "2000003")]
+
+def test_hashes_round_trip(tmp_path, make_asteroid):
+    _, hashes = diff({}, [make_asteroid(2000001)])
+    save_hashes(str(tmp_path / "hashes.json"), hashes)
+
+    assert load_hashes(str(tmp_path / "hashes.json")) == hashes
+    assert load_hashes(str(tmp_path / "missing.json")) == {}
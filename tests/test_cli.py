@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from stub_server import StubServer
+
+from nasawrapper.cli import Checkpoint, main, read_columns
+
+def mirror(stub, *arguments):
+    return main(["mirror", *arguments, "--api-root", stub.url, "--quiet"])
+
+def lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_mirror_apod_writes_every_day(tmp_path, stub):
+    output = tmp_path / "apod.ndjson"
+
+    assert mirror(stub, "apod", "--start-date", "2021-01-01", "--end-date", "2021-01-10", "--window", "3", "-o", str(output)) == 0
+    assert sorted(record["date"] for record in lines(output)) == [f"2021-01-{day:02d}" for day in range(1, 11)]
+    assert stub.requests == 4
+
+def test_mirror_resumes_from_the_checkpoint(tmp_path, stub):
+    output = tmp_path / "apod.ndjson"
+    arguments = ["apod", "--start-date", "2021-01-01", "--window", "1", "-o", str(output)]
+
+    mirror(stub, *arguments, "--end-date", "2021-01-03")
+    # a partial line written after the last checkpoint is dropped
+    with open(output, "a") as f:
+        f.write('{"date": "broken')
+    mirror(stub, *arguments, "--end-date", "2021-01-05")
+
+    assert sorted(record["date"] for record in lines(output)) == [f"2021-01-0{day}" for day in range(1, 6)]
+    assert stub.requests == 5
+
+def test_mirror_retries_failed_requests(tmp_path):
+    output = tmp_path / "feed.ndjson"
+    arguments = ["neo-feed", "--start-date", "2021-01-01", "--end-date", "2021-01-14", "-o", str(output)]
+
+    with StubServer(error_rate=1.0) as failing:
+        assert mirror(failing, *arguments) == 1
+    with StubServer() as stub:
+        assert mirror(stub, *arguments) == 0
+
+    assert len(lines(output)) == 14 * 15
+
+def test_mirror_neo_browse_fetches_every_page_once(tmp_path, stub):
+    output = tmp_path / "browse"
+    arguments = ["neo-browse", "--format", "columns", "-o", str(output)]
+
+    assert mirror(stub, *arguments, "--max-pages", "2") == 0
+    assert stub.requests == 2
+    assert mirror(stub, *arguments, "--max-pages", "3") == 0
+    assert stub.requests == 3
+
+    columns = read_columns(str(output))
+    assert len(set(columns["neo_reference_id"].tolist())) == 3 * 20
+
+def test_checkpoint_of_another_command(tmp_path, stub):
+    output = tmp_path / "apod.ndjson"
+    Checkpoint(f"{output}.checkpoint", "neo-feed --format ndjson").save()
+
+    with pytest.raises(SystemExit):
+        mirror(stub, "apod", "--start-date", "2021-01-01", "--end-date", "2021-01-02", "-o", str(output))
+    assert mirror(stub, "apod", "--start-date", "2021-01-01", "--end-date", "2021-01-02", "-o", str(output), "--restart") == 0
+
+def test_mirror_neo_browse_with_another_page_size(tmp_path, stub):
+    output = tmp_path / "browse.ndjson"
+    arguments = ["neo-browse", "-o", str(output)]
+
+    assert mirror(stub, *arguments, "--page-size", "20", "--max-pages", "2") == 0
+    assert mirror(stub, *arguments, "--page-size", "10", "--max-pages", "6") == 0
+
+    ids = [record["neo_reference_id"] for record in lines(output)]
+    assert len(ids) == len(set(ids)) == 6 * 10
+
+def test_mirror_raises_api_errors(tmp_path, capsys):
+    output = tmp_path / "apod.ndjson"
+
+    with StubServer(rate_limited_rate=1.0) as limited:
+        assert mirror(limited, "apod", "--start-date", "2021-01-01", "--end-date", "2021-01-01", "-o", str(output)) == 1
+    assert "RateLimitError" in capsys.readouterr().err
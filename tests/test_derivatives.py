@@ -0,0 +1,67 @@
+import io
+import os
+from datetime import datetime
+
+from PIL import Image
+
+from nasawrapper import SyncApod
+from nasawrapper.derivatives import Derivative, DerivativePipeline
+from nasawrapper.download import ApodDownloader
+
+def image_bytes(color, size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_process_resizes_without_upscaling(tmp_path):
+    source = tmp_path / "source.png"
+    source.write_bytes(image_bytes("red"))
+    pipeline = DerivativePipeline(str(tmp_path / "cache"), [Derivative("small", (32, 32)), Derivative("big", (256, 256), "PNG")], workers=1)
+
+    result, = pipeline.process([str(source)])
+
+    assert result.error is None and result.created == 2
+    with Image.open(result.paths["small"]) as small, Image.open(result.paths["big"]) as big:
+        assert small.size == (32, 24) and big.size == (64, 48)
+
+def test_process_reuses_the_cache_for_identical_images(tmp_path):
+    for name in ("a.png", "b.png"):
+        (tmp_path / name).write_bytes(image_bytes("blue"))
+    pipeline = DerivativePipeline(str(tmp_path / "cache"), [Derivative("small", (16, 16))], workers=1)
+
+    first, = pipeline.process([str(tmp_path / "a.png")])
+    second, = pipeline.process([str(tmp_path / "b.png")])
+
+    assert second.created == 0 and second.paths == first.paths
+
+def test_process_yields_failures(tmp_path):
+    (tmp_path / "broken.png").write_bytes(b"not an image")
+    result, = DerivativePipeline(str(tmp_path / "cache"), workers=1).process([str(tmp_path / "broken.png")])
+
+    assert result.error is not None and result.paths == {}
+
+def test_process_range_streams_downloads_into_the_pool(tmp_path, stub, media, monkeypatch):
+    for day in range(1, 5):
+        media.files[f"/2021-01-0{day}.png"] = image_bytes((day * 40, 0, 0))
+    downloader = ApodDownloader(str(tmp_path / "apod"))
+    monkeypatch.setattr(downloader, "media_url", lambda result: f"{media.url}/{result['date']}.png")
+
+    downloaded = []
+    iter_download = downloader.iter_download
+
+    def spy(results):
+        for download in iter_download(results):
+            downloaded.append(download.date)
+            yield download
+
+    monkeypatch.setattr(downloader, "iter_download", spy)
+    pipeline = DerivativePipeline(str(tmp_path / "cache"), [Derivative("small", (16, 16))], workers=1)
+    results = pipeline.process_range(downloader, SyncApod("DEMO_KEY", api_root=stub.url), datetime(2021, 1, 1), datetime(2021, 1, 4))
+
+    first = next(results)
+    # the first image is processed before every download is done
+    assert 0 < len(downloaded) < 4
+    rest = list(results)
+
+    assert sorted(os.path.basename(result.source) for result in [first] + rest) == [f"2021-01-0{day}.png" for day in range(1, 5)]
+    assert all(result.error is None for result in [first] + rest)
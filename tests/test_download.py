@@ -0,0 +1,104 @@
+import json
+import os
+from datetime import datetime
+
+from nasawrapper import SyncApod
+from nasawrapper.cache import ResponseCache
+from nasawrapper.download import ApodDownloader
+
+def apod(date, url, media_type="image"):
+    return {"date": date, "media_type": media_type, "url": url}
+
+def test_download_writes_files_and_manifest(tmp_path, media):
+    downloader = ApodDownloader(str(tmp_path))
+    results = downloader.download([apod("2021-01-01", f"{media.url}/a.jpg"), apod("2021-01-02", f"{media.url}/b.png")])
+
+    assert [result.status for result in results] == ["downloaded", "downloaded"]
+    assert (tmp_path / "2021-01-02.png").read_bytes() == media.body("/b.png")
+    assert set(json.loads((tmp_path / ".manifest.json").read_text())) == {"2021-01-01.jpg", "2021-01-02.png"}
+
+def test_download_skips_files_in_the_manifest(tmp_path, media):
+    downloader = ApodDownloader(str(tmp_path))
+    downloader.download(apod("2021-01-01", f"{media.url}/a.jpg"))
+
+    assert ApodDownloader(str(tmp_path)).download(apod("2021-01-01", f"{media.url}/a.jpg"))[0].status == "skipped"
+    assert media.hits["/a.jpg"] == 1
+
+def test_download_fetches_duplicated_files_once(tmp_path, media):
+    downloader = ApodDownloader(str(tmp_path), concurrency=8)
+    results = downloader.download([apod("2021-01-01", f"{media.url}/a.jpg")] * 6)
+
+    assert [result.status for result in results] == ["downloaded"] + ["skipped"] * 5
+    assert media.hits["/a.jpg"] == 1
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+def test_download_skips_videos_without_thumbnail(tmp_path):
+    result = ApodDownloader(str(tmp_path)).download(apod("2021-01-01", "https://youtube.com/x", "video"))[0]
+
+    assert result.status == "skipped" and result.path == ""
+
+def test_download_shares_the_default_session(tmp_path):
+    from nasawrapper.batch import get_default_executor
+
+    assert ApodDownloader(str(tmp_path))._session is get_default_executor().session
+
+def test_download_range_uses_the_given_client(tmp_path, stub, media, monkeypatch):
+    downloader = ApodDownloader(str(tmp_path))
+    client = SyncApod("DEMO_KEY", cache=ResponseCache(), api_root=stub.url)
+    monkeypatch.setattr(downloader, "media_url", lambda result: f"{media.url}/{result['date']}.jpg")
+
+    results = downloader.download_range(client, datetime(2021, 1, 1), datetime(2021, 1, 3))
+    downloader.download_range(client, datetime(2021, 1, 1), datetime(2021, 1, 3))
+
+    assert [result.date for result in results] == ["2021-01-01", "2021-01-02", "2021-01-03"]
+    assert stub.requests == 1
+
+def test_download_resumes_partial_files(tmp_path, media):
+    body = media.body("/a.jpg")
+    (tmp_path / "2021-01-01.jpg.part").write_bytes(body[:500])
+
+    result = ApodDownloader(str(tmp_path)).download(apod("2021-01-01", f"{media.url}/a.jpg"))[0]
+
+    assert result.status == "resumed"
+    assert media.ranges == ["bytes=500-"]
+    assert (tmp_path / "2021-01-01.jpg").read_bytes() == body
+    assert not (tmp_path / "2021-01-01.jpg.part").exists()
+
+def test_complete_partial_files_are_kept(tmp_path, media):
+    body = media.body("/a.jpg")
+    (tmp_path / "2021-01-01.jpg.part").write_bytes(body)
+
+    assert ApodDownloader(str(tmp_path)).download(apod("2021-01-01", f"{media.url}/a.jpg"))[0].status == "resumed"
+    assert (tmp_path / "2021-01-01.jpg").read_bytes() == body
+
+def test_stale_partial_files_are_downloaded_again(tmp_path, media):
+    body = media.body("/a.jpg")
+    (tmp_path / "2021-01-01.jpg.part").write_bytes(b"stale" * 1000)
+
+    assert ApodDownloader(str(tmp_path)).download(apod("2021-01-01", f"{media.url}/a.jpg"))[0].status == "downloaded"
+    assert (tmp_path / "2021-01-01.jpg").read_bytes() == body
+    assert media.hits["/a.jpg"] == 2
+
+def test_hd_names_only_hd_files(tmp_path, media):
+    downloader = ApodDownloader(str(tmp_path), hd=True)
+    results = downloader.download([
+        dict(apod("2021-01-01", f"{media.url}/a.jpg"), hdurl=f"{media.url}/a-large.jpg"),
+        apod("2021-01-02", f"{media.url}/b.jpg")
+    ])
+
+    assert [os.path.basename(result.path) for result in results] == ["2021-01-01-hd.jpg", "2021-01-02.jpg"]
+
+def test_iter_download_reads_results_lazily(tmp_path, media):
+    read = []
+
+    def results():
+        for day in range(1, 29):
+            read.append(day)
+            yield apod(f"2021-02-{day:02d}", f"{media.url}/{day}.jpg")
+
+    downloads = ApodDownloader(str(tmp_path), concurrency=2).iter_download(results())
+    next(downloads)
+    assert len(read) <= 2 * 2 + 1
+
+    assert len(list(downloads)) == 27
+    assert len(read) == 28
@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from stub_server import StubServer
+
+from nasawrapper import SyncApod, SyncNeoWs
+from nasawrapper.engine import AsyncEngine
+from nasawrapper.errors import NotFound
+
+@pytest.fixture
+def slow_stub():
+    with StubServer(latency="fixed:0.1") as stub:
+        yield stub
+
+def test_sync_clients_delegate_to_the_engine(stub):
+    with AsyncEngine(limit=5) as engine:
+        neows = SyncNeoWs("DEMO_KEY", engine=engine, api_root=stub.url)
+        asteroids = neows.get_many([3542519, 2000433, 3726710])
+        single = neows.get_neo_lookup(2000433)
+
+    assert [asteroid["id"] for asteroid in asteroids] == ["3542519", "2000433", "3726710"]
+    assert single == asteroids[1]
+    assert engine.loop is None
+
+def test_engine_coalesces_identical_requests(slow_stub):
+    url = f"{slow_stub.url}/neo/rest/v1/neo/3542519?api_key=DEMO_KEY"
+    with AsyncEngine() as engine:
+        results = engine.gather([engine.fetch(url, "DEMO_KEY") for _ in range(5)])
+        separate = engine.gather([engine.fetch(url, "DEMO_KEY", coalesce=False) for _ in range(2)])
+
+    assert slow_stub.requests == 3
+    assert all(result == results[0] for result in results + separate)
+    # every caller gets its own copy
+    assert len({id(result) for result in results}) == 5
+
+def test_get_many_runs_concurrently(slow_stub):
+    with AsyncEngine() as engine:
+        apod = SyncApod("DEMO_KEY", engine=engine, api_root=slow_stub.url)
+        loop = engine.start().loop
+        started = loop.time()
+        results = apod.get_many([{"date": datetime(2021, 1, day)} for day in range(1, 11)])
+        elapsed = loop.time() - started
+
+    assert [result["date"] for result in results] == [f"2021-01-{day:02d}" for day in range(1, 11)]
+    assert elapsed < 0.5
+
+def test_get_many_can_return_exceptions(stub):
+    with AsyncEngine() as engine:
+        results = engine.gather(
+            [engine.fetch(f"{stub.url}/missing", "DEMO_KEY", not_found="missing"), asyncio.sleep(0, "ok")],
+            return_exceptions=True
+        )
+        with pytest.raises(NotFound):
+            engine.get_json(f"{stub.url}/missing", "DEMO_KEY", not_found="missing")
+
+    assert isinstance(results[0], NotFound) and results[1] == "ok"
+
+def test_engine_cannot_wait_for_itself():
+    with AsyncEngine() as engine:
+        async def nested():
+            coroutine = asyncio.sleep(0)
+            try:
+                return engine.run(coroutine)
+            finally:
+                coroutine.close()
+
+        with pytest.raises(RuntimeError):
+            engine.run(nested())
+
+def test_engine_checks_its_limit():
+    with pytest.raises(ValueError):
+        AsyncEngine(limit=0)
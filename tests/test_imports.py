@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import import_time
+
+import nasawrapper
+
+@pytest.mark.parametrize("statement", import_time.STATEMENTS + ["import nasawrapper.cache, nasawrapper.rate_limit, nasawrapper.metrics"])
+def test_imports_load_no_heavy_dependency(statement):
+    assert import_time.measure(statement, 1)["loaded"] == []
+
+def test_clients_load_on_first_use():
+    loaded = import_time.measure("from nasawrapper import SyncNeoWs; SyncNeoWs('DEMO_KEY')", 1)["loaded"]
+    assert "numpy" not in loaded and "sqlite3" not in loaded
+
+def test_lazy_names():
+    from nasawrapper.apod import SyncApod
+
+    assert nasawrapper.SyncApod is SyncApod
+    assert nasawrapper.apod.SyncApod is SyncApod
+    assert {"SyncApod", "AsyncNeoWs", "InvalidApiKey"} <= set(dir(nasawrapper)) & set(nasawrapper.__all__)
+    with pytest.raises(AttributeError):
+        nasawrapper.Missing
+
+def test_import_time_compares_dependencies():
+    baseline = {"results": [{"statement": "import nasawrapper", "median": 0.01, "loaded": []}]}
+    results = [{"statement": "import nasawrapper", "median": 0.01, "loaded": ["aiohttp"]}]
+    assert len(import_time.compare(results, baseline, 0.5)) == 1
+    assert import_time.compare(baseline["results"], baseline, 0.5) == []
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from nasawrapper import SyncNeoWs
+from nasawrapper.errors import NotFound
+from nasawrapper.merge import AsteroidMerger, iter_merged, merge_asteroids
+
+def split(asteroid, *ranges):
+    return [dict(asteroid, close_approach_data=asteroid["close_approach_data"][start:end]) for start, end in ranges]
+
+def test_overlapping_records_are_united(make_asteroid):
+    lookup = make_asteroid(2000001, approaches=6, orbital_data=True)
+    first, second = split({key: value for key, value in lookup.items() if key != "orbital_data"}, (0, 4), (2, 6))
+
+    merged, = merge_asteroids(lookup, first, second)
+    assert merged["close_approach_data"] == lookup["close_approach_data"]
+    assert merged["orbital_data"] == lookup["orbital_data"]
+
+def test_approaches_are_sorted_by_epoch(make_asteroid):
+    lookup = make_asteroid(2000001, approaches=4)
+    late, early = split(lookup, (2, 4), (0, 2))
+
+    merged, = merge_asteroids(late, early)
+    epochs = [approach["epoch_date_close_approach"] for approach in merged["close_approach_data"]]
+    assert epochs == sorted(epochs) and len(epochs) == 4
+
+def test_later_fields_win(make_asteroid):
+    merger = AsteroidMerger()
+    merger.add(make_asteroid(2000001))
+    assert merger.add(dict(make_asteroid(2000001), name="renamed")) == ["2000001"]
+
+    assert merger.get(2000001)["name"] == "renamed"
+    assert merger.pop("2000001")["name"] == "renamed"
+    assert 2000001 not in merger
+    with pytest.raises(NotFound):
+        merger.get(2000001)
+
+def test_overlapping_feeds(stub):
+    neows = SyncNeoWs("DEMO_KEY", api_root=stub.url)
+    first = neows.get_neo_feed({"start_date": datetime(2021, 1, 1), "end_date": datetime(2021, 1, 3)})
+    second = neows.get_neo_feed({"start_date": datetime(2021, 1, 2), "end_date": datetime(2021, 1, 3)})
+
+    ids = {asteroid["neo_reference_id"] for feed in (first, second) for day in feed["near_earth_objects"].values() for asteroid in day}
+    assert len(merge_asteroids(first, second)) == len(ids)
+
+def test_iter_merged_streams_grouped_records(make_asteroid):
+    records = [*split(make_asteroid(2000001, approaches=4), (0, 2), (2, 4)), make_asteroid(2000002)]
+
+    merged = iter_merged(records)
+    first = next(merged)
+    assert first["neo_reference_id"] == "2000001" and len(first["close_approach_data"]) == 4
+    assert [item["neo_reference_id"] for item in merged] == ["2000002"]
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from stub_server import StubServer
+
+from nasawrapper import AsyncApod, SyncApod, SyncNeoWs, metrics
+from nasawrapper.cache import ResponseCache
+from nasawrapper.engine import AsyncEngine
+from nasawrapper.errors import RateLimitError
+from nasawrapper.metrics import RequestEvent, RequestMetrics, endpoint_of
+
+def _event(endpoint: str, total: float, status=200, cache=None) -> RequestEvent:
+    return RequestEvent(endpoint, endpoint, status, None, None, None, total, 100, 0.0, cache)
+
+@pytest.fixture
+def events():
+    received = []
+    metrics.add_hook(received.append)
+    yield received
+    metrics.remove_hook(received.append)
+
+def test_endpoint_of_replaces_ids():
+    assert endpoint_of("https://api.nasa.gov/neo/rest/v1/neo/3542519?api_key=KEY") == "/neo/rest/v1/neo/{id}"
+    assert endpoint_of("https://api.nasa.gov/planetary/apod?date=2021-01-01") == "/planetary/apod"
+    assert endpoint_of("https://api.nasa.gov") == "/"
+
+def test_hooks_receive_every_request(api_root, events):
+    cache = ResponseCache()
+    apod = SyncApod("DEMO_KEY", cache=cache)
+    apod.get_apod({"date": datetime(2021, 1, 1)})
+    apod.get_apod({"date": datetime(2021, 1, 1)})
+    SyncNeoWs("DEMO_KEY").get_neo_lookup(3542519)
+
+    assert [event.endpoint for event in events] == ["/planetary/apod"] * 2 + ["/neo/rest/v1/neo/{id}"]
+    assert [event.cache for event in events] == ["miss", "hit", None]
+    assert events[0].status == 200 and events[1].status is None
+    assert all(event.bytes > 0 and event.total >= 0 for event in events)
+    assert "api_key" not in events[2].url
+
+def test_async_hooks_measure_connections(api_root, events):
+    async def main():
+        await AsyncApod("DEMO_KEY").get_apod({"date": datetime(2021, 1, 1)})
+
+    asyncio.run(main())
+    assert len(events) == 1
+    assert events[0].ttfb is not None
+
+def test_failing_hooks_are_ignored(api_root, events):
+    def failing(event):
+        raise RuntimeError
+
+    metrics.add_hook(failing)
+    try:
+        SyncApod("DEMO_KEY").get_apod({"date": datetime(2021, 1, 1)})
+    finally:
+        metrics.remove_hook(failing)
+
+    assert len(events) == 1
+
+def test_request_metrics_histograms():
+    recorded = RequestMetrics(buckets=(0.1, 1.0))
+    for total in (0.05, 0.05, 0.5, 5.0):
+        recorded.observe(_event("/planetary/apod", total))
+    recorded.observe(_event("/planetary/apod", 0.0, status=None, cache="hit"))
+
+    assert recorded.count("/planetary/apod") == 5
+    assert recorded.count("/missing") == 0
+    assert recorded.quantile("/planetary/apod", 0.5) == 0.1
+    assert recorded.quantile("/planetary/apod", 0.8) == 1.0
+    assert recorded.quantile("/planetary/apod", 1.0) == float("inf")
+    assert recorded.quantile("/missing", 0.5) is None
+
+    text = recorded.to_prometheus()
+    assert 'nasawrapper_request_duration_seconds_bucket{endpoint="/planetary/apod",le="0.1"} 3' in text
+    assert 'nasawrapper_request_duration_seconds_bucket{endpoint="/planetary/apod",le="+Inf"} 5' in text
+    assert 'nasawrapper_requests_total{endpoint="/planetary/apod",status="cached"} 1' in text
+    assert 'nasawrapper_cache_lookups_total{endpoint="/planetary/apod",outcome="hit"} 1' in text
+    assert 'nasawrapper_response_bytes_total{endpoint="/planetary/apod"} 500' in text
+
+    recorded.reset()
+    assert recorded.count("/planetary/apod") == 0
+
+def test_request_metrics_install(api_root):
+    recorded = RequestMetrics().install()
+    try:
+        SyncApod("DEMO_KEY").get_apod({"date": datetime(2021, 1, 1)})
+    finally:
+        recorded.uninstall()
+    SyncApod("DEMO_KEY").get_apod({"date": datetime(2021, 1, 2)})
+
+    assert recorded.count("/planetary/apod") == 1
+    assert not metrics.has_hooks()
+
+def test_errors_are_reported_without_decode_time(events):
+    with StubServer(rate_limited_rate=1.0) as stub:
+        with pytest.raises(RateLimitError):
+            SyncApod("DEMO_KEY", api_root=stub.url).get_apod({"date": datetime(2021, 1, 1)})
+
+    assert len(events) == 1
+    assert events[0].status == 429 and events[0].decode is None
+    assert "retries" not in RequestEvent._fields
+
+def test_engine_traces_only_with_hooks(stub):
+    with AsyncEngine() as engine:
+        assert not engine._session.trace_configs
+
+    received = []
+    metrics.add_hook(received.append)
+    try:
+        with AsyncEngine() as engine:
+            SyncApod("DEMO_KEY", engine=engine, api_root=stub.url).get_apod({"date": datetime(2021, 1, 1)})
+    finally:
+        metrics.remove_hook(received.append)
+
+    assert received[0].connect is not None and received[0].ttfb is not None
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+from nasawrapper import SyncNeoWs
+from nasawrapper.errors import NotFound
+from nasawrapper.mirror import NeoWsMirror
+
+@pytest.fixture
+def mirror():
+    with NeoWsMirror(":memory:") as mirror:
+        yield mirror
+
+def test_sync_is_incremental(mirror, stub):
+    neows = SyncNeoWs("DEMO_KEY", api_root=stub.url)
+    browse = neows.get_neo_browse(0)
+
+    assert mirror.sync(browse) == 20 + 20 * 60
+    assert mirror.sync(browse) == 0
+    assert len(mirror) == 20
+
+def test_feeds_keep_stored_approaches_and_orbits(mirror, make_asteroid):
+    lookup = make_asteroid(2000001, date=datetime(2000, 1, 1), approaches=30, orbital_data=True)
+    mirror.sync(lookup)
+    feed_item = {key: value for key, value in lookup.items() if key != "orbital_data"}
+    feed_item["close_approach_data"] = lookup["close_approach_data"][21:22]
+    mirror.sync({"near_earth_objects": {"2021-01-01": [feed_item]}})
+
+    stored = mirror.get(2000001)
+    assert len(stored["close_approach_data"]) == 30
+    assert stored["orbital_data"] == lookup["orbital_data"]
+
+def test_query_filters(mirror, make_asteroid):
+    asteroids = [make_asteroid(2000000 + index, date=datetime(2021, 1, 1 + index), seed=index) for index in range(10)]
+    mirror.sync(asteroids)
+
+    hazardous = mirror.query(hazardous=True)
+    assert [item["neo_reference_id"] for item in hazardous] == \
+        [item["neo_reference_id"] for item in asteroids if item["is_potentially_hazardous_asteroid"]]
+
+    large = mirror.query(min_diameter=1.0)
+    assert all(item["estimated_diameter"]["kilometers"]["estimated_diameter_max"] >= 1.0 for item in large)
+
+    window = mirror.query(start_date=datetime(2021, 1, 3), end_date=datetime(2021, 1, 4))
+    assert [item["neo_reference_id"] for item in window] == ["2000002", "2000003"]
+    assert len(mirror.query(limit=3)) == 3
+
+def test_query_keeps_only_matching_approaches(mirror, make_asteroid):
+    mirror.sync(make_asteroid(2000001, date=datetime(2000, 1, 1), approaches=5))
+
+    found, = mirror.query(start_date=datetime(2002, 1, 1), end_date=datetime(2002, 12, 31))
+    assert [approach["close_approach_date"][:4] for approach in found["close_approach_data"]] == ["2002"]
+
+def test_unknown_asteroids(mirror):
+    assert 2000001 not in mirror
+    with pytest.raises(NotFound):
+        mirror.get(2000001)
+    with pytest.raises(TypeError):
+        mirror.query(start_date="2021-01-01")
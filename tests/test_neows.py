@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from nasawrapper import NeoWsQueryBuilder
+
+def test_builders_have_their_own_options(stub):
+    builders = [
+        NeoWsQueryBuilder("DEMO_KEY", api_root=stub.url).set_start_date(datetime(2021, 1, day)).set_end_date(datetime(2021, 1, day))
+        for day in range(1, 5)
+    ]
+    results = [result.result for result in NeoWsQueryBuilder.map(builders)]
+
+    assert [list(result["near_earth_objects"]) for result in results] == [[f"2021-01-0{day}"] for day in range(1, 5)]
+    assert builders[0].options == {"start_date": datetime(2021, 1, 1), "end_date": datetime(2021, 1, 1)}
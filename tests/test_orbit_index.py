@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from nasawrapper.errors import NotFound
+from nasawrapper.orbit_index import OrbitIndex, orbit_features
+from nasawrapper.orbits import to_orbit_table
+
+@pytest.fixture
+def orbits(make_asteroid):
+    return to_orbit_table([make_asteroid(2000000 + index, orbital_data=True) for index in range(300)])
+
+def brute_force(orbits, position, k):
+    points = orbit_features(orbits)
+    distances = np.linalg.norm(points - points[position], axis=1)
+    order = [index for index in np.argsort(distances, kind="stable").tolist() if index != position][:k]
+    return [(int(orbits["neo_reference_id"][index]), distances[index]) for index in order]
+
+def test_query_matches_brute_force(orbits):
+    index = OrbitIndex()
+    # added in pages, so the trees get merged
+    for start in range(0, len(orbits), 20):
+        index.add(orbits[start:start + 20])
+
+    found = index.query(2000007, k=5)
+    expected = brute_force(orbits, 7, 5)
+    assert [neo_id for neo_id, _ in found] == [neo_id for neo_id, _ in expected]
+    assert [distance for _, distance in found] == pytest.approx([distance for _, distance in expected])
+
+def test_query_radius(orbits):
+    index = OrbitIndex()
+    index.add(orbits)
+    radius = brute_force(orbits, 3, 10)[-1][1]
+
+    found = index.query_radius(2000003, radius)
+    assert len(found) == 10 and all(distance <= radius for _, distance in found)
+    assert index.query_radius(2000003, 0, include_self=True) == [(2000003, 0.0)]
+
+def test_angles_wrap_around(orbits):
+    first, second = orbits[:2].copy(), orbits[:2].copy()
+    first["ascending_node_longitude"], second["ascending_node_longitude"] = 359.0, 1.0
+    features = orbit_features(np.concatenate([first[:1], second[:1]]))
+
+    assert np.linalg.norm(features[0] - features[1]) < 0.05
+
+def test_replaced_and_removed_orbits_are_not_returned(orbits):
+    index = OrbitIndex()
+    index.add(orbits)
+    index.remove(2000001)
+    moved = orbits[2:3].copy()
+    moved["semi_major_axis"] += 100
+    index.add(moved)
+
+    found = [neo_id for neo_id, _ in index.query(2000000, k=len(orbits))]
+    assert 2000001 not in found and found[-1] == 2000002
+    assert len(index) == len(orbits) - 1
+
+    index.rebuild()
+    assert [neo_id for neo_id, _ in index.query(2000000, k=len(orbits))] == found
+
+def test_unknown_asteroids(orbits):
+    index = OrbitIndex()
+    index.add(orbits[:5])
+
+    with pytest.raises(NotFound):
+        index.query(1)
+    with pytest.raises(NotFound):
+        index.remove(1)
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from nasawrapper.orbits import heliocentric_distance, julian_date, propagate, to_orbit_table
+
+def test_to_orbit_table_skips_asteroids_without_orbital_data(make_asteroid):
+    asteroids = [make_asteroid(2000001, orbital_data=True), make_asteroid(2000002)]
+    table = to_orbit_table({"near_earth_objects": asteroids})
+
+    assert table["neo_reference_id"].tolist() == [2000001]
+
+def test_propagate_returns_one_position_per_orbit_and_epoch(make_asteroid):
+    elements = to_orbit_table([make_asteroid(2000000 + index, orbital_data=True) for index in range(3)])
+    epochs = [datetime(2030, 1, 1) + timedelta(days=day) for day in range(5)]
+
+    assert propagate(elements, epochs).shape == (3, 5, 3)
+
+def test_propagate_reads_generators_once(make_asteroid):
+    elements = to_orbit_table([make_asteroid(2000001, orbital_data=True)])
+    epochs = [datetime(2030, 1, 1) + timedelta(days=day) for day in range(4)]
+
+    from_generator = propagate(elements, (epoch for epoch in epochs))
+    assert from_generator.shape == (1, 4, 3)
+    np.testing.assert_allclose(from_generator, propagate(elements, epochs))
+
+def test_propagate_at_osculation_epoch_keeps_the_distance_bounded(make_asteroid):
+    elements = to_orbit_table([make_asteroid(2000001, orbital_data=True)])
+    distance = heliocentric_distance(propagate(elements, elements["epoch"]))[0, 0]
+    semi_major_axis, eccentricity = elements["semi_major_axis"][0], elements["eccentricity"][0]
+
+    assert semi_major_axis * (1 - eccentricity) - 1e-9 <= distance <= semi_major_axis * (1 + eccentricity) + 1e-9
+
+def test_julian_date_of_unix_epoch():
+    assert julian_date(datetime(1970, 1, 1))[0] == 2440587.5
@@ -0,0 +1,77 @@
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from nasawrapper.phash import PerceptualHashIndex, hamming_distance, perceptual_hash
+
+def random_index(count, seed=0):
+    generator = random.Random(seed)
+    index = PerceptualHashIndex()
+    bases = [generator.getrandbits(64) for _ in range(count // 4)]
+    for position in range(count):
+        value = generator.choice(bases)
+        for _ in range(generator.randrange(8)):
+            value ^= 1 << generator.randrange(64)
+        index.add(f"day-{position}", value)
+    return index
+
+def brute_force(index, max_distance):
+    hashes = index._hashes.tolist()
+    return [
+        (index.dates[first], index.dates[second], hamming_distance(hashes[first], hashes[second]))
+        for first in range(len(hashes)) for second in range(first + 1, len(hashes))
+        if hamming_distance(hashes[first], hashes[second]) <= max_distance
+    ]
+
+def test_perceptual_hash_resists_resizing():
+    generator = np.random.default_rng(0)
+    image = Image.fromarray(generator.integers(0, 255, (64, 64), dtype=np.uint8)).resize((256, 256))
+
+    assert hamming_distance(perceptual_hash(image), perceptual_hash(image.resize((128, 128)))) <= 4
+
+@pytest.mark.parametrize("max_distance", [0, 3, 4, 10])
+def test_duplicates_matches_comparing_every_pair(max_distance):
+    index = random_index(200)
+
+    assert index.duplicates(max_distance) == brute_force(index, max_distance)
+
+def test_duplicates_of_small_indexes():
+    index = PerceptualHashIndex()
+    assert index.duplicates() == []
+
+    index.add("2021-01-01", 5)
+    assert index.duplicates() == []
+
+def test_extend_with_a_date_repeated_in_the_batch():
+    index = PerceptualHashIndex()
+    index.extend([("2021-01-01", "a", 1), ("2021-01-02", "b", 2), ("2021-01-01", "c", 3)])
+
+    assert len(index) == 2
+    assert index.nearest(3, k=1) == [("2021-01-01", 0)]
+
+def test_nearest_and_within():
+    index = PerceptualHashIndex()
+    index.extend([("a", "", 0b0000), ("b", "", 0b0001), ("c", "", 0b0111)])
+
+    assert index.nearest(0, k=2) == [("a", 0), ("b", 1)]
+    assert index.within(0, 1) == [("a", 0), ("b", 1)]
+
+@pytest.mark.parametrize("name", ["index", "index.npz"])
+def test_save_and_load_with_the_same_path(tmp_path, name):
+    index = random_index(20)
+    index.save(str(tmp_path / name))
+    loaded = PerceptualHashIndex.load(str(tmp_path / name))
+
+    assert loaded.dates == index.dates
+    assert loaded._hashes.tolist() == index._hashes.tolist()
+
+def test_load_missing_file_gives_an_empty_index(tmp_path):
+    assert len(PerceptualHashIndex.load(str(tmp_path / "missing.npz"))) == 0
+
+def test_load_raises_on_a_broken_file(tmp_path):
+    (tmp_path / "broken.npz").write_bytes(b"not an archive")
+
+    with pytest.raises(Exception):
+        PerceptualHashIndex.load(str(tmp_path / "broken.npz"))
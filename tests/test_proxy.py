@@ -0,0 +1,80 @@
+import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from stub_server import StubServer
+
+from nasawrapper import SyncApod, SyncNeoWs, metrics
+from nasawrapper.errors import RateLimitError
+from nasawrapper.proxy import CachingProxy
+from nasawrapper.rate_limit import RateBudget
+
+@pytest.fixture
+def proxy(stub):
+    with CachingProxy("SECRET", upstream=stub.url) as proxy:
+        yield proxy
+
+def get(url):
+    with urllib.request.urlopen(url) as response:
+        return response.headers["X-Cache"], json.loads(response.read())
+
+def test_proxy_caches_responses(proxy, stub):
+    neows = SyncNeoWs("ANY_KEY", api_root=proxy.url)
+
+    assert neows.get_neo_lookup(2000433) == neows.get_neo_lookup(2000433)
+    assert stub.requests == 1
+    assert proxy.counts == {"HIT": 1, "MISS": 1, "COALESCED": 0}
+
+def test_proxy_coalesces_identical_requests():
+    with StubServer(latency="fixed:0.2") as slow, CachingProxy("SECRET", upstream=slow.url) as proxy:
+        with ThreadPoolExecutor(8) as executor:
+            outcomes = [outcome for outcome, _ in executor.map(get, [f"{proxy.url}/neo/rest/v1/neo/2000433"] * 8)]
+
+        assert slow.requests == 1
+        assert outcomes.count("MISS") == 1 and outcomes.count("COALESCED") + outcomes.count("HIT") == 7
+
+def test_proxy_always_forwards_random_pictures(proxy, stub):
+    apod = SyncApod("ANY_KEY", api_root=proxy.url)
+
+    apod.get_apod({"count": 2})
+    apod.get_apod({"count": 2})
+    assert stub.requests == 2
+    assert len(proxy.cache) == 0
+
+def test_proxy_replaces_its_key_in_bodies(proxy):
+    _, body = get(f"{proxy.url}/neo/rest/v1/neo/browse?page=0&api_key=MINE")
+
+    assert "SECRET" not in json.dumps(body)
+
+def test_proxy_answers_429_when_the_budget_is_exhausted(stub):
+    with CachingProxy("SECRET", budget=RateBudget(1, 3600), upstream=stub.url, timeout=0) as proxy:
+        apod = SyncApod("ANY_KEY", api_root=proxy.url)
+        apod.get_apod({"date": datetime(2021, 1, 1)})
+
+        with pytest.raises(RateLimitError):
+            apod.get_apod({"date": datetime(2021, 1, 2)})
+
+def test_proxy_keeps_pagination_links_on_the_proxy(proxy, stub):
+    neows = SyncNeoWs("ANY_KEY", api_root=proxy.url)
+    first = neows.get_neo_browse(0)
+
+    assert first["links"]["next"].startswith(proxy.url)
+    with urllib.request.urlopen(first["links"]["next"]) as response:
+        second = json.loads(response.read())
+
+    assert second["page"]["number"] == 1
+    assert stub.url not in json.dumps(first) + json.dumps(second)
+    assert proxy.counts["MISS"] == 2
+
+def test_proxy_reports_its_requests(proxy):
+    events = []
+    metrics.add_hook(events.append)
+    try:
+        get(f"{proxy.url}/neo/rest/v1/neo/2000433")
+    finally:
+        metrics.remove_hook(events.append)
+
+    assert [(event.endpoint, event.cache, event.decode) for event in events] == [("/neo/rest/v1/neo/{id}", "miss", None)]
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from stub_server import StubServer
+
+from nasawrapper import AsyncApod, SyncApod, transport
+from nasawrapper.errors import ApiError
+from nasawrapper.random_pool import AsyncRandomApodPool, RandomApodPool
+
+def test_pool_serves_pictures_in_batches(api_root):
+    with RandomApodPool("DEMO_KEY", batch_size=10, low_water_mark=1) as pool:
+        # leaving one, so the pool doesn't refill
+        pictures = [pool.get(timeout=5) for _ in range(9)]
+
+    assert len(pictures) == 9 and all("date" in picture for picture in pictures)
+    assert api_root.requests == 1
+
+def test_pool_without_low_water_mark_refills_when_empty(api_root):
+    with RandomApodPool("DEMO_KEY", batch_size=3, low_water_mark=0) as pool:
+        pictures = [pool.get(timeout=5) for _ in range(7)]
+
+    assert len(pictures) == 7
+    assert api_root.requests == 3
+
+def test_pool_uses_the_given_client(stub):
+    with RandomApodPool(SyncApod("DEMO_KEY", api_root=stub.url), batch_size=5) as pool:
+        pool.get(timeout=5)
+
+    assert stub.requests >= 1
+
+def test_pool_refills_below_the_low_water_mark(api_root):
+    with RandomApodPool("DEMO_KEY", batch_size=4, low_water_mark=2) as pool:
+        for _ in range(12):
+            pool.get(timeout=5)
+
+    assert 3 <= api_root.requests <= 5
+
+@pytest.mark.parametrize("failure", [{"error_rate": 1.0}, {"rate_limited_rate": 1.0}])
+def test_pool_raises_refill_errors(failure):
+    with StubServer(**failure) as stub:
+        transport.set_api_root(stub.url)
+        try:
+            with RandomApodPool("DEMO_KEY") as pool:
+                with pytest.raises(Exception) as raised:
+                    pool.get(timeout=5)
+        finally:
+            transport.set_api_root()
+
+    assert isinstance(raised.value, ApiError) == ("error_rate" in failure)
+
+def test_pool_checks_its_arguments():
+    with pytest.raises(ValueError):
+        RandomApodPool("DEMO_KEY", batch_size=0)
+    with pytest.raises(ValueError):
+        RandomApodPool("DEMO_KEY", batch_size=5, low_water_mark=6)
+
+def test_async_pool(stub):
+    async def main():
+        async with AsyncRandomApodPool(AsyncApod("DEMO_KEY", api_root=stub.url), batch_size=5, low_water_mark=1) as pool:
+            return [await pool.get(timeout=5) for _ in range(4)]
+
+    assert len(asyncio.run(main())) == 4
+    assert stub.requests == 1
+
+def test_async_pool_without_low_water_mark_refills_when_empty(api_root):
+    async def main():
+        async with AsyncRandomApodPool("DEMO_KEY", batch_size=3, low_water_mark=0) as pool:
+            return [await pool.get(timeout=5) for _ in range(7)]
+
+    assert len(asyncio.run(main())) == 7
+    assert api_root.requests == 3
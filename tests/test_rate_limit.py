@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from nasawrapper import SyncApod, rate_limit
+from nasawrapper.errors import RateLimitError
+from nasawrapper.rate_limit import RateBudget
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+def test_budget_refills_over_the_period(clock):
+    budget = RateBudget(limit=10, period=100)
+    assert all(budget.try_acquire() for _ in range(10))
+    assert not budget.try_acquire()
+    assert budget.delay() == pytest.approx(10)
+
+    clock[0] += 25
+    assert budget.remaining == 2
+
+    clock[0] += 1000
+    assert budget.remaining == 10
+
+def test_budget_keeps_a_reserve(clock):
+    budget = RateBudget(limit=5, period=100)
+    assert [budget.try_acquire(reserve=3) for _ in range(3)] == [True, True, False]
+    assert budget.try_acquire()
+
+def test_budget_follows_the_api_headers(clock):
+    budget = RateBudget(limit=100)
+    budget.update({"X-RateLimit-Remaining": "3"})
+    assert budget.remaining == 3
+
+    budget.update({"X-RateLimit-Remaining": "50"})
+    budget.update({"X-RateLimit-Remaining": "invalid"})
+    budget.update({})
+    assert budget.remaining == 3
+
+def test_acquire_times_out():
+    budget = RateBudget(limit=1, period=3600)
+    budget.acquire(timeout=0)
+    with pytest.raises(RateLimitError):
+        budget.acquire(timeout=1)
+    with pytest.raises(RateLimitError):
+        asyncio.run(budget.acquire_async(timeout=1))
+
+def test_acquire_waits_for_a_token():
+    budget = RateBudget(limit=20, period=1)
+    for _ in range(20):
+        budget.acquire()
+    budget.acquire(timeout=1)
+    asyncio.run(budget.acquire_async(timeout=1))
+
+def test_clients_share_a_budget(api_root):
+    budget = RateBudget(limit=2, period=3600)
+    apod = SyncApod("DEMO_KEY", budget=budget)
+    apod.get_apod({"date": datetime(2021, 1, 1)})
+    apod.get_apod({"date": datetime(2021, 1, 2)})
+
+    with pytest.raises(RateLimitError):
+        budget.acquire(timeout=0)
+    assert api_root.requests == 2
+
+def test_budget_checks_its_limit():
+    with pytest.raises(ValueError):
+        RateBudget(limit=0)
@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from nasawrapper import search
+from nasawrapper.search import ApodSearchIndex
+
+APODS = [
+    {"date": "2021-01-01", "title": "The Crab Nebula", "explanation": "A supernova remnant in Taurus."},
+    {"date": "2021-01-02", "title": "Comet NEOWISE", "explanation": "A comet over the crab-shaped hills."},
+    {"date": "2021-01-03", "title": "Café au lait galaxies", "explanation": "Two galaxies, one crab nebula in the background."}
+]
+
+@pytest.fixture(params=["fts5", "fallback"])
+def index(request, monkeypatch):
+    if request.param == "fallback":
+        monkeypatch.setattr(search, "_has_fts5", lambda connection: False)
+    elif not search._has_fts5(sqlite3.connect(":memory:")):
+        pytest.skip("SQLite was built without FTS5")
+
+    index = ApodSearchIndex()
+    index.add(APODS)
+    yield index
+    index.close()
+
+def dates(results):
+    return [result.apod["date"] for result in results]
+
+def test_search_ranks_titles_first(index):
+    found = dates(index.search("crab"))
+
+    assert found[0] == "2021-01-01" and sorted(found) == ["2021-01-01", "2021-01-02", "2021-01-03"]
+
+def test_search_phrases(index):
+    assert dates(index.search('"supernova remnant"')) == ["2021-01-01"]
+    assert dates(index.search('"remnant supernova"')) == []
+
+def test_search_between_dates(index):
+    from datetime import datetime
+
+    assert sorted(dates(index.search("crab", start_date=datetime(2021, 1, 2)))) == ["2021-01-02", "2021-01-03"]
+    assert dates(index.search("crab", end_date=datetime(2021, 1, 1))) == ["2021-01-01"]
+
+def test_search_ignores_diacritics(index):
+    assert dates(index.search("cafe")) == ["2021-01-03"]
+    assert dates(index.search("CAFÉ")) == ["2021-01-03"]
+
+def test_add_replaces_changed_dates(index):
+    assert index.add(APODS) == 0
+    assert index.add(dict(APODS[1], title="Comet Lovejoy")) == 1
+
+    assert len(index) == 3
+    assert dates(index.search("neowise")) == []
+    assert dates(index.search("lovejoy")) == ["2021-01-02"]
+
+def test_updates_keep_the_fts_rows_in_sync(tmp_path):
+    index = ApodSearchIndex(str(tmp_path / "apod.db"))
+    if not index.uses_fts5:
+        pytest.skip("SQLite was built without FTS5")
+    index.add(APODS)
+    index.add(dict(APODS[0], title="The Veil Nebula"))
+    connection = index._connection
+
+    assert connection.execute("SELECT COUNT(*) FROM apods_fts").fetchone()[0] == 3
+    assert connection.execute("INSERT INTO apods_fts (apods_fts) VALUES ('integrity-check')") is not None
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from nasawrapper.errors import NotFound
+from nasawrapper.snapshot import Snapshot, write_snapshot
+
+def test_round_trip(tmp_path, make_asteroid):
+    asteroids = [make_asteroid(2000000 + index, approaches=3, orbital_data=index % 2 == 0) for index in range(5)]
+    assert write_snapshot(str(tmp_path / "catalogue"), {"near_earth_objects": asteroids[::-1]}) == 5
+
+    snapshot = Snapshot(str(tmp_path / "catalogue"))
+    assert len(snapshot) == 5 and snapshot.meta["approaches"] == 15
+    assert snapshot.asteroids["neo_reference_id"].tolist() == [2000000 + index for index in range(5)]
+
+    original, restored = asteroids[2], snapshot.get(2000002)
+    assert restored["name"] == original["name"]
+    assert restored["is_potentially_hazardous_asteroid"] == original["is_potentially_hazardous_asteroid"]
+    assert [approach["epoch_date_close_approach"] for approach in restored["close_approach_data"]] == \
+        [approach["epoch_date_close_approach"] for approach in original["close_approach_data"]]
+    assert float(restored["close_approach_data"][0]["miss_distance"]["lunar"]) == \
+        float(original["close_approach_data"][0]["miss_distance"]["lunar"])
+    assert float(restored["orbital_data"]["eccentricity"]) == float(original["orbital_data"]["eccentricity"])
+    assert "orbital_data" not in snapshot.get(2000001)
+
+def test_duplicated_asteroids_are_merged(tmp_path, make_asteroid):
+    write_snapshot(str(tmp_path / "catalogue"), [make_asteroid(2000001), make_asteroid(2000001)])
+
+    assert len(Snapshot(str(tmp_path / "catalogue"))) == 1
+
+def test_columns_are_memory_mapped(tmp_path, make_asteroid):
+    write_snapshot(str(tmp_path / "catalogue"), [make_asteroid(2000001)])
+    column = Snapshot(str(tmp_path / "catalogue")).approaches["miss_distance_km"]
+
+    assert not column.flags.writeable
+
+def test_rewriting_replaces_the_snapshot(tmp_path, make_asteroid):
+    path = str(tmp_path / "catalogue")
+    write_snapshot(path, [make_asteroid(2000001)])
+    write_snapshot(path, [make_asteroid(2000002), make_asteroid(2000003)])
+
+    snapshot = Snapshot(path)
+    assert list(snapshot.asteroids["name"]) == [make_asteroid(2000002)["name"], make_asteroid(2000003)["name"]]
+    assert 2000001 not in snapshot
+    with pytest.raises(NotFound):
+        snapshot.get(2000001)
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["catalogue"]
+
+def test_other_versions_are_refused(tmp_path, make_asteroid):
+    path = tmp_path / "catalogue"
+    write_snapshot(str(path), [make_asteroid(2000001)])
+    (path / "meta.json").write_text(json.dumps({"version": 99}))
+
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from nasawrapper import SyncNeoWs
+from nasawrapper.tables import (
+    APPROACH_DTYPE,
+    concat_approach_tables,
+    filter_approaches,
+    group_approaches,
+    to_approach_table,
+    top_approaches
+)
+from nasawrapper.utils import iter_asteroids
+
+@pytest.fixture
+def table(make_asteroid):
+    return to_approach_table([make_asteroid(2000000 + index, approaches=3, seed=index) for index in range(10)])
+
+def test_to_approach_table_reads_every_shape(stub, make_asteroid):
+    neows = SyncNeoWs("DEMO_KEY", api_root=stub.url)
+    feed = neows.get_neo_feed({"start_date": datetime(2021, 1, 1), "end_date": datetime(2021, 1, 2)})
+    browse = neows.get_neo_browse(0)
+
+    assert len(to_approach_table(feed)) == 30
+    assert len(to_approach_table(browse)) == 20 * 60
+    assert len(to_approach_table([feed, browse, make_asteroid(1)])) == 30 + 20 * 60 + 1
+    assert to_approach_table(feed).dtype == APPROACH_DTYPE
+
+def test_iter_asteroids_rejects_other_responses():
+    with pytest.raises(TypeError):
+        list(iter_asteroids({"title": "an APOD"}))
+    with pytest.raises(TypeError):
+        list(iter_asteroids("feed"))
+
+def test_to_approach_table_converts_strings(make_asteroid):
+    item = make_asteroid(2000001)
+    row = to_approach_table(item)[0]
+
+    assert row["neo_reference_id"] == 2000001
+    assert row["miss_distance_lunar"] == float(item["close_approach_data"][0]["miss_distance"]["lunar"])
+
+def test_filter_approaches(table):
+    close = filter_approaches(table, {"miss_distance_lunar": (None, 50)}, hazardous=False)
+
+    assert np.all(close["miss_distance_lunar"] <= 50) and not close["is_potentially_hazardous"].any()
+    with pytest.raises(KeyError):
+        filter_approaches(table, {"missing": (0, 1)})
+
+def test_top_approaches_matches_sorting(table):
+    expected = np.sort(table["miss_distance_km"])
+
+    assert top_approaches(table, 5)["miss_distance_km"].tolist() == expected[:5].tolist()
+    assert top_approaches(table, 5, largest=True)["miss_distance_km"].tolist() == expected[::-1][:5].tolist()
+    assert len(top_approaches(table, 100)) == len(table)
+
+def test_group_approaches(table):
+    ids, distances, counts = group_approaches(table)
+
+    assert ids.tolist() == sorted(set(table["neo_reference_id"].tolist()))
+    assert counts.tolist() == [3] * 10
+    for key, distance in zip(ids.tolist(), distances.tolist()):
+        assert distance == table["miss_distance_km"][table["neo_reference_id"] == key].min()
+
+    _, means, _ = group_approaches(table, reduce="mean")
+    assert means[0] == pytest.approx(table["miss_distance_km"][table["neo_reference_id"] == ids[0]].mean())
+
+def test_empty_tables():
+    empty = concat_approach_tables([])
+
+    assert len(empty) == 0 and empty.dtype == APPROACH_DTYPE
+    assert [len(part) for part in group_approaches(empty)] == [0, 0, 0]
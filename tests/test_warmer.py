@@ -0,0 +1,85 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from nasawrapper import SyncApod, SyncNeoWs
+from nasawrapper.cache import ResponseCache
+from nasawrapper.rate_limit import RateBudget
+from nasawrapper.warmer import CacheWarmer
+
+def test_warmer_fills_the_cache_for_clients(api_root):
+    cache = ResponseCache()
+    warmer = CacheWarmer("WARMER_KEY", cache, feed_days=3)
+
+    assert warmer.warm_apod()
+    assert warmer.apod_date == datetime.now().strftime("%Y-%m-%d")
+    # three days, then the three of them at once
+    assert warmer.warm_feeds() == 4
+    assert api_root.requests == 5
+
+    today = datetime.now()
+    SyncApod("USER_KEY", cache=cache).get_today_apod()
+    SyncNeoWs("USER_KEY", cache=cache).get_neo_feed({"start_date": today, "end_date": today})
+    assert api_root.requests == 5
+
+def test_warmer_always_refreshes(api_root):
+    cache = ResponseCache()
+    warmer = CacheWarmer("WARMER_KEY", cache, feed_days=0)
+    warmer.warm_apod()
+    warmer.warm_apod()
+
+    assert api_root.requests == 2
+    assert len(cache) == 1
+
+def test_warmer_replaces_stale_entries(api_root):
+    cache = ResponseCache()
+    client = SyncApod("USER_KEY", cache=cache)
+    client.get_today_apod()
+    # an entry from before publication, which a lookup would keep serving
+    key = next(iter(cache._entries))
+    cache.set(key, b'{"code": 404, "msg": "No data available for date"}')
+
+    assert CacheWarmer("WARMER_KEY", cache, feed_days=0).warm_apod()
+    assert client.get_today_apod()["date"] == datetime.now().strftime("%Y-%m-%d")
+    assert api_root.requests == 2
+
+def test_warmer_uses_the_api_root(stub):
+    cache = ResponseCache()
+    warmer = CacheWarmer("WARMER_KEY", cache, feed_days=1, api_root=stub.url)
+
+    assert warmer.warm_apod() and warmer.warm_feeds() == 1
+    SyncApod("USER_KEY", cache=cache, api_root=stub.url).get_today_apod()
+    assert stub.requests == 2
+
+def test_warmer_leaves_the_reserve_to_users(api_root):
+    budget = RateBudget(limit=10, period=3600)
+    warmer = CacheWarmer("WARMER_KEY", ResponseCache(), budget, feed_days=3, reserve=8)
+
+    assert warmer.warm_feeds() == 2
+    assert not warmer.warm_apod()
+    assert api_root.requests == 2
+    assert budget.remaining == 8
+
+def test_warmer_backs_off_until_published(api_root, monkeypatch):
+    warmer = CacheWarmer("WARMER_KEY", ResponseCache(), feed_days=0, interval=100, poll_interval=10)
+    monkeypatch.setattr(warmer, "warm_apod", lambda: False)
+    assert [warmer.run_once() for _ in range(5)] == [10, 20, 40, 80, 100]
+
+    monkeypatch.setattr(warmer, "warm_apod", lambda: True)
+    assert warmer.run_once() == 100
+
+def test_warmer_runs_in_the_background(api_root):
+    cache = ResponseCache()
+    with CacheWarmer("WARMER_KEY", cache, feed_days=1):
+        deadline = time.monotonic() + 5
+        while len(cache) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert len(cache) == 2
+
+def test_warmer_checks_its_arguments():
+    with pytest.raises(ValueError):
+        CacheWarmer("WARMER_KEY", ResponseCache(), feed_days=-1)
+    with pytest.raises(ValueError):
+        CacheWarmer("WARMER_KEY", ResponseCache(), interval=0)